@@ -0,0 +1,21 @@
+from .instance import Instance, random_instance
+from .model import PathSelectionModel, MAX_PAX, MIN_RIT, CHECK, OBJECTIVES
+from .result import PathSelectionResult, CompactResult, Incumbent
+from .report import print_result, print_iis, print_report, print_diagnosis
+from .constraints import MCCORMICK, INDICATOR, QUADRATIC, DELAY_FORMS
+from .index import PathIndex
+from .model import EXPR, MATRIX, BUILD_MODES
+from .constraints import BigM, TIGHT, FIXED, BIG_M_MODES, LOAD, OD, CAPACITY_MODES
+from .scenarios import run_scenarios, ScenarioResult, ScenarioSummary
+from .instance import PassengerArcs
+from .loader import load_instance
+from .cache import SolutionCache, instance_key, model_key
+from .colgen import ColumnGeneration, ColumnGenerationResult
+from .heuristic import GreedySolver, greedy_solve, heuristic_start
+from .highs import HighsModel
+from .backend import make_model, GUROBI, HIGHS, BACKENDS
+from .profiling import Profiler, PhaseStats, GapSample
+from .diagnosis import diagnose, precheck, Diagnosis, Issue, PRECHECK, RELAX, TIERS
+from .horizon import rolling_horizon, RollingHorizon, HorizonResult, WindowResult
+from .pareto import pareto_front, ParetoPoint
+from .simulation import simulate, PlanSimulator, SimulationResult
@@ -0,0 +1,23 @@
+from typing import Any, Union
+
+from .highs import HighsModel
+from .instance import Instance
+from .model import PathSelectionModel
+
+# Solver disponibili
+GUROBI = "gurobi"  # PathSelectionModel (gurobipy, serve una licenza)
+HIGHS = "highs"  # HighsModel (highspy, open source)
+BACKENDS = (GUROBI, HIGHS)
+
+
+def make_model(instance: Instance, backend: str = GUROBI, **kwargs: Any) -> Union[PathSelectionModel, HighsModel]:
+    """Modello per il solver ``backend``; ``kwargs`` va al costruttore corrispondente.
+
+    Entrambi i modelli hanno ``build``, ``solve``, ``set_start``, ``result`` e
+    ``compute_iis`` e restituiscono un ``PathSelectionResult``.
+    """
+    if backend == GUROBI:
+        return PathSelectionModel(instance, **kwargs)
+    if backend == HIGHS:
+        return HighsModel(instance, **kwargs)
+    raise ValueError(f"Solver sconosciuto: {backend!r} (attesi: {', '.join(BACKENDS)})")
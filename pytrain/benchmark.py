@@ -0,0 +1,158 @@
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Any, Iterator, Sequence, Tuple
+
+from .backend import make_model, GUROBI, BACKENDS
+from .instance import Arc, Instance, random_instance
+from .model import OBJECTIVES, EXPR, MATRIX, BUILD_MODES
+
+# Taglie predefinite: (stazioni, percorsi, passeggeri)
+DEFAULT_SIZES = ((7, 4, 10), (20, 10, 1000), (40, 20, 10000), (80, 40, 50000))
+
+
+# ===============================
+# === GENERATORE DI ISTANZE ====
+# ===============================
+# Stessa struttura degli script: stazioni 1..N in linea, percorsi da 1 a N
+# che saltano alcune stazioni intermedie, timetable a passo costante, tempi di
+# percorrenza casuali e passeggeri su coppie di stazioni. Il primo percorso
+# tocca tutte le stazioni (come D negli script), così ogni coppia è servibile.
+
+def synthetic_paths(num_nodes: int, num_paths: int, skip: float = 0.3,
+                    seed: Optional[int] = None) -> Dict[str, List[Arc]]:
+    """Percorsi distinti da 1 a ``num_nodes``; ogni stazione intermedia è saltata con probabilità ``skip``."""
+    rng = random.Random(seed)
+    paths: Dict[str, List[Arc]] = {}
+    seen = set()
+    attempts = 0
+    while len(paths) < num_paths and attempts < 100 * num_paths:
+        attempts += 1
+        stations = [1] + [s for s in range(2, num_nodes) if not paths or rng.random() >= skip] + [num_nodes]
+        key = tuple(stations)
+        if key in seen:
+            continue
+        seen.add(key)
+        paths[f"P{len(paths) + 1}"] = list(zip(stations, stations[1:]))
+    return paths
+
+
+def synthetic_instance(num_nodes: int, num_paths: int, num_passengers: int, capMax: int = 10,
+                       w_range: Tuple[int, int] = (5, 7), skip: float = 0.3, seed: Optional[int] = None,
+                       **kwargs) -> Instance:
+    """Istanza sintetica; la timetable ha passo w massimo + sosta, quindi il percorso completo è in orario.
+
+    ``kwargs`` va a ``Instance`` (paths_cost, budget, min_pax_ratio, ...).
+    """
+    paths = synthetic_paths(num_nodes, num_paths, skip, seed)
+    step = w_range[1] + kwargs.get("dwell", 5)
+    timetable = {s: 100 + step * (s - 1) for s in range(1, num_nodes + 1)}
+    return random_instance(paths, timetable, capMax, num_passengers, w_range=w_range, seed=seed, **kwargs)
+
+
+# =================
+# === BENCHMARK ===
+# =================
+
+def _presolve(model, backend: str) -> None:
+    if backend == GUROBI:
+        model.model.presolve()
+    else:
+        model.highs.presolve()
+        # Il solve successivo riparte dal modello originale
+        model.highs.clearSolver()
+
+
+def _size(model, backend: str) -> Dict[str, int]:
+    if backend == GUROBI:
+        m = model.model
+        return {"rows": m.NumConstrs + m.NumGenConstrs, "cols": m.NumVars, "nonzeros": m.NumNZs}
+    h = model.highs
+    return {"rows": h.getNumRow(), "cols": h.getNumCol(), "nonzeros": h.getNumNz()}
+
+
+def run_case(num_nodes: int, num_paths: int, num_passengers: int, objective: str, backend: str = GUROBI,
+             time_limit: Optional[float] = None, seed: int = 0, model_args: Optional[Dict[str, Any]] = None,
+             **instance_args) -> Dict[str, Any]:
+    """Genera un'istanza e misura separatamente generazione, costruzione, presolve e solve."""
+    model_args = dict(model_args or {}, objective=objective)
+    if backend == GUROBI:
+        params = dict(model_args.pop("params", None) or {}, OutputFlag=0)
+        if time_limit is not None:
+            params["TimeLimit"] = time_limit
+        model_args["params"] = params
+    else:
+        options = dict(model_args.pop("options", None) or {}, output_flag=False)
+        if time_limit is not None:
+            options["time_limit"] = float(time_limit)
+        model_args["options"] = options
+
+    t0 = time.perf_counter()
+    inst = synthetic_instance(num_nodes, num_paths, num_passengers, seed=seed, **instance_args)
+    t1 = time.perf_counter()
+    model = make_model(inst, backend, **model_args)
+    model.build()
+    if backend == GUROBI:
+        model.model.update()
+    t2 = time.perf_counter()
+    _presolve(model, backend)
+    t3 = time.perf_counter()
+    result = model.solve()
+    t4 = time.perf_counter()
+
+    record = {
+        "nodes": num_nodes, "paths": len(inst.paths), "passengers": num_passengers, "objective": objective,
+        # HiGHS parte sempre dalla matrice assemblata
+        "backend": backend, "build_mode": model_args.get("build_mode", EXPR) if backend == GUROBI else MATRIX,
+        "seed": seed,
+        "generate_s": t1 - t0, "build_s": t2 - t1, "presolve_s": t3 - t2, "solve_s": t4 - t3,
+        "solver_runtime_s": result.runtime, "status": result.status, "obj_val": result.obj_val,
+    }
+    record.update(_size(model, backend))
+    return record
+
+
+def run_benchmark(sizes: Sequence[Tuple[int, int, int]] = DEFAULT_SIZES,
+                  objectives: Sequence[str] = OBJECTIVES,
+                  backend: str = GUROBI,
+                  repeat: int = 1,
+                  seed: int = 0,
+                  **kwargs) -> Iterator[Dict[str, Any]]:
+    """Un record per (taglia, obiettivo, ripetizione) con seed seed, seed + 1, ...; ``kwargs`` va a ``run_case``."""
+    for num_nodes, num_paths, num_passengers in sizes:
+        for objective in objectives:
+            for r in range(repeat):
+                yield run_case(num_nodes, num_paths, num_passengers, objective, backend=backend, seed=seed + r,
+                               **kwargs)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark di costruzione e soluzione (un record JSON per riga)")
+    parser.add_argument("--size", action="append", metavar="N,P,PAX",
+                        help="stazioni,percorsi,passeggeri (ripetibile); default: taglie predefinite")
+    parser.add_argument("--objective", action="append", choices=OBJECTIVES)
+    parser.add_argument("--backend", choices=BACKENDS, default=GUROBI)
+    parser.add_argument("--build-mode", choices=BUILD_MODES, default=EXPR)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float)
+    parser.add_argument("--output", help="file JSON lines (default: stdout)")
+    args = parser.parse_args(argv)
+
+    sizes = [tuple(int(v) for v in s.split(",")) for s in args.size] if args.size else DEFAULT_SIZES
+    model_args = {"build_mode": args.build_mode} if args.backend == GUROBI else {}
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for record in run_benchmark(sizes, args.objective or OBJECTIVES, backend=args.backend, repeat=args.repeat,
+                                    seed=args.seed, time_limit=args.time_limit, model_args=model_args):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
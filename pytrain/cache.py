@@ -0,0 +1,172 @@
+import hashlib
+import os
+import pickle
+from array import array
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Any, Union
+
+import gurobipy
+
+from .backend import GUROBI, HIGHS
+from .constraints import MCCORMICK
+from .highs import HighsModel
+from .instance import Instance, PassengerArcs
+from .model import PathSelectionModel
+from .result import PathSelectionResult, OPTIMAL, INFEASIBLE_STATUS
+
+# Stati deterministici che vale la pena salvare: ottimo o infeasibile
+CACHEABLE_STATUS = (OPTIMAL,) + INFEASIBLE_STATUS
+
+
+# ==========================
+# === CACHE DELLE SOLUZIONI ===
+# ==========================
+
+def instance_key(inst: Instance, **options: Any) -> str:
+    """Hash canonico (sha256) dell'istanza normalizzata e delle opzioni del modello.
+
+    Percorsi, timetable e tempi sono ordinati per chiave; l'ordine dei passeggeri
+    resta quello dell'istanza perché gli indici di ``served_passengers`` vi fanno
+    riferimento.
+    """
+    h = hashlib.sha256()
+
+    def put(*values) -> None:
+        h.update(repr(values).encode())
+
+    for p in sorted(inst.paths):
+        put("path", p, inst.paths[p], (inst.paths_cost or {}).get(p))
+    put("timetable", sorted(inst.timetable.items()))
+    path_arcs = sorted(set(arc for arcs in inst.paths.values() for arc in arcs))
+    put("arcs", path_arcs)
+    h.update(array('d', (inst.travel(*arc) for arc in path_arcs)).tobytes())
+    pax = inst.passenger_arcs
+    if not isinstance(pax, PassengerArcs):
+        pax = PassengerArcs((u for u, _ in pax), (v for _, v in pax))
+    put("passengers", len(pax))
+    h.update(pax.origin.tobytes())
+    h.update(pax.destination.tobytes())
+    put("params", inst.capMax, inst.budget, inst.pickup_slack, inst.dwell, inst.min_pax_ratio, inst.max_paths)
+    put("options", sorted(options.items()))
+    return h.hexdigest()
+
+
+def solver_version(backend: str = GUROBI) -> str:
+    """Versione del solver del backend (per HiGHS serve highspy)."""
+    if backend == HIGHS:
+        import highspy
+        return highspy.Highs().version()
+    return ".".join(map(str, gurobipy.gurobi.version()))
+
+
+def model_key(pm: Union[PathSelectionModel, HighsModel]) -> str:
+    """Chiave di un modello: istanza più tutto ciò che può cambiare la soluzione restituita.
+
+    Vale per entrambi i backend: ``HighsModel`` non ha forma del ritardo (sempre
+    McCormick), formulazione aggregata né parametri Gurobi, ma le sue opzioni
+    HiGHS; backend e versione del solver fanno parte della chiave.
+    """
+    backend = HIGHS if isinstance(pm, HighsModel) else GUROBI
+    params = getattr(pm, "params", None)
+    if params is None:
+        params = getattr(pm, "options", {})
+    return instance_key(pm.instance, objective=pm.objective, delay_weight=pm.delay_weight,
+                        delay_form=getattr(pm, "delay_form", MCCORMICK), big_m=pm.big_m,
+                        aggregate=getattr(pm, "aggregate", False), capacity=pm.capacity,
+                        params=sorted(params.items()), backend=backend, version=solver_version(backend))
+
+
+class SolutionCache:
+    """Cache su disco dei risultati, indirizzata per contenuto.
+
+    Un file per voce (``<chiave>.pkl``); alla lettura si aggiorna la data di
+    modifica, e oltre ``max_entries`` voci o ``max_bytes`` byte si eliminano le
+    meno usate di recente. Se la versione del solver registrata nella cartella
+    non è quella corrente, la cache viene svuotata.
+    """
+
+    def __init__(self, path, max_entries: int = 10000, max_bytes: int = 256 * 2 ** 20,
+                 solver_version: Optional[str] = None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.solver_version = solver_version or ".".join(map(str, gurobipy.gurobi.version()))
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        version_file = self.path / "VERSION"
+        if not version_file.exists() or version_file.read_text().strip() != self.solver_version:
+            self.clear()
+            version_file.write_text(self.solver_version)
+
+        # chiave -> (byte, ultimo uso)
+        self._index: Dict[str, Tuple[int, float]] = {}
+        for f in self.path.glob("*.pkl"):
+            st = f.stat()
+            self._index[f.stem] = (st.st_size, st.st_mtime)
+        self._bytes = sum(size for size, _ in self._index.values())
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[PathSelectionResult]:
+        if key not in self._index:
+            return None
+        f = self._file(key)
+        try:
+            with open(f, "rb") as fh:
+                result = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self._drop(key)
+            return None
+        os.utime(f)
+        self._index[key] = (self._index[key][0], f.stat().st_mtime)
+        return result
+
+    def put(self, key: str, result: PathSelectionResult) -> None:
+        if result.status not in CACHEABLE_STATUS:
+            return
+        f = self._file(key)
+        tmp = f.with_suffix(".tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, f)
+        if key in self._index:
+            self._bytes -= self._index[key][0]
+        st = f.stat()
+        self._index[key] = (st.st_size, st.st_mtime)
+        self._bytes += st.st_size
+        self._evict()
+
+    def solve(self, pm: PathSelectionModel) -> PathSelectionResult:
+        """Restituisce il risultato in cache o risolve il modello e lo salva."""
+        key = model_key(pm)
+        result = self.get(key)
+        if result is None:
+            result = pm.solve()
+            self.put(key, result)
+        return result
+
+    def _drop(self, key: str) -> None:
+        size, _ = self._index.pop(key, (0, 0.0))
+        self._bytes -= size
+        self._file(key).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        if len(self._index) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if len(self._index) <= self.max_entries and self._bytes <= self.max_bytes:
+                break
+            self._drop(key)
+
+    def invalidate(self, key: str) -> None:
+        self._drop(key)
+
+    def clear(self) -> None:
+        for f in self.path.glob("*.pkl"):
+            f.unlink()
+        self._index = {}
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
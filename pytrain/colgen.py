@@ -0,0 +1,232 @@
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Mapping, Tuple, Any
+
+from gurobipy import Model, GRB, Env, quicksum
+
+from .instance import Arc, Instance
+from .model import PathSelectionModel, MAX_PAX
+from .result import PathSelectionResult
+
+
+# ==============================
+# === GENERAZIONE DI COLONNE ===
+# ==============================
+# Master ristretto: rilassamento lineare della selezione percorsi in forma
+# aggregata, dove ogni percorso (colonna) copre le coppie OD di cui visita
+# entrambe le stazioni:
+#
+#   max  somma_a y[a]
+#   s.t. y[a] <= min(n_a, capMax) * somma_{p copre a} Z[p]    (pi_a)
+#        somma_p costo_p Z[p] <= budget                        (mu)
+#        somma_p Z[p] <= max_paths                             (nu)
+#        0 <= Z <= 1, 0 <= y[a] <= n_a
+#
+# Costo ridotto di un nuovo percorso: somma_{a coperta} pi_a * min(n_a, capMax)
+# - mu * costo - nu. Il pricing è un cammino minimo con vincoli di risorsa
+# (tempo) sul grafo degli archi candidati: l'orario avanza di w + sosta, può
+# attendere l'apertura della finestra e non deve superarne la chiusura nelle
+# stazioni di origine dei passeggeri. Le colonne generate, più quelle iniziali,
+# vanno poi nel modello completo per la soluzione intera finale. Il master
+# limita la capacità solo per coppia OD: è un rilassamento del carico a bordo
+# (constraints.add_load_constraints), che vale nel modello finale.
+
+@dataclass
+class ColumnGenerationResult:
+    result: PathSelectionResult
+    model: PathSelectionModel
+    # Percorsi generati (nome -> archi), esclusi quelli iniziali
+    generated: Dict[str, List[Arc]] = field(default_factory=dict)
+    iterations: int = 0
+    # Valore del master lineare a ogni iterazione
+    lp_bounds: List[float] = field(default_factory=list)
+
+
+@dataclass(order=True)
+class _Label:
+    time: float
+    value: float = field(compare=False)
+    cost: float = field(compare=False)
+    station: int = field(compare=False)
+    visited: int = field(compare=False)
+    arcs: Tuple[Arc, ...] = field(compare=False)
+
+
+class ColumnGeneration:
+    """Selezione percorsi su percorsi enumerati implicitamente dalla rete ``network``.
+
+    ``network`` dà il tempo di percorrenza di ogni arco candidato e ``arc_cost``
+    il suo costo; il costo di un percorso generato è la somma dei costi dei suoi
+    archi (per i percorsi iniziali si usa ``paths_cost`` se presente). I percorsi
+    vanno da ``source`` a ``sink``. ``max_labels`` limita le etichette tenute per
+    stazione nel pricing: con un limite basso il pricing è euristico e la
+    generazione si ferma quando non trova più colonne migliorative.
+    """
+
+    def __init__(self, instance: Instance, network: Mapping[Arc, float], arc_cost: Mapping[Arc, float],
+                 source: int, sink: int, max_iterations: int = 50, columns_per_iteration: int = 5,
+                 max_labels: int = 50, env: Optional[Env] = None):
+        self.instance = instance
+        self.network = dict(network)
+        self.arc_cost = dict(arc_cost)
+        self.source = source
+        self.sink = sink
+        self.max_iterations = max_iterations
+        self.columns_per_iteration = columns_per_iteration
+        self.max_labels = max_labels
+        self.env = env
+
+        self.out_arcs: Dict[int, List[Arc]] = {}
+        for (u, v) in self.network:
+            self.out_arcs.setdefault(u, []).append((u, v))
+
+        inst = instance
+        self.demand = {arc: len(pax_ids) for arc, pax_ids in inst.arc_to_passengers.items()}
+        self.coeff = {arc: min(n, inst.capMax) for arc, n in self.demand.items()}
+        # Stazioni con finestra di prelievo: origini di almeno un passeggero
+        pickup_window = inst.pickup_window
+        self.windows = {u: pickup_window.get(u, (0, 1e5)) for u, _ in self.demand}
+
+    # --- Master ---
+
+    def _path_cost(self, p: str, arcs: List[Arc]) -> float:
+        costs = self.instance.paths_cost or {}
+        return costs[p] if p in costs else sum(self.arc_cost[arc] for arc in arcs)
+
+    def _covers(self, arcs: List[Arc]) -> List[Arc]:
+        nodes = set(n for arc in arcs for n in arc)
+        return [a for a in self.demand if a[0] in nodes and a[1] in nodes]
+
+    def _solve_master(self, paths: Dict[str, List[Arc]], costs: Dict[str, float]):
+        inst = self.instance
+        master = Model("Path_Selection_Master", env=self.env) if self.env is not None else Model("Path_Selection_Master")
+        master.Params.OutputFlag = 0
+        Z = master.addVars(paths.keys(), ub=1.0, name="Z")
+        y = master.addVars(self.demand.keys(), ub=self.demand, name="y")
+        covering: Dict[Arc, List[str]] = {a: [] for a in self.demand}
+        for p, arcs in paths.items():
+            for a in self._covers(arcs):
+                covering[a].append(p)
+        cap = {a: master.addConstr(y[a] <= self.coeff[a] * quicksum(Z[p] for p in covering[a]), name=f"cap_{a}")
+               for a in self.demand}
+        budget = max_paths = None
+        if inst.budget is not None:
+            budget = master.addConstr(quicksum(costs[p] * Z[p] for p in paths) <= inst.budget, name="budget")
+        if inst.max_paths is not None:
+            max_paths = master.addConstr(Z.sum() <= inst.max_paths, name="max_paths")
+        master.setObjective(y.sum(), GRB.MAXIMIZE)
+        master.optimize()
+        # Senza ottimo (budget o max_paths negativi, limiti di tempo) non ci sono duali
+        if master.Status != GRB.OPTIMAL:
+            return None
+
+        pi = {a: c.Pi for a, c in cap.items()}
+        mu = budget.Pi if budget is not None else 0.0
+        nu = max_paths.Pi if max_paths is not None else 0.0
+        return master.ObjVal, pi, mu, nu
+
+    # --- Pricing ---
+
+    def _price(self, pi: Dict[Arc, float], mu: float, nu: float) -> List[Tuple[float, List[Arc], float]]:
+        """Percorsi source -> sink con costo ridotto positivo, dal migliore."""
+        inst = self.instance
+        # Premio per coppia di stazioni visitate
+        prize = {a: pi[a] * self.coeff[a] for a in self.demand if pi[a] * self.coeff[a] > 1e-9}
+        by_station: Dict[int, List[Tuple[int, float]]] = {}
+        for (u, v), value in prize.items():
+            by_station.setdefault(u, []).append((v, value))
+            by_station.setdefault(v, []).append((u, value))
+
+        def window(s: int, t: float) -> Optional[float]:
+            if s in self.windows:
+                start, end = self.windows[s]
+                t = max(t, start)
+                if t > end:
+                    return None
+            return t
+
+        t0 = window(self.source, inst.timetable.get(self.source, 0))
+        if t0 is None:
+            return []
+        heap = [_Label(t0, 0.0, 0.0, self.source, 1 << self.source, ())]
+        kept: Dict[int, List[_Label]] = {}
+        found: Dict[Tuple[Arc, ...], Tuple[float, float]] = {}
+
+        while heap:
+            label = heapq.heappop(heap)
+            s = label.station
+            # Dominanza: un'etichetta già tenuta nella stessa stazione arriva prima (la coda è
+            # ordinata per orario); se ha anche valore ridotto non inferiore, questa si scarta.
+            # È euristica perché ignora le stazioni visitate; max_labels limita le etichette.
+            bucket = kept.setdefault(s, [])
+            reduced = label.value - mu * label.cost
+            if len(bucket) >= self.max_labels or any(other.value - mu * other.cost >= reduced - 1e-9
+                                                     for other in bucket):
+                continue
+            bucket.append(label)
+
+            if s == self.sink:
+                rc = reduced - nu
+                if rc > 1e-6:
+                    found[label.arcs] = (rc, label.cost)
+                continue
+
+            for (u, v) in self.out_arcs.get(s, ()):
+                if label.visited >> v & 1:
+                    continue
+                t = window(v, label.time + self.network[(u, v)] + inst.dwell)
+                if t is None:
+                    continue
+                gain = sum(value for other, value in by_station.get(v, ()) if label.visited >> other & 1)
+                heapq.heappush(heap, _Label(t, label.value + gain, label.cost + self.arc_cost[(u, v)], v,
+                                            label.visited | 1 << v, label.arcs + ((u, v),)))
+
+        best = sorted(found.items(), key=lambda item: -item[1][0])
+        return [(rc, list(arcs), cost) for arcs, (rc, cost) in best]
+
+    # --- Ciclo principale ---
+
+    def run(self, objective: str = MAX_PAX, **model_args: Any) -> ColumnGenerationResult:
+        """Genera colonne finché il pricing ne trova e risolve il modello intero finale.
+
+        Il master e il pricing valutano solo la copertura dei passeggeri, quindi
+        l'unica funzione obiettivo supportata è MAX_PAX. Se il master non ha
+        ottimo la generazione si ferma e il modello finale ne riporta lo stato.
+        """
+        if objective != MAX_PAX:
+            raise ValueError(f"Funzione obiettivo non supportata dalla generazione di colonne: {objective!r} "
+                             f"(attesa: {MAX_PAX!r})")
+        inst = self.instance
+        paths = dict(inst.paths)
+        costs = {p: self._path_cost(p, arcs) for p, arcs in paths.items()}
+        known = {tuple(arcs) for arcs in paths.values()}
+        generated: Dict[str, List[Arc]] = {}
+        lp_bounds: List[float] = []
+
+        iteration = 0
+        for iteration in range(1, self.max_iterations + 1):
+            master = self._solve_master(paths, costs)
+            if master is None:
+                break
+            bound, pi, mu, nu = master
+            lp_bounds.append(bound)
+            columns = [(arcs, cost) for _, arcs, cost in self._price(pi, mu, nu) if tuple(arcs) not in known]
+            if not columns:
+                break
+            for arcs, cost in columns[:self.columns_per_iteration]:
+                name = f"G{len(generated) + 1}"
+                paths[name] = generated[name] = arcs
+                costs[name] = cost
+                known.add(tuple(arcs))
+
+        # Soluzione intera finale sul modello completo con tutte le colonne
+        w = {arc: inst.travel(*arc) for arcs in inst.paths.values() for arc in arcs}
+        w.update((arc, self.network[arc]) for arcs in generated.values() for arc in arcs)
+        final = Instance(paths=paths, timetable=inst.timetable, w=w, passenger_arcs=inst.passenger_arcs,
+                         capMax=inst.capMax, paths_cost=costs if inst.budget is not None else inst.paths_cost,
+                         budget=inst.budget, pickup_slack=inst.pickup_slack, dwell=inst.dwell,
+                         min_pax_ratio=inst.min_pax_ratio, max_paths=inst.max_paths)
+        model_args.setdefault("env", self.env)
+        pm = PathSelectionModel(final, objective=objective, **model_args)
+        return ColumnGenerationResult(result=pm.solve(), model=pm, generated=generated, iterations=iteration,
+                                      lp_bounds=lp_bounds)
@@ -0,0 +1,341 @@
+from typing import Dict, List, Mapping, Tuple, Any
+
+from gurobipy import Model, GRB, quicksum, tupledict, Var
+
+from .instance import Instance, Arc
+
+M = 1e4  # Big M per disattivare vincoli se non necessario
+
+# Forme del termine di ritardo (arrival_time[u] - timetable[u]) * Z[p]
+MCCORMICK = "mccormick"  # variabile di ritardo con inviluppo di McCormick (MILP)
+INDICATOR = "indicator"  # variabile di ritardo con vincoli indicatori (MILP)
+QUADRATIC = "quadratic"  # prodotto bilineare originale (MIQP non convesso)
+DELAY_FORMS = (MCCORMICK, INDICATOR, QUADRATIC)
+
+# Disattivazione dei vincoli di finestra e progressione quando Z[p] = 0
+TIGHT = "tight"  # Big-M per vincolo dedotti dall'istanza
+FIXED = "fixed"  # Big-M fissi degli script originali (1e4 finestre, 1e5 progressione)
+BIG_M_MODES = (TIGHT, FIXED, INDICATOR)  # INDICATOR: vincoli indicatori, senza Big-M
+
+# Vincoli di capacità
+LOAD = "load"  # passeggeri a bordo su ogni arco di ogni percorso scelto
+OD = "od"  # solo i passeggeri con la stessa coppia OD (script originali: sottostima il carico)
+CAPACITY_MODES = (LOAD, OD)
+
+
+class BigM:
+    """Valori di Big-M per i vincoli di finestra e di progressione.
+
+    Con ``tight`` ogni M è il più piccolo valore che rende il vincolo ridondante
+    quando il percorso non è scelto, dati 0 <= arrival_time[u] <= U[u] con U da
+    ``Instance.arrival_bounds``:
+
+        finestra inizio   M = window_start
+        finestra fine     M = max(0, U[u] - window_end)
+        progressione      M = U[u] + w[u, v] + sosta
+
+    ``used`` raccoglie il valore usato per ogni vincolo, per nome.
+    """
+
+    def __init__(self, inst: Instance, mode: str = TIGHT):
+        if mode not in BIG_M_MODES:
+            raise ValueError(f"Modalità Big-M sconosciuta: {mode!r} (attese: {', '.join(BIG_M_MODES)})")
+        self.inst = inst
+        self.mode = mode
+        self.arrival_ub = inst.arrival_bounds()
+        self.pickup_window = inst.pickup_window
+        self.used: Dict[str, float] = {}
+
+    def window(self, u: int):
+        """(M inizio, M fine) per la finestra all'origine u."""
+        if self.mode == FIXED:
+            return M, M
+        window_start, window_end = self.pickup_window.get(u, (0, 1e5))
+        return window_start, max(0.0, self.arrival_ub[u] - window_end)
+
+    def progression(self, u: int, v: int) -> float:
+        if self.mode == FIXED:
+            return 1e5
+        return self.arrival_ub[u] + self.inst.travel(u, v) + self.inst.dwell
+
+
+# ======================
+# === VINCOLI =====
+# ======================
+# Ogni funzione aggiunge una famiglia di vincoli, una sola riga per vincolo
+# logico, e restituisce il numero di righe create.
+
+def add_window_constraints(model: Model, inst: Instance, Z: tupledict, arrival_time: tupledict,
+                           big_m: BigM) -> int:
+    """Finestra di prelievo all'origine u, una volta per coppia (stazione, percorso).
+
+    Il vincolo dipende solo dalla stazione u e dal percorso p, non dal passeggero:
+    basta emetterlo per ogni origine con almeno un passeggero servibile e per ogni
+    percorso che passa da u.
+    """
+    pickup_window = inst.pickup_window
+    index = inst.index
+    origins = sorted({arc[0] for arc in set(inst.passenger_arcs) if index.paths_on(arc)})
+
+    rows = 0
+    for u in origins:
+        window_start, window_end = pickup_window.get(u, (0, 1e5))
+        m_start, m_end = big_m.window(u)
+        for p in index.paths_at(u):
+            if big_m.mode == INDICATOR:
+                model.addGenConstrIndicator(Z[p], True, arrival_time[u] >= window_start, name=f"window_start_{u}_{p}")
+                model.addGenConstrIndicator(Z[p], True, arrival_time[u] <= window_end, name=f"window_end_{u}_{p}")
+            else:
+                # Vincoli sulla finestra temporale per l'origine u (soft con Big-M)
+                model.addConstr(arrival_time[u] >= window_start - (1 - Z[p]) * m_start,
+                                name=f"window_start_{u}_{p}")
+                model.addConstr(arrival_time[u] <= window_end + (1 - Z[p]) * m_end, name=f"window_end_{u}_{p}")
+                big_m.used[f"window_start_{u}_{p}"] = m_start
+                big_m.used[f"window_end_{u}_{p}"] = m_end
+            rows += 2
+    return rows
+
+
+def add_time_constraints(model: Model, inst: Instance, Z: tupledict, arrival_time: tupledict,
+                         big_m: BigM) -> int:
+    """Orari di arrivo nei nodi (solo se il percorso è scelto)."""
+    rows = 0
+    for p, arcs in inst.paths.items():
+        for i, (u, v) in enumerate(arcs):
+            if i == 0:
+                model.addConstr(
+                    arrival_time[u] >= inst.timetable[u] * Z[p], name=f"start_time_{p}_{u}"
+                )
+                rows += 1
+            name = f"time_progression_{p}_{u}_{v}"
+            if big_m.mode == INDICATOR:
+                model.addGenConstrIndicator(
+                    Z[p], True, arrival_time[v] >= arrival_time[u] + inst.travel(u, v) + inst.dwell, name=name
+                )
+            else:
+                m = big_m.progression(u, v)
+                model.addConstr(
+                    arrival_time[v] >= arrival_time[u] + inst.travel(u, v) + inst.dwell - (1 - Z[p]) * m, name=name
+                )
+                big_m.used[name] = m
+            rows += 1
+    return rows
+
+
+def add_capacity_constraints(model: Model, inst: Instance, Z: tupledict, x: tupledict) -> int:
+    """Capacità su ogni tratta: passeggeri che passano non devono superare capMax."""
+    rows = 0
+    for arc, pax_ids in inst.arc_to_passengers.items():
+        paths = inst.index.paths_on(arc)
+        if paths:
+            model.addConstr(
+                quicksum(x[i] for i in pax_ids) <= inst.capMax * quicksum(Z[p] for p in paths),
+                name=f"cap_{arc}"
+            )
+            rows += 1
+    return rows
+
+
+def add_service_constraints(model: Model, inst: Instance, Z: tupledict, x: tupledict) -> int:
+    """Il passeggero può essere servito solo se almeno uno dei percorsi validi è attivo."""
+    rows = 0
+    for i, arc in enumerate(inst.passenger_arcs):
+        paths = inst.index.paths_on(arc)
+        if paths:
+            model.addConstr(x[i] <= quicksum(Z[p] for p in paths), name=f"x_path_check_{i}")
+        else:
+            # Se l'arco non è compatibile con alcun percorso, il passeggero non può essere servito
+            model.addConstr(x[i] == 0, name=f"x_invalid_arc_{i}")
+        rows += 1
+    return rows
+
+
+def add_demand_constraints(model: Model, inst: Instance, Z: tupledict, y: tupledict) -> int:
+    """Servizio e capacità nella formulazione aggregata, una riga per arco OD.
+
+    y[a] conta i passeggeri serviti sull'arco a, con 0 <= y[a] <= n_a (domanda).
+    Le righe per passeggero x_i <= somma Z e la capacità somma x_i <= capMax * somma Z
+    si riducono a y[a] <= min(n_a, capMax) * somma Z; gli archi senza percorsi
+    compatibili hanno già limite superiore 0.
+    """
+    rows = 0
+    for arc, pax_ids in inst.arc_to_passengers.items():
+        paths = inst.index.paths_on(arc)
+        if paths:
+            model.addConstr(
+                y[arc] <= min(len(pax_ids), inst.capMax) * quicksum(Z[p] for p in paths),
+                name=f"cap_{arc}"
+            )
+            rows += 1
+    return rows
+
+
+def flow_spans(inst: Instance) -> List[Tuple[str, int, int, int, int]]:
+    """(p, o, d, j0, j1) per ogni arco OD con passeggeri (in ordine di prima comparsa) e percorso compatibile.
+
+    I passeggeri da o a d sul percorso p sono a bordo sugli archi j0, ..., j1 - 1
+    di p, con j0 e j1 le posizioni di o e d tra le stazioni visitate (in entrambi
+    i versi, come ``PathIndex.paths_on``).
+    """
+    # Posizione di ogni stazione lungo il percorso, dagli archi del CSR (come ``Instance.visited``)
+    offsets, ids, arcs = inst.path_offsets, inst.path_arc_ids, inst.arcs
+    position: Dict[str, Dict[int, int]] = {}
+    for k, p in enumerate(inst.paths):
+        pos = position[p] = {}
+        for a in ids[offsets[k]:offsets[k + 1]]:
+            u, v = arcs[a]
+            pos.setdefault(u, len(pos))
+            pos.setdefault(v, len(pos))
+    spans = []
+    for (o, d) in inst.arc_to_passengers:
+        for p in inst.index.paths_on((o, d)):
+            j0, j1 = sorted((position[p][o], position[p][d]))
+            spans.append((p, o, d, j0, j1))
+    return spans
+
+
+def add_load_constraints(model: Model, inst: Instance, Z: tupledict,
+                         served: Mapping[Arc, Any]) -> Tuple[tupledict, tupledict, int]:
+    """Carico a bordo su ogni arco dei percorsi, limitato da capMax.
+
+    flow[p, o, d] conta i passeggeri dell'arco OD (o, d) che viaggiano su p, con
+    somma_p flow[p, o, d] = ``served[o, d]``. Sul j-esimo arco di p sono a bordo
+    i passeggeri saliti fino alla stazione j e non ancora scesi; con le somme
+    prefisse
+
+        load[p, j] = load[p, j - 1] + salite in j - discese in j
+        load[p, j] <= capMax * Z[p]
+
+    ogni flow compare in due righe di carico invece che in una per arco
+    attraversato. Restituisce (flow, load, righe).
+    """
+    spans = flow_spans(inst)
+    demand = inst.arc_to_passengers
+    flow = model.addVars([(p, o, d) for p, o, d, _, _ in spans], ub=[len(demand[o, d]) for _, o, d, _, _ in spans],
+                         vtype=GRB.INTEGER, name="flow")
+    load = model.addVars([(p, u, v) for p, arcs in inst.paths.items() for (u, v) in arcs],
+                         vtype=GRB.CONTINUOUS, name="load")
+
+    rows = 0
+    for arc in demand:
+        paths = inst.index.paths_on(arc)
+        if paths:
+            model.addConstr(quicksum(flow[p, arc[0], arc[1]] for p in paths) == served[arc], name=f"flow_{arc}")
+            rows += 1
+
+    board: Dict[Tuple[str, int], List[Var]] = {}
+    alight: Dict[Tuple[str, int], List[Var]] = {}
+    for p, o, d, j0, j1 in spans:
+        board.setdefault((p, j0), []).append(flow[p, o, d])
+        alight.setdefault((p, j1), []).append(flow[p, o, d])
+    for p, arcs in inst.paths.items():
+        for j, (u, v) in enumerate(arcs):
+            previous = load[(p,) + arcs[j - 1]] if j else 0
+            model.addConstr(
+                load[p, u, v] == previous + quicksum(board.get((p, j), [])) - quicksum(alight.get((p, j), [])),
+                name=f"load_{p}_{u}_{v}"
+            )
+            model.addConstr(load[p, u, v] <= inst.capMax * Z[p], name=f"cap_load_{p}_{u}_{v}")
+            rows += 2
+    return flow, load, rows
+
+
+def add_pax_constraints(model: Model, inst: Instance, x: tupledict, pax_served: Var) -> int:
+    """Conteggio dei passeggeri serviti e numero minimo da servire."""
+    model.addConstr(pax_served == x.sum(), name="pax_served_sum")
+    rows = 1
+    if inst.min_pax_ratio is not None:
+        model.addConstr(pax_served >= inst.min_pax_ratio * inst.num_passengers, name="min_pax_served")
+        rows += 1
+    return rows
+
+
+def add_path_constraints(model: Model, inst: Instance, Z: tupledict) -> int:
+    """Numero massimo di percorsi e vincolo di budget sui percorsi scelti."""
+    rows = 0
+    if inst.max_paths is not None:
+        model.addConstr(quicksum(Z[p] for p in inst.paths) <= inst.max_paths, name="max_one_path")
+        rows += 1
+    if inst.budget is not None and inst.paths_cost is not None:
+        model.addConstr(
+            quicksum(inst.paths_cost[p] * Z[p] for p in inst.paths_cost) <= inst.budget,
+            name="budget_constraint"
+        )
+        rows += 1
+    return rows
+
+
+def delay_keys(inst: Instance, origins_only: bool = False) -> List[Tuple[str, int]]:
+    """Coppie (percorso, stazione) con un termine di ritardo nell'obiettivo.
+
+    Con ``origins_only`` solo le stazioni da cui parte un arco, come nella
+    somma ``for (u, _) in arcs`` di Check.py: la stazione terminale è esclusa.
+    """
+    if origins_only:
+        return [(p, u) for p in inst.paths for u in dict.fromkeys(u for u, _ in inst.paths[p])]
+    return [(p, u) for p in inst.paths for u in inst.visited(p)]
+
+
+def add_delay_terms(model: Model, inst: Instance, Z: tupledict, arrival_time: tupledict,
+                    arrival_ub: Dict[int, float], form: str = MCCORMICK, origins_only: bool = False):
+    """Termini di ritardo per ogni (percorso, stazione) di ``delay_keys``.
+
+    Nella forma quadratica restituisce i prodotti bilineari degli script originali.
+    Nelle forme lineari introduce d[p, u] = (arrival_time[u] - timetable[u]) * Z[p]:
+    con McCormick, dato 0 <= arrival_time[u] <= U = arrival_ub[u], valgono
+
+        (0 - t) Z <= d <= (U - t) Z
+        (a - t) - (U - t)(1 - Z) <= d <= (a - t) - (0 - t)(1 - Z)
+
+    che sono esatti perché Z è binaria. Restituisce (termini, variabili d, righe).
+    """
+    keys = delay_keys(inst, origins_only)
+
+    if form == QUADRATIC:
+        ritardi = [(arrival_time[u] - inst.timetable[u]) * Z[p] for p, u in keys]
+        return ritardi, None, 0
+
+    delay = model.addVars(keys, lb=-GRB.INFINITY, vtype=GRB.CONTINUOUS, name="delay")
+    rows = 0
+    for p, u in keys:
+        t, U = inst.timetable[u], arrival_ub[u]
+        d, a, z = delay[p, u], arrival_time[u], Z[p]
+        if form == MCCORMICK:
+            model.addConstr(d >= -t * z, name=f"delay_lb_{p}_{u}")
+            model.addConstr(d <= (U - t) * z, name=f"delay_ub_{p}_{u}")
+            model.addConstr(d >= a - t - (U - t) * (1 - z), name=f"delay_on_lb_{p}_{u}")
+            model.addConstr(d <= a - t + t * (1 - z), name=f"delay_on_ub_{p}_{u}")
+            rows += 4
+        else:
+            model.addGenConstrIndicator(z, True, d - a == -t, name=f"delay_on_{p}_{u}")
+            model.addGenConstrIndicator(z, False, d == 0, name=f"delay_off_{p}_{u}")
+            rows += 2
+    return [delay[k] for k in keys], delay, rows
+
+
+def legacy_rows(inst: Instance) -> int:
+    """Righe che la formulazione originale degli script emetteva per finestre, servizio e capacità.
+
+    Per ogni passeggero servibile: finestra inizio/fine e x_path_check per *ogni*
+    percorso, poi di nuovo finestra per ogni percorso rilevante e un ultimo
+    x_path_check; per i passeggeri non servibili un solo x_invalid_arc. La
+    capacità era emessa per ogni coppia i < j coperta da un percorso, anche senza
+    passeggeri: le coppie si contano raggruppando le stazioni per bitmask.
+    """
+    num_paths = len(inst.paths)
+    rows = 0
+    for arc in inst.passenger_arcs:
+        paths = inst.index.paths_on(arc)
+        rows += 3 * num_paths + 2 * len(paths) + 1 if paths else 1
+    groups: Dict[int, int] = {}
+    for s in inst.nodi:
+        mask = inst.index.station_mask.get(s, 0)
+        groups[mask] = groups.get(mask, 0) + 1
+    masks = list(groups)
+    for a, m1 in enumerate(masks):
+        if m1:
+            rows += groups[m1] * (groups[m1] - 1) // 2
+        for m2 in masks[a + 1:]:
+            if m1 & m2:
+                rows += groups[m1] * groups[m2]
+    return rows
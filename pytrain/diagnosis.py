@@ -0,0 +1,182 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Union
+
+from .heuristic import GreedySolver
+from .highs import HighsModel
+from .instance import Instance
+from .model import PathSelectionModel
+
+# Livelli di diagnosi, dal più economico
+PRECHECK = "precheck"  # controlli strutturali sull'istanza, senza costruire il modello
+RELAX = "relax"  # feasRelax con limite di tempo: vincoli da allentare e di quanto (solo Gurobi)
+IIS = "iis"  # computeIIS con limite di tempo (HiGHS: IIS del rilassamento continuo)
+TIERS = (PRECHECK, RELAX, IIS)
+
+
+# ================================
+# === DIAGNOSI INFEASIBILITÀ ====
+# ================================
+
+@dataclass
+class Issue:
+    """Causa di infeasibilità trovata dai controlli strutturali."""
+
+    code: str  # "budget", "window", "min_pax"
+    message: str
+    # True se da sola rende il modello infeasibile
+    blocking: bool = False
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Diagnosis:
+    issues: List[Issue] = field(default_factory=list)
+    # Vincolo -> violazione minima nella soluzione del rilassamento
+    relaxation: Dict[str, float] = field(default_factory=dict)
+    # Stesso formato di PathSelectionModel.compute_iis; "complete" è False se interrotto dal limite di tempo
+    iis: Optional[Dict[str, Any]] = None
+    # Ultimo livello eseguito
+    tier: str = PRECHECK
+    # Livelli richiesti ma non disponibili per il backend del modello
+    skipped: List[str] = field(default_factory=list)
+
+    @property
+    def blocking(self) -> List[Issue]:
+        return [i for i in self.issues if i.blocking]
+
+
+def precheck(inst: Instance) -> List[Issue]:
+    """Controlli strutturali, prima di costruire il modello.
+
+    Un percorso è inutilizzabile se costa più del budget o se, scelto da solo,
+    arriva dopo la chiusura di una finestra di prelievo: aggiungere altri
+    percorsi sposta gli orari solo in avanti, quindi non può mai essere scelto.
+    Con i percorsi rimasti, la domanda servibile è al più
+    somma_a min(n_a, capMax * percorsi compatibili con a).
+    """
+    issues: List[Issue] = []
+    costs = inst.paths_cost or {}
+    greedy = GreedySolver(inst)
+    required = inst.min_pax_ratio * inst.num_passengers if inst.min_pax_ratio is not None else 0.0
+
+    usable = set(inst.paths)
+    if inst.budget is not None and costs:
+        over = sorted(p for p in inst.paths if costs.get(p, 0) > inst.budget)
+        usable -= set(over)
+        if over:
+            cheapest = min(costs.get(p, 0) for p in inst.paths)
+            issues.append(Issue(
+                "budget",
+                f"Percorsi oltre il budget {inst.budget}: {', '.join(over)} (costo minimo {cheapest})",
+                blocking=not usable and required > 0,
+                details={"paths": over, "cheapest": cheapest},
+            ))
+
+    late = {}
+    for p in sorted(usable):
+        arrival = greedy.schedule(frozenset([p]), check_windows=False)
+        # Stazione -> (orario minimo, chiusura della finestra)
+        missed = {u: (arrival[u], end) for u, (_, end) in greedy.windows.items()
+                  if u in arrival and arrival[u] > end + 1e-9}
+        if missed:
+            late[p] = missed
+    if late:
+        usable -= set(late)
+        stations = {p: ", ".join(str(u) for u in sorted(missed)) for p, missed in late.items()}
+        issues.append(Issue(
+            "window",
+            "Percorsi che mancano una finestra di prelievo anche da soli: "
+            + "; ".join(f"{p} (stazioni {s})" for p, s in stations.items()),
+            blocking=not usable and required > 0,
+            details={"paths": late},
+        ))
+
+    if required > 0:
+        k_max = inst.max_paths if inst.max_paths is not None else len(usable)
+        reachable = 0
+        for arc, pax_ids in inst.arc_to_passengers.items():
+            k = min(sum(1 for p in inst.index.paths_on(arc) if p in usable), k_max)
+            reachable += min(len(pax_ids), inst.capMax * k)
+        if reachable < required - 1e-9:
+            issues.append(Issue(
+                "min_pax",
+                f"Passeggeri servibili al più {reachable}, minimo richiesto {required:g} "
+                f"({inst.min_pax_ratio:.0%} di {inst.num_passengers})",
+                blocking=True,
+                details={"reachable": reachable, "required": required, "usable_paths": sorted(usable)},
+            ))
+    return issues
+
+
+def diagnose(pm: Union[PathSelectionModel, HighsModel], tiers=TIERS, time_limit: float = 10.0,
+             stop_at_blocking: bool = True) -> Diagnosis:
+    """Diagnosi a livelli: controlli strutturali, poi feasRelax, poi IIS, ognuno con ``time_limit`` secondi.
+
+    Con ``stop_at_blocking`` si ferma ai controlli strutturali se uno basta a
+    spiegare l'infeasibilità. Con ``HighsModel`` feasRelax non è disponibile
+    (finisce in ``skipped``) e l'IIS è quello del rilassamento continuo.
+    """
+    diagnosis = Diagnosis()
+    if PRECHECK in tiers:
+        diagnosis.issues = precheck(pm.instance)
+        if stop_at_blocking and diagnosis.blocking:
+            return diagnosis
+
+    highs = isinstance(pm, HighsModel)
+    if (pm.highs if highs else pm.model) is None:
+        pm.build()
+    if RELAX in tiers:
+        if highs:
+            diagnosis.skipped.append(RELAX)
+        else:
+            diagnosis.tier = RELAX
+            diagnosis.relaxation = _relax(pm, time_limit)
+            if diagnosis.relaxation:
+                return diagnosis
+
+    if IIS in tiers:
+        diagnosis.tier = IIS
+        diagnosis.iis = _highs_iis(pm, time_limit) if highs else _gurobi_iis(pm, time_limit)
+    return diagnosis
+
+
+def _gurobi_iis(pm: PathSelectionModel, time_limit: float) -> Dict[str, Any]:
+    model = pm.model
+    previous = model.Params.TimeLimit
+    model.Params.TimeLimit = time_limit
+    try:
+        iis = pm.compute_iis()
+        iis["complete"] = model.IISMinimal == 1
+    finally:
+        model.Params.TimeLimit = previous
+    return iis
+
+
+def _highs_iis(pm: HighsModel, time_limit: float) -> Dict[str, Any]:
+    h = pm.highs
+    previous = h.getOptionValue("time_limit")[1]
+    h.setOptionValue("time_limit", float(time_limit))
+    try:
+        return pm.compute_iis()
+    finally:
+        h.setOptionValue("time_limit", previous)
+
+
+def _relax(pm: PathSelectionModel, time_limit: float) -> Dict[str, float]:
+    """Minima somma delle violazioni dei vincoli lineari (su una copia del modello)."""
+    relaxed = pm.model.copy()
+    relaxed.Params.OutputFlag = 0
+    relaxed.Params.TimeLimit = time_limit
+    relaxed.setObjective(0.0)
+    # relaxobjtype=0: somma delle violazioni; solo vincoli, limiti delle variabili invariati
+    relaxed.feasRelaxS(0, False, False, True)
+    relaxed.optimize()
+    if relaxed.SolCount == 0:
+        return {}
+    violation: Dict[str, float] = {}
+    artificial = [v for v in relaxed.getVars() if v.VarName.startswith(("ArtP_", "ArtN_"))]
+    for v, value in zip(artificial, relaxed.getAttr("X", artificial)):
+        if value > 1e-6:
+            name = v.VarName[5:]
+            violation[name] = violation.get(name, 0.0) + value
+    return violation
@@ -0,0 +1,242 @@
+import time
+from typing import Dict, List, Optional, Tuple, FrozenSet, Mapping, Collection
+
+from .constraints import LOAD, delay_keys, flow_spans
+from .instance import Arc, Instance
+from .model import PathSelectionModel, MAX_PAX, MIN_RIT, CHECK
+from .result import PathSelectionResult, SUBOPTIMAL, NOT_SOLVED
+
+# Stati restituiti: soluzione ammissibile non dimostrata ottima, oppure nessuna soluzione
+FOUND = SUBOPTIMAL
+NOT_FOUND = NOT_SOLVED
+
+
+# =========================
+# === EURISTICA GREEDY ====
+# =========================
+# Sceglie un insieme di percorsi con una costruzione greedy seguita da ricerca
+# locale (aggiunta, rimozione, scambio di un percorso). Ogni insieme è valutato
+# in modo esatto rispetto al modello: orari minimi sugli archi dei percorsi
+# scelti (con attesa all'apertura delle finestre), finestre di prelievo,
+# capacità (carico a bordo o per arco OD), budget, numero massimo di percorsi e minimo di
+# passeggeri serviti. Non risolve alcun modello Gurobi: il risultato si usa da
+# solo oppure come MIP start di PathSelectionModel.
+
+class _Evaluation:
+    __slots__ = ("feasible", "score", "shortfall", "served", "arrival", "delay")
+
+    def __init__(self, feasible, score, shortfall, served, arrival, delay):
+        self.feasible = feasible
+        self.score = score
+        self.shortfall = shortfall
+        self.served = served
+        self.arrival = arrival
+        self.delay = delay
+
+    def better_than(self, other: Optional["_Evaluation"]) -> bool:
+        if other is None:
+            return True
+        if self.feasible != other.feasible:
+            return self.feasible
+        if not self.feasible:
+            return self.shortfall < other.shortfall - 1e-9
+        return self.score > other.score + 1e-9
+
+
+def assign_flows(inst: Instance, selected: Collection[str], requested: Mapping[Arc, int],
+                 spans: Optional[Dict[Arc, List[Tuple[str, int, int]]]] = None) -> Dict[Tuple[str, int, int], int]:
+    """Passeggeri per (percorso, o, d) senza superare capMax su nessun arco dei percorsi scelti.
+
+    Gli archi OD si assegnano per destinazione più vicina nella timetable, a
+    ogni percorso scelto compatibile finché c'è posto su tutti gli archi
+    attraversati (con un solo percorso l'assegnazione è ottima). ``spans`` è
+    ``constraints.flow_spans`` raggruppato per arco OD, se già calcolato.
+    """
+    if spans is None:
+        spans = {}
+        for p, o, d, j0, j1 in flow_spans(inst):
+            spans.setdefault((o, d), []).append((p, j0, j1))
+    t = inst.timetable
+    load = {p: [0] * len(inst.paths[p]) for p in selected}
+    flows: Dict[Tuple[str, int, int], int] = {}
+    for arc in sorted(requested, key=lambda a: (t.get(a[1], 0), -t.get(a[0], 0))):
+        left = requested[arc]
+        for p, j0, j1 in spans.get(arc, ()):
+            if left <= 0:
+                break
+            if p not in load:
+                continue
+            k = min(left, inst.capMax - max(load[p][j0:j1]))
+            if k > 0:
+                for j in range(j0, j1):
+                    load[p][j] += k
+                flows[p, arc[0], arc[1]] = k
+                left -= k
+    return flows
+
+
+class GreedySolver:
+    """Euristica per la selezione percorsi, utilizzabile da sola o come MIP start."""
+
+    def __init__(self, instance: Instance, objective: str = MAX_PAX, delay_weight: float = 0.5,
+                 max_rounds: int = 100, capacity: str = LOAD):
+        self.instance = instance
+        self.objective = objective
+        self.delay_weight = delay_weight
+        self.max_rounds = max_rounds
+        self.capacity = capacity
+
+        inst = instance
+        self.demand = {arc: len(pax_ids) for arc, pax_ids in inst.arc_to_passengers.items()}
+        index = inst.index
+        # Origini con vincoli di finestra (come in constraints.add_window_constraints)
+        pickup_window = inst.pickup_window
+        self.windows = {arc[0]: pickup_window.get(arc[0], (0, 1e5)) for arc in self.demand if index.paths_on(arc)}
+        self.costs = inst.paths_cost or {}
+        self.min_pax = inst.min_pax_ratio * inst.num_passengers if inst.min_pax_ratio is not None else None
+        # Stesse stazioni dei termini di ritardo del modello (solo partenze degli archi con CHECK)
+        self.delay_keys = delay_keys(inst, origins_only=objective == CHECK)
+        self.spans: Dict[Arc, List[Tuple[str, int, int]]] = {}
+        if capacity == LOAD:
+            for p, o, d, j0, j1 in flow_spans(inst):
+                self.spans.setdefault((o, d), []).append((p, j0, j1))
+
+    # --- Valutazione di un insieme di percorsi ---
+
+    def schedule(self, selected: FrozenSet[str], check_windows: bool = True) -> Optional[Dict[int, float]]:
+        """Orari minimi che rispettano partenze, progressioni e aperture delle finestre, o None.
+
+        Con ``check_windows`` restituisce None anche se un orario supera la chiusura di una finestra.
+        """
+        inst = self.instance
+        arrival: Dict[int, float] = {}
+        for p in selected:
+            u0 = inst.paths[p][0][0]
+            arrival[u0] = max(arrival.get(u0, 0.0), inst.timetable[u0])
+            for n in inst.path_nodes[p]:
+                start = self.windows[n][0] if n in self.windows else 0.0
+                arrival[n] = max(arrival.get(n, 0.0), start)
+        arcs = sorted(set(arc for p in selected for arc in inst.paths[p]))
+        for _ in range(len(arrival) + 1):
+            changed = False
+            for (u, v) in arcs:
+                t = arrival[u] + inst.travel(u, v) + inst.dwell
+                if t > arrival[v] + 1e-9:
+                    arrival[v] = t
+                    changed = True
+            if not changed:
+                break
+        else:
+            # Ciclo tra percorsi scelti: orari illimitati
+            return None
+        if check_windows:
+            for n, (_, end) in self.windows.items():
+                if n in arrival and arrival[n] > end + 1e-9:
+                    return None
+        return arrival
+
+    def evaluate(self, selected: FrozenSet[str]) -> _Evaluation:
+        inst = self.instance
+        infeasible = _Evaluation(False, float("-inf"), float("inf"), {}, {}, 0.0)
+        if inst.max_paths is not None and len(selected) > inst.max_paths:
+            return infeasible
+        if inst.budget is not None and sum(self.costs.get(p, 0) for p in selected) > inst.budget + 1e-9:
+            return infeasible
+        arrival = self.schedule(selected)
+        if arrival is None:
+            return infeasible
+
+        served: Dict[Arc, int] = {}
+        if self.capacity == LOAD:
+            # Passeggeri serviti per arco OD, con il carico a bordo entro capMax
+            for (_, o, d), k in assign_flows(inst, selected, self.demand, self.spans).items():
+                served[o, d] = served.get((o, d), 0) + k
+        else:
+            # Passeggeri serviti per arco OD: min(domanda, capMax * percorsi scelti compatibili)
+            for arc, n in self.demand.items():
+                k = sum(1 for p in inst.index.paths_on(arc) if p in selected)
+                if k:
+                    served[arc] = min(n, inst.capMax * k)
+        pax = sum(served.values())
+        delay = sum(arrival[u] - inst.timetable[u] for p, u in self.delay_keys if p in selected)
+
+        shortfall = max(0.0, self.min_pax - pax) if self.min_pax is not None else 0.0
+        if self.objective == MAX_PAX:
+            score = pax
+        elif self.objective == MIN_RIT:
+            score = -delay
+        else:
+            score = pax - self.delay_weight * delay
+        return _Evaluation(shortfall <= 1e-9, score, shortfall, served, arrival, delay)
+
+    # --- Ricerca ---
+
+    def _neighbours(self, selected: FrozenSet[str]):
+        paths = list(self.instance.paths)
+        for p in paths:
+            if p in selected:
+                yield selected - {p}
+            else:
+                yield selected | {p}
+                for q in selected:
+                    yield (selected - {q}) | {p}
+
+    def search(self) -> Tuple[FrozenSet[str], _Evaluation]:
+        # Partenze: insieme vuoto e ogni percorso singolo
+        starts = [frozenset()] + [frozenset([p]) for p in self.instance.paths]
+        best_set, best = frozenset(), None
+        for start in starts:
+            current, value = start, self.evaluate(start)
+            for _ in range(self.max_rounds):
+                move = None
+                for candidate in self._neighbours(current):
+                    ev = self.evaluate(candidate)
+                    if ev.better_than(value if move is None else move[1]):
+                        move = (candidate, ev)
+                if move is None:
+                    break
+                current, value = move
+            if value.better_than(best):
+                best_set, best = current, value
+        return best_set, best
+
+    def solve(self) -> PathSelectionResult:
+        inst = self.instance
+        t0 = time.perf_counter()
+        selected, ev = self.search()
+        if not ev.feasible:
+            return PathSelectionResult(status=NOT_FOUND, objective=self.objective, runtime=time.perf_counter() - t0)
+
+        result = PathSelectionResult(status=FOUND, objective=self.objective)
+        result.selected_paths = [p for p in inst.paths if p in selected]
+        arc_to_passengers = inst.arc_to_passengers
+        result.served_passengers = sorted(i for arc, k in ev.served.items() for i in arc_to_passengers[arc][:k])
+        result.pax_served = len(result.served_passengers)
+        # Stazioni non toccate dai percorsi scelti: orario libero, si usa la timetable
+        result.arrival_times = {s: ev.arrival.get(s, inst.timetable.get(s, 0.0)) for s in inst.nodi}
+        for p in result.selected_paths:
+            for s in sorted(inst.path_nodes[p]):
+                if s in inst.timetable:
+                    result.delays[(p, s)] = result.arrival_times[s] - inst.timetable[s]
+        if self.objective == MAX_PAX:
+            result.obj_val = result.pax_served
+        elif self.objective == MIN_RIT:
+            result.obj_val = ev.delay
+        else:
+            result.obj_val = self.delay_weight * ev.delay - result.pax_served
+        result.runtime = time.perf_counter() - t0
+        return result
+
+
+def greedy_solve(instance: Instance, objective: str = MAX_PAX, delay_weight: float = 0.5,
+                 capacity: str = LOAD) -> PathSelectionResult:
+    """Soluzione euristica senza risolvere il MIP."""
+    return GreedySolver(instance, objective, delay_weight, capacity=capacity).solve()
+
+
+def heuristic_start(pm: PathSelectionModel) -> PathSelectionResult:
+    """Imposta la soluzione euristica come MIP start del modello e la restituisce."""
+    result = greedy_solve(pm.instance, pm.objective, pm.delay_weight, pm.capacity)
+    if result.status == FOUND:
+        pm.set_start(result)
+    return result
@@ -0,0 +1,274 @@
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Any
+
+import numpy as np
+from gurobipy import GRB
+
+from .constraints import BigM, BIG_M_MODES, INDICATOR, TIGHT, CAPACITY_MODES, LOAD
+from .heuristic import assign_flows
+from .instance import Arc, Instance
+from .matrix import assemble, MatrixProblem
+from .model import MAX_PAX, MIN_RIT, CHECK, OBJECTIVES
+from .profiling import Profiler
+from .result import PathSelectionResult, Incumbent, path_delays, NOT_SOLVED
+
+# Stato del modello HiGHS -> codice di stato Gurobi, così PathSelectionResult non cambia
+_STATUS = {
+    "kOptimal": GRB.OPTIMAL,
+    "kInfeasible": GRB.INFEASIBLE,
+    "kUnboundedOrInfeasible": GRB.INF_OR_UNBD,
+    "kUnbounded": GRB.UNBOUNDED,
+    "kObjectiveBound": GRB.CUTOFF,
+    "kIterationLimit": GRB.ITERATION_LIMIT,
+    "kTimeLimit": GRB.TIME_LIMIT,
+    "kSolutionLimit": GRB.SOLUTION_LIMIT,
+    "kInterrupt": GRB.INTERRUPTED,
+    "kHighsInterrupt": GRB.INTERRUPTED,
+    "kObjectiveTarget": GRB.USER_OBJ_LIMIT,
+    "kMemoryLimit": GRB.MEM_LIMIT,
+}
+# highspy.SolutionStatus.kSolutionStatusFeasible (highspy si importa solo quando serve)
+_SOLUTION_FEASIBLE = 2
+
+
+# ======================
+# === BACKEND HIGHS ====
+# ======================
+
+class HighsModel:
+    """Lo stesso modello di ``PathSelectionModel``, risolto con HiGHS (highspy).
+
+    Non serve una licenza Gurobi. Variabili e vincoli vengono da
+    ``matrix.assemble`` con gli stessi nomi; i ritardi usano l'inviluppo di
+    McCormick. HiGHS non ha vincoli indicatori, quindi i Big-M devono essere
+    espliciti (``TIGHT`` o ``FIXED``). ``options`` sono opzioni HiGHS
+    (es. ``{"time_limit": 60, "threads": 1, "output_flag": False}``).
+    """
+
+    def __init__(self, instance: Instance, objective: str = MAX_PAX, delay_weight: float = 0.5,
+                 options: Optional[Dict[str, Any]] = None, big_m: str = TIGHT, capacity: str = LOAD,
+                 profiler: Optional[Profiler] = None):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Funzione obiettivo sconosciuta: {objective!r} (attese: {', '.join(OBJECTIVES)})")
+        if big_m not in BIG_M_MODES or big_m == INDICATOR:
+            raise ValueError(f"Big-M non supportato da HiGHS: {big_m!r} (vincoli indicatori non disponibili)")
+        if capacity not in CAPACITY_MODES:
+            raise ValueError(f"Capacità sconosciuta: {capacity!r} (attese: {', '.join(CAPACITY_MODES)})")
+        self.instance = instance
+        self.objective = objective
+        self.delay_weight = delay_weight
+        self.big_m = big_m
+        self.capacity = capacity
+        self.options = dict(options or {})
+        # Tempi per fase (senza contatori per famiglia né gap MIP, vedi profiling.py)
+        self.profiler = profiler
+        self.highs = None
+        self.problem: Optional[MatrixProblem] = None
+        self.stats: Dict[str, Any] = {}
+        self._runtime = 0.0
+        # Ultima soluzione trovata (valori di tutte le colonne), riusata come soluzione iniziale
+        self._start: Optional[np.ndarray] = None
+
+    def build(self) -> "HighsModel":
+        try:
+            import highspy
+        except ImportError:
+            raise ImportError("Per il backend HiGHS serve highspy (pip install highspy)") from None
+
+        inst = self.instance
+        with self.phase("big_m"):
+            big_m = BigM(inst, self.big_m)
+        with self.phase("matrix"):
+            problem = assemble(inst, big_m, delays=self.objective != MAX_PAX, capacity=self.capacity,
+                               origins_only=self.objective == CHECK)
+        self.stats["big_m"] = big_m.used
+        self.stats["rows"] = problem.rows
+
+        # Funzione obiettivo sulle colonne pax_served e d[p, u]
+        cost = np.zeros(problem.num_cols)
+        delay_cols = list(problem.delay_col.values())
+        if self.objective == MAX_PAX:
+            cost[problem.col_pax] = 1.0
+        elif self.objective == MIN_RIT:
+            cost[delay_cols] = 1.0
+        else:
+            cost[delay_cols] = self.delay_weight
+            cost[problem.col_pax] = -1.0
+
+        lp = highspy.HighsLp()
+        lp.num_col_ = problem.num_cols
+        lp.num_row_ = len(problem.row_names)
+        lp.sense_ = highspy.ObjSense.kMaximize if self.objective == MAX_PAX else highspy.ObjSense.kMinimize
+        lp.col_cost_ = cost
+        lp.col_lower_ = problem.lb
+        lp.col_upper_ = problem.ub
+        lp.row_lower_ = np.where(problem.sense == "<", -np.inf, problem.rhs)
+        lp.row_upper_ = np.where(problem.sense == ">", np.inf, problem.rhs)
+        A = problem.A
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.num_col_ = problem.num_cols
+        lp.a_matrix_.num_row_ = A.shape[0]
+        lp.a_matrix_.start_ = A.indptr
+        lp.a_matrix_.index_ = A.indices
+        lp.a_matrix_.value_ = A.data
+        integer, continuous = highspy.HighsVarType.kInteger, highspy.HighsVarType.kContinuous
+        lp.integrality_ = [continuous if t == "C" else integer for t in problem.vtype]
+        lp.col_names_ = problem.names
+        lp.row_names_ = problem.row_names
+
+        h = highspy.Highs()
+        for name, value in self.options.items():
+            h.setOptionValue(name, value)
+        with self.phase("load"):
+            h.passModel(lp)
+        self.highs = h
+        self.problem = problem
+        return self
+
+    # ======================
+    # === RISOLUZIONE ===
+    # ======================
+
+    def solve(self, warm_start: bool = True, time_limit: Optional[float] = None, mip_gap: Optional[float] = None,
+              on_incumbent: Optional[Callable[[Incumbent], None]] = None) -> PathSelectionResult:
+        """Risolve il modello; con ``warm_start`` parte dall'ultima soluzione trovata.
+
+        ``time_limit``, ``mip_gap`` e ``on_incumbent`` come in ``PathSelectionModel.solve``.
+        """
+        if self.highs is None:
+            self.build()
+        h = self.highs
+        if warm_start and self._start is not None:
+            h.setSolution(len(self._start), np.arange(len(self._start), dtype=np.int32), self._start)
+        limits = {name: float(value) for name, value in (("time_limit", time_limit), ("mip_rel_gap", mip_gap))
+                  if value is not None}
+        saved = {name: h.getOptionValue(name)[1] for name in limits}
+        for name, value in limits.items():
+            h.setOptionValue(name, value)
+        callback = self._incumbent_callback(on_incumbent) if on_incumbent is not None else None
+        if callback is not None:
+            h.cbMipImprovingSolution.subscribe(callback)
+        t0 = time.perf_counter()
+        try:
+            with self.phase("optimize"):
+                h.run()
+        finally:
+            self._runtime = time.perf_counter() - t0
+            if callback is not None:
+                h.cbMipImprovingSolution.unsubscribe(callback)
+            for name, value in saved.items():
+                h.setOptionValue(name, value)
+        if h.getInfo().primal_solution_status == _SOLUTION_FEASIBLE:
+            self._start = np.array(h.getSolution().col_value)
+        with self.phase("result"):
+            return self.result()
+
+    def _incumbent_callback(self, on_incumbent: Callable[[Incumbent], None]) -> Callable:
+        inst, problem = self.instance, self.problem
+
+        def callback(event) -> None:
+            data = event.data_out
+            values = np.asarray(data.mip_solution)
+            selected = [p for p in inst.paths if values[problem.path_col[p]] > 0.5]
+            arrival_times = {s: float(values[problem.col_arrival + s]) for s in inst.nodi}
+            on_incumbent(Incumbent(
+                runtime=data.running_time, obj_val=data.objective_function_value, bound=data.mip_dual_bound,
+                gap=data.mip_gap, selected_paths=selected, pax_served=int(round(values[problem.col_pax])),
+                delays=path_delays(inst, selected, arrival_times),
+            ))
+        return callback
+
+    def phase(self, name: str):
+        """Fase misurata dal profiler, se presente."""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.phase(name)
+
+    def set_start(self, result: PathSelectionResult) -> None:
+        """Soluzione iniziale da una soluzione esterna (es. ``heuristic.greedy_solve``)."""
+        if self.highs is None:
+            self.build()
+        inst, problem = self.instance, self.problem
+        selected, served = set(result.selected_paths), set(result.served_passengers)
+        values = np.zeros(problem.num_cols)
+        for p, k in problem.path_col.items():
+            values[k] = float(p in selected)
+        for s in inst.nodi:
+            values[problem.col_arrival + s] = result.arrival_times.get(s, 0.0)
+        values[problem.col_pax] = len(served)
+        values[problem.col_x + np.fromiter(served, dtype=np.int64, count=len(served))] = 1.0
+        if problem.flow_keys:
+            # Passeggeri serviti distribuiti sui percorsi scelti, poi carico a bordo per arco
+            requested: Dict[Arc, int] = {}
+            for i in served:
+                arc = inst.passenger_arcs[i]
+                requested[arc] = requested.get(arc, 0) + 1
+            flows = assign_flows(inst, selected, requested)
+            position = {key: k for k, key in enumerate(problem.flow_keys)}
+            for key, k in flows.items():
+                values[problem.col_flow + position[key]] = k
+            load = {key: 0.0 for key in problem.load_keys}
+            for (p, o, d), k in flows.items():
+                arcs = inst.paths[p]
+                j0, j1 = sorted((inst.visited(p).index(o), inst.visited(p).index(d)))
+                for (u, v) in arcs[j0:j1]:
+                    load[p, u, v] += k
+            values[problem.col_load:problem.col_load + len(load)] = list(load.values())
+        for (p, u), k in problem.delay_col.items():
+            values[k] = (values[problem.col_arrival + u] - inst.timetable[u]) * float(p in selected)
+        self._start = values
+
+    def result(self) -> PathSelectionResult:
+        """Legge la soluzione corrente del modello."""
+        h = self.highs
+        status = _STATUS.get(h.getModelStatus().name, NOT_SOLVED)
+        result = PathSelectionResult(status=status, objective=self.objective, runtime=self._runtime)
+        # Anche fermato prima dell'ottimo si legge il miglior incumbent (soluzione primale ammissibile)
+        info = h.getInfo()
+        if info.primal_solution_status != _SOLUTION_FEASIBLE:
+            return result
+
+        inst, problem = self.instance, self.problem
+        values = np.array(h.getSolution().col_value)
+        result.obj_val = info.objective_function_value
+        # Senza bound (es. fermato sul MIP start) HiGHS dà gap NaN: infinito, come Gurobi
+        result.gap = float(info.mip_gap) if not np.isnan(info.mip_gap) else float("inf")
+        result.selected_paths = [p for p in inst.paths if values[problem.path_col[p]] > 0.5]
+        result.pax_served = int(round(values[problem.col_pax]))
+        x = values[problem.col_x:problem.col_x + inst.num_passengers]
+        result.served_passengers = np.flatnonzero(x > 0.5).tolist()
+        result.arrival_times = {s: float(values[problem.col_arrival + s]) for s in inst.nodi}
+        result.delays = path_delays(inst, result.selected_paths, result.arrival_times)
+        return result
+
+    def compute_iis(self) -> Dict[str, List]:
+        """IIS del rilassamento continuo (HiGHS non calcola IIS per problemi interi).
+
+        Se l'infeasibilità dipende solo dall'interezza, il rilassamento è
+        ammissibile e le liste restano vuote. "complete" è False se HiGHS non
+        ha un IIS valido (per esempio per il limite di tempo).
+        """
+        import highspy
+
+        h, problem = self.highs, self.problem
+        cols = np.arange(problem.num_cols, dtype=np.int32)
+        integrality = np.array([t != "C" for t in problem.vtype])
+        kinds = highspy.HighsVarType
+        h.changeColsIntegrality(problem.num_cols, cols, np.full(problem.num_cols, kinds.kContinuous))
+        h.setOptionValue("iis_strategy", int(highspy.IisStrategy.kIisStrategyFromLp)
+                         | int(highspy.IisStrategy.kIisStrategyIrreducible))
+        try:
+            with self.phase("iis"):
+                _, iis = h.getIis()
+        finally:
+            h.changeColsIntegrality(problem.num_cols, cols,
+                                    np.where(integrality, kinds.kInteger, kinds.kContinuous))
+
+        bounds = {int(highspy.IisBoundStatus.kIisBoundStatusLower): ["LB"],
+                  int(highspy.IisBoundStatus.kIisBoundStatusUpper): ["UB"],
+                  int(highspy.IisBoundStatus.kIisBoundStatusBoxed): ["LB", "UB"]}
+        constrs = [problem.row_names[i] for i in iis.row_index_]
+        variables = [(problem.names[j], bounds[int(b)]) for j, b in zip(iis.col_index_, iis.col_bound_)
+                     if int(b) in bounds]
+        return {"constrs": constrs, "vars": variables, "complete": bool(iis.valid_)}
@@ -0,0 +1,251 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Set
+
+from gurobipy import quicksum
+
+from .instance import Instance
+from .model import PathSelectionModel, MAX_PAX, MIN_RIT
+from .result import PathSelectionResult, path_delays, OPTIMAL, SUBOPTIMAL, INFEASIBLE
+
+# Stato del risultato unito: ammissibile ma senza garanzia di ottimalità
+STITCHED = SUBOPTIMAL
+
+
+# ==========================
+# === ORIZZONTE MOBILE =====
+# ==========================
+# La giornata viene divisa in finestre temporali sulla timetable, lunghe
+# ``window`` minuti e sovrapposte di ``overlap``: la finestra k va da
+# T0 + k * passo a T0 + k * passo + window, con passo = window - overlap, e
+# conferma solo le stazioni con timetable prima dell'inizio della finestra
+# successiva (la parte sovrapposta è solo previsione).
+#
+# - Un passeggero appartiene alla finestra in cui cade l'origine; la finestra
+#   si allunga fino alla timetable della destinazione più lontana dei suoi
+#   passeggeri, così anche i viaggi a cavallo di due finestre sono servibili.
+# - Un passeggero servito con destinazione oltre la parte confermata passa alle
+#   finestre successive con x = 1 fisso (e la finestra si estende all'indietro
+#   fino alla sua origine), così il suo posto a bordo resta nei vincoli di
+#   capacità finché la destinazione non è confermata.
+# - Le stazioni già confermate che ricompaiono in una finestra (confine da cui i
+#   percorsi entrano, o origini di passeggeri trasportati) hanno arrival_time
+#   fisso al valore confermato, se un percorso scelto le ha raggiunte.
+# - Z[p] si decide una volta sola: quando un arco di p arriva in una stazione
+#   confermata, la scelta della finestra diventa definitiva e nelle finestre
+#   successive Z[p] è fisso. Budget e numero massimo di percorsi valgono per
+#   l'intera giornata (i percorsi già scelti fuori dalla finestra li consumano).
+# - Il minimo di passeggeri vale sui passeggeri propri di ogni finestra. Se una
+#   finestra non ha soluzione si riprova senza minimo; se non ne ha ancora, o
+#   se alla fine il minimo della giornata non è raggiunto, il risultato unito
+#   non ha piano e prende lo stato della finestra (o INFEASIBLE).
+#
+# Il piano unito rispetta tutti i vincoli del modello completo sugli archi dei
+# percorsi scelti, ma non è ottimo in generale: ha stato STITCHED.
+
+@dataclass
+class WindowResult:
+    start: float
+    end: float
+    # Stazioni confermate da questa finestra
+    committed: List[int]
+    result: PathSelectionResult
+    # Passeggeri serviti per la prima volta in questa finestra (indici dell'istanza completa)
+    served_passengers: List[int] = field(default_factory=list)
+
+
+@dataclass
+class HorizonResult:
+    result: PathSelectionResult
+    windows: List[WindowResult] = field(default_factory=list)
+    # Passeggeri con destinazione prima dell'origine nella timetable (mai servibili per finestre)
+    dropped: List[int] = field(default_factory=list)
+
+
+class RollingHorizon:
+    """Selezione percorsi su una giornata intera, risolta per finestre temporali sovrapposte.
+
+    ``model_args`` va a ``PathSelectionModel`` (env, params, delay_form, ...).
+    """
+
+    def __init__(self, instance: Instance, window: float, overlap: float = 0.0, objective: str = MAX_PAX,
+                 delay_weight: float = 0.5, **model_args: Any):
+        if not 0 <= overlap < window:
+            raise ValueError(f"Sovrapposizione non valida: {overlap} (deve essere in [0, {window}))")
+        self.instance = instance
+        self.window = window
+        self.overlap = overlap
+        self.objective = objective
+        self.delay_weight = delay_weight
+        self.model_args = model_args
+
+    def _subinstance(self, stations: Set[int], boundary: Set[int], timetable: Dict[int, float],
+                     passengers: List[int], decided: Dict[str, bool], min_pax_ratio: Optional[float]) -> Instance:
+        """Archi dei percorsi che arrivano in una stazione della finestra, partendo dalla finestra o dal confine.
+
+        Budget e numero massimo di percorsi si riducono dei percorsi già scelti
+        che non compaiono nella finestra.
+        """
+        inst = self.instance
+        paths = {}
+        for p, arcs in inst.paths.items():
+            sub = [(u, v) for (u, v) in arcs if v in stations and (u in stations or u in boundary)]
+            if sub:
+                paths[p] = sub
+        outside = [p for p, chosen in decided.items() if chosen and p not in paths]
+        w = {arc: inst.travel(*arc) for arcs in paths.values() for arc in arcs}
+        costs = {p: c for p, c in inst.paths_cost.items() if p in paths} if inst.paths_cost is not None else None
+        budget = inst.budget
+        if budget is not None and inst.paths_cost is not None:
+            budget -= sum(inst.paths_cost[p] for p in outside)
+        max_paths = inst.max_paths - len(outside) if inst.max_paths is not None else None
+        pax = inst.passenger_arcs
+        return Instance(paths=paths, timetable=timetable, w=w, passenger_arcs=[pax[i] for i in passengers],
+                        capMax=inst.capMax, paths_cost=costs, budget=budget, pickup_slack=inst.pickup_slack,
+                        dwell=inst.dwell, min_pax_ratio=min_pax_ratio, max_paths=max_paths)
+
+    def _solve_window(self, sub: Instance, fixed: Dict[int, float], decided: Dict[str, bool], num_carried: int,
+                      num_owned: int, owned_ratio: Optional[float]) -> PathSelectionModel:
+        """Passeggeri della finestra in ordine: trasportati, propri, in anticipo."""
+        pm = PathSelectionModel(sub, objective=self.objective, delay_weight=self.delay_weight,
+                                **self.model_args).build()
+        for s, t in fixed.items():
+            pm.arrival_time[s].LB = pm.arrival_time[s].UB = t
+        for p, chosen in decided.items():
+            if p in pm.Z:
+                pm.Z[p].LB = pm.Z[p].UB = float(chosen)
+        if pm.aggregate:
+            for arc, pax_ids in sub.arc_to_passengers.items():
+                carried = sum(1 for i in pax_ids if i < num_carried)
+                if carried:
+                    pm.x[arc].LB = carried
+        else:
+            for i in range(num_carried):
+                pm.x[i].LB = 1.0
+            if owned_ratio is not None and num_owned:
+                # Minimo sui soli passeggeri propri (quelli in anticipo contano già in min_pax_served)
+                owned = range(num_carried, num_carried + num_owned)
+                pm.model.addConstr(quicksum(pm.x[i] for i in owned) >= owned_ratio * num_owned,
+                                   name="window_min_pax")
+        pm.solve()
+        return pm
+
+    def run(self) -> HorizonResult:
+        inst = self.instance
+        timetable = inst.timetable
+        pax = inst.passenger_arcs
+        step = self.window - self.overlap
+        t0, t_end = min(timetable.values()), max(timetable.values())
+
+        # Finestra di appartenenza di ogni passeggero (dall'origine)
+        origin_window: Dict[int, List[int]] = {}
+        dropped: List[int] = []
+        for i, (o, d) in enumerate(pax):
+            if timetable[d] < timetable[o]:
+                dropped.append(i)
+                continue
+            origin_window.setdefault(int((timetable[o] - t0) // step), []).append(i)
+
+        # Orari confermati (solo stazioni raggiunte da un percorso scelto) e stazioni confermate
+        arrival: Dict[int, float] = {}
+        confirmed: Set[int] = set()
+        # Scelte definitive di Z
+        decided: Dict[str, bool] = {}
+        # Passeggeri serviti con destinazione non ancora confermata
+        carried: List[int] = []
+        windows: List[WindowResult] = []
+        failed: Optional[PathSelectionResult] = None
+        k = 0
+        while True:
+            start = t0 + k * step
+            end = start + self.window
+            last = end >= t_end
+            owned = [i for j in sorted(origin_window) if j == k or (last and j > k) for i in origin_window[j]]
+            # Passeggeri della finestra successiva con origine nella sovrapposizione: contano nella scelta
+            # dei percorsi e nel minimo, ma si servono davvero nella loro finestra
+            # (non nella formulazione aggregata, che non distingue i passeggeri dello stesso arco OD)
+            lookahead = [i for i in origin_window.get(k + 1, [])
+                         if not last and not self.model_args.get("aggregate") and timetable[pax[i][0]] <= end]
+
+            # Finestra estesa all'intero viaggio dei trasportati e dei propri passeggeri
+            lo = min([start] + [timetable[pax[i][0]] for i in carried])
+            hi = max([end] + [timetable[pax[i][1]] for i in carried + owned + lookahead])
+            stations = {s for s, t in timetable.items() if lo <= t <= hi}
+            committed = sorted(s for s in stations if s not in confirmed and (last or timetable[s] < start + step))
+
+            # Stazioni di confine: stazioni confermate da cui un percorso entra nella finestra
+            boundary = {u for arcs in inst.paths.values() for (u, v) in arcs
+                        if v in stations and u not in stations and u in confirmed}
+            fixed = {s: arrival[s] for s in stations | boundary if s in arrival}
+            # Timetable alzata all'orario fisso dove serve, così i limiti superiori degli arrivi restano validi
+            sub_timetable = {s: max(timetable[s], fixed.get(s, timetable[s])) for s in stations | boundary}
+
+            passengers = carried + owned + lookahead
+            # Minimo su propri e in anticipo (e a parte sui soli propri): i trasportati sono già serviti
+            ratio = inst.min_pax_ratio
+            if ratio is not None and passengers:
+                ratio = (inst.min_pax_ratio * (len(owned) + len(lookahead)) + len(carried)) / len(passengers)
+            sub = self._subinstance(stations, boundary, sub_timetable, passengers, decided, ratio)
+            if sub.paths:
+                pm = self._solve_window(sub, fixed, decided, len(carried), len(owned), inst.min_pax_ratio)
+                if not pm.result().has_solution and ratio is not None:
+                    sub = self._subinstance(stations, boundary, sub_timetable, passengers, decided, None)
+                    pm = self._solve_window(sub, fixed, decided, len(carried), len(owned), None)
+                result = pm.result()
+            else:
+                result = PathSelectionResult(status=OPTIMAL, objective=self.objective, obj_val=0.0)
+
+            served = [passengers[j] for j in result.served_passengers if len(carried) <= j < len(carried) + len(owned)]
+            windows.append(WindowResult(start=start, end=end, committed=committed, result=result,
+                                        served_passengers=served))
+            if not result.has_solution:
+                failed = result
+                break
+
+            selected = set(result.selected_paths)
+            confirmed.update(committed)
+            for s in stations | boundary:
+                if s in confirmed and s not in fixed and any(s in sub.path_nodes[p] for p in selected):
+                    arrival[s] = result.arrival_times[s]
+            for p, arcs in sub.paths.items():
+                if p not in decided and any(v in confirmed for (_, v) in arcs):
+                    decided[p] = p in selected
+            carried = [i for i in carried + served if pax[i][1] not in confirmed]
+            if last:
+                break
+            k += 1
+
+        served_total = sum(len(w.served_passengers) for w in windows)
+        if failed is None and inst.min_pax_ratio is not None and served_total < inst.min_pax_ratio * len(pax) - 1e-9:
+            # Finestre risolte senza minimo: il piano unito non rispetta il minimo della giornata
+            failed = PathSelectionResult(status=INFEASIBLE, objective=self.objective)
+        if failed is not None:
+            stitched = PathSelectionResult(status=failed.status, objective=self.objective,
+                                           runtime=sum(w.result.runtime for w in windows))
+        else:
+            stitched = self._stitch(windows, arrival, decided)
+        return HorizonResult(result=stitched, windows=windows, dropped=sorted(dropped))
+
+    def _stitch(self, windows: List[WindowResult], arrival: Dict[int, float],
+                decided: Dict[str, bool]) -> PathSelectionResult:
+        """Unisce le finestre in un unico risultato sull'istanza completa."""
+        inst = self.instance
+        result = PathSelectionResult(status=STITCHED, objective=self.objective,
+                                     runtime=sum(w.result.runtime for w in windows))
+        # Dopo l'ultima finestra ogni percorso con archi nella giornata è deciso
+        result.selected_paths = [p for p in inst.paths if decided.get(p)]
+        result.served_passengers = sorted(i for w in windows for i in w.served_passengers)
+        result.pax_served = len(result.served_passengers)
+        result.arrival_times = {s: arrival.get(s, inst.timetable.get(s, 0.0)) for s in inst.nodi}
+        result.delays = path_delays(inst, result.selected_paths, result.arrival_times)
+        if self.objective == MAX_PAX:
+            result.obj_val = float(result.pax_served)
+        elif self.objective == MIN_RIT:
+            result.obj_val = result.total_delay
+        else:
+            result.obj_val = self.delay_weight * result.total_delay - result.pax_served
+        return result
+
+
+def rolling_horizon(instance: Instance, window: float, overlap: float = 0.0, objective: str = MAX_PAX,
+                    **model_args: Any) -> HorizonResult:
+    return RollingHorizon(instance, window, overlap, objective, **model_args).run()
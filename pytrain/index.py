@@ -0,0 +1,51 @@
+from typing import Dict, List, Tuple
+
+Arc = Tuple[int, int]
+
+
+# ==========================
+# === INDICE DI INCIDENZA ===
+# ==========================
+
+class PathIndex:
+    """Indice inverso stazione -> percorsi e arco (u, v) -> percorsi.
+
+    Ogni stazione ha una bitmask (un intero Python) con un bit per percorso; i
+    percorsi compatibili con una coppia (u, v) sono l'AND delle due maschere. Le
+    liste per arco vengono calcolate una sola volta e riusate da tutte le
+    famiglie di vincoli.
+    """
+
+    def __init__(self, paths: Dict[str, List[Arc]]):
+        self.path_ids: List[str] = list(paths)
+        self.station_mask: Dict[int, int] = {}
+        for bit, p in enumerate(self.path_ids):
+            for arc in paths[p]:
+                for n in arc:
+                    self.station_mask[n] = self.station_mask.get(n, 0) | (1 << bit)
+        self._station_paths: Dict[int, List[str]] = {}
+        self._arc_paths: Dict[Arc, List[str]] = {}
+
+    def _decode(self, mask: int) -> List[str]:
+        paths = []
+        while mask:
+            low = mask & -mask
+            paths.append(self.path_ids[low.bit_length() - 1])
+            mask ^= low
+        return paths
+
+    def paths_at(self, station: int) -> List[str]:
+        """Percorsi che passano dalla stazione."""
+        paths = self._station_paths.get(station)
+        if paths is None:
+            paths = self._station_paths[station] = self._decode(self.station_mask.get(station, 0))
+        return paths
+
+    def paths_on(self, arc: Arc) -> List[str]:
+        """Percorsi che contengono entrambi i nodi u e v (anche indirettamente)."""
+        paths = self._arc_paths.get(arc)
+        if paths is None:
+            u, v = arc
+            mask = self.station_mask.get(u, 0) & self.station_mask.get(v, 0)
+            paths = self._arc_paths[arc] = self._decode(mask)
+        return paths
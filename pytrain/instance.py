@@ -0,0 +1,253 @@
+import math
+import random
+from array import array
+from dataclasses import dataclass, field, InitVar
+from typing import Dict, Tuple, List, Optional, Set, Mapping, Sequence, Iterable, Iterator
+
+from .index import PathIndex
+
+Arc = Tuple[int, int]
+
+
+class PassengerArcs(Sequence):
+    """Coppie OD dei passeggeri in due array di interi a 32 bit.
+
+    Si usa come una lista di tuple (u, v), ma le tuple vengono create solo
+    quando si legge un elemento: milioni di passeggeri occupano 8 byte ciascuno.
+    """
+
+    __slots__ = ("origin", "destination")
+
+    def __init__(self, origin: Iterable[int] = (), destination: Iterable[int] = ()):
+        self.origin = array('i', origin)
+        self.destination = array('i', destination)
+
+    @classmethod
+    def from_arcs(cls, arcs: Iterable[Arc]) -> "PassengerArcs":
+        pax = cls()
+        for u, v in arcs:
+            pax.origin.append(u)
+            pax.destination.append(v)
+        return pax
+
+    def append(self, arc: Arc) -> None:
+        self.origin.append(arc[0])
+        self.destination.append(arc[1])
+
+    def __len__(self) -> int:
+        return len(self.origin)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PassengerArcs(self.origin[i], self.destination[i])
+        return self.origin[i], self.destination[i]
+
+    def __iter__(self) -> Iterator[Arc]:
+        return zip(self.origin, self.destination)
+
+
+# ===================
+# === ISTANZA =======
+# ===================
+
+@dataclass(slots=True)
+class Instance:
+    """Dati di un'istanza di selezione percorsi (equivalenti ai globali degli script).
+
+    Percorsi, timetable e ``pickup_slack`` non vanno modificati dopo la
+    creazione: nodi, indice di incidenza e finestre di prelievo sono calcolati
+    una volta sola.
+
+    Gli archi sono solo quelli usati davvero (archi dei percorsi più coppie OD
+    dei passeggeri) e i tempi di percorrenza stanno in un array compatto
+    indicizzato per id d'arco; ``w`` serve solo a costruirlo e deve coprire
+    almeno gli archi dei percorsi. Gli archi dei percorsi sono anche in formato
+    CSR: gli id d'arco del k-esimo percorso sono
+    ``path_arc_ids[path_offsets[k]:path_offsets[k + 1]]``. Con ``__slots__``
+    un'istanza non ha ``__dict__``: molte istanze in un lotto restano leggere.
+    """
+
+    # Percorsi (insiemi di archi consecutivi)
+    paths: Dict[str, List[Arc]]
+    # Timetable prevista per ogni stazione (in minuti)
+    timetable: Dict[int, float]
+    # Tempo di percorrenza degli archi
+    w: InitVar[Mapping[Arc, float]]
+    # Arco (origine, destinazione) di ogni passeggero (lista di tuple o PassengerArcs; salvati come PassengerArcs)
+    passenger_arcs: Sequence[Arc]
+    # Capacità massima per arco
+    capMax: int
+    # Costo del percorso (in termini di budget); None disattiva il vincolo di budget
+    paths_cost: Optional[Dict[str, float]] = None
+    budget: Optional[float] = None
+    # Intervallo accettabile per il prelievo passeggeri (+10 minuti)
+    pickup_slack: float = 10
+    # Tempo di sosta in stazione aggiunto a ogni arco
+    dwell: float = 5
+    # Frazione minima di passeggeri da servire; None disattiva il vincolo
+    min_pax_ratio: Optional[float] = 0.7
+    # Numero massimo di percorsi selezionabili; None = nessun limite
+    max_paths: Optional[int] = None
+
+    # Derivati in __post_init__
+    arcs: List[Arc] = field(init=False, repr=False, compare=False)
+    arc_id: Dict[Arc, int] = field(init=False, repr=False, compare=False)
+    travel_time: array = field(init=False, repr=False, compare=False)
+    path_offsets: array = field(init=False, repr=False, compare=False)
+    path_arc_ids: array = field(init=False, repr=False, compare=False)
+    # Calcolati al primo uso
+    _arc_to_passengers: Optional[Dict[Arc, List[int]]] = field(default=None, init=False, repr=False, compare=False)
+    _pickup_window: Optional[Dict[int, Tuple[float, float]]] = field(default=None, init=False, repr=False,
+                                                                     compare=False)
+    _path_nodes: Optional[Dict[str, Set[int]]] = field(default=None, init=False, repr=False, compare=False)
+    _index: Optional[PathIndex] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self, w: Mapping[Arc, float]):
+        if not isinstance(self.passenger_arcs, PassengerArcs):
+            self.passenger_arcs = PassengerArcs.from_arcs(self.passenger_arcs)
+        # Archi dei percorsi più coppie OD dei passeggeri, senza duplicati
+        arcs = dict.fromkeys(arc for arcs in self.paths.values() for arc in arcs)
+        num_path_arcs = len(arcs)
+        arcs.update(dict.fromkeys(self.passenger_arcs))
+        self.arcs = list(arcs)
+        self.arc_id = {arc: k for k, arc in enumerate(self.arcs)}
+        self.path_offsets, self.path_arc_ids = array('i', [0]), array('i')
+        for path_arcs in self.paths.values():
+            self.path_arc_ids.extend(self.arc_id[arc] for arc in path_arcs)
+            self.path_offsets.append(len(self.path_arc_ids))
+
+        # Gli archi dei percorsi devono avere un tempo; le coppie OD possono non averlo
+        self.travel_time = array('d', (w[arc] if k < num_path_arcs else w.get(arc, math.nan)
+                                       for k, arc in enumerate(self.arcs)))
+
+    def set_travel_times(self, w: Mapping[Arc, float]) -> None:
+        """Aggiorna i tempi di percorrenza degli archi indicati (che devono esistere)."""
+        for arc, t in w.items():
+            self.travel_time[self.arc_id[arc]] = t
+
+    def set_passengers(self, passenger_arcs: Sequence[Arc]) -> None:
+        """Sostituisce la domanda; le nuove coppie OD vengono aggiunte agli archi."""
+        for arc in passenger_arcs:
+            if arc not in self.arc_id:
+                self.arc_id[arc] = len(self.arcs)
+                self.arcs.append(arc)
+                self.travel_time.append(math.nan)
+        self.passenger_arcs = (passenger_arcs if isinstance(passenger_arcs, PassengerArcs)
+                               else PassengerArcs.from_arcs(passenger_arcs))
+        self._arc_to_passengers = None
+
+    def travel(self, u: int, v: int) -> float:
+        """Tempo di percorrenza dell'arco (u, v)."""
+        return self.travel_time[self.arc_id[(u, v)]]
+
+    @property
+    def nodi(self) -> List[int]:
+        # da 1 a ultima stazione inclusi
+        return list(range(1, max(n for arcs in self.paths.values() for arc in arcs for n in arc) + 1))
+
+    @property
+    def num_passengers(self) -> int:
+        return len(self.passenger_arcs)
+
+    @property
+    def arc_to_passengers(self) -> Dict[Arc, List[int]]:
+        """Mappa arco OD -> lista di passeggeri che lo usano, in ordine di prima comparsa."""
+        if self._arc_to_passengers is None:
+            arc_to_passengers: Dict[Arc, List[int]] = {}
+            for i, arc in enumerate(self.passenger_arcs):
+                arc_to_passengers.setdefault(arc, []).append(i)
+            self._arc_to_passengers = arc_to_passengers
+        return self._arc_to_passengers
+
+    @property
+    def pickup_window(self) -> Dict[int, Tuple[float, float]]:
+        if self._pickup_window is None:
+            self._pickup_window = {s: (self.timetable[s], self.timetable[s] + self.pickup_slack)
+                                   for s in self.timetable}
+        return self._pickup_window
+
+    @property
+    def path_nodes(self) -> Dict[str, Set[int]]:
+        if self._path_nodes is None:
+            self._path_nodes = {p: set(n for arc in self.paths[p] for n in arc) for p in self.paths}
+        return self._path_nodes
+
+    @property
+    def index(self) -> PathIndex:
+        if self._index is None:
+            self._index = PathIndex(self.paths)
+        return self._index
+
+    def arrival_upper_bound(self) -> float:
+        """Limite superiore valido per gli orari di arrivo, uguale per tutte le stazioni.
+
+        L'orario minimo ammissibile di una stazione è una timetable più la
+        percorrenza (tempo di arco + sosta) di una catena di archi dei percorsi
+        scelti senza ripetizioni, quindi non supera l'orario più alto della
+        timetable più la percorrenza di tutti gli archi dei percorsi.
+        """
+        arcs = set(arc for arcs in self.paths.values() for arc in arcs)
+        return max(self.timetable.values()) + sum(self.travel(*arc) + self.dwell for arc in arcs)
+
+    def arrival_bounds(self) -> Dict[int, float]:
+        """Limite superiore per stazione degli orari di arrivo, dedotto dai dati.
+
+        Fissati i percorsi scelti, l'orario minimo che rispetta partenze, finestre e
+        progressioni è il più tardi tra timetable[u] e (arrivo al predecessore +
+        percorrenza + sosta) su un arco entrante. Il suo massimo su tutti gli archi
+        dei percorsi si calcola con un rilassamento alla Bellman-Ford; se la rete
+        dei percorsi ha cicli si ricade su ``arrival_upper_bound``.
+        """
+        bound = {s: self.timetable.get(s, 0) for s in self.nodi}
+        arcs = sorted(set(arc for arcs in self.paths.values() for arc in arcs))
+        for _ in range(len(bound)):
+            changed = False
+            for (u, v) in arcs:
+                t = bound[u] + self.travel(u, v) + self.dwell
+                if t > bound[v]:
+                    bound[v] = t
+                    changed = True
+            if not changed:
+                return bound
+        U = self.arrival_upper_bound()
+        return {s: U for s in self.nodi}
+
+    def visited(self, p: str) -> List[int]:
+        """Stazioni toccate dal percorso p, nell'ordine di percorrenza."""
+        visited = []
+        for (u, v) in self.paths[p]:
+            if u not in visited:
+                visited.append(u)
+            if v not in visited:
+                visited.append(v)
+        return visited
+
+
+def random_instance(paths: Dict[str, List[Arc]],
+                    timetable: Dict[int, float],
+                    capMax: int,
+                    num_passengers: int,
+                    w_range: Tuple[int, int] = (5, 7),
+                    seed: Optional[int] = None,
+                    **kwargs) -> Instance:
+    """Genera un'istanza con tempi di percorrenza e passeggeri casuali, come negli script originali.
+
+    Non enumera tutte le coppie i < j: ogni passeggero estrae due stazioni
+    distinte (uniforme sulle coppie) e i tempi sono estratti solo per gli archi
+    dei percorsi.
+    """
+    rng = random.Random(seed)
+
+    nodi = list(range(1, max(n for arcs in paths.values() for arc in arcs for n in arc) + 1))
+
+    # Assegna un valore randomico a ogni arco dei percorsi
+    w: Dict[Arc, float] = {}
+    for arcs in paths.values():
+        for arco in arcs:
+            if arco not in w:
+                w[arco] = rng.randint(*w_range)
+
+    # Passeggeri associati a coppie di stazioni i < j
+    passenger_arcs = [tuple(sorted(rng.sample(nodi, 2))) for _ in range(num_passengers)]
+
+    return Instance(paths=paths, timetable=timetable, w=w, passenger_arcs=passenger_arcs, capMax=capMax, **kwargs)
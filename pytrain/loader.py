@@ -0,0 +1,168 @@
+import csv
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union, Iterator
+
+from .instance import Arc, Instance, PassengerArcs
+
+PathLike = Union[str, Path]
+
+# Righe lette per blocco dai file Parquet
+BATCH_SIZE = 65536
+# Typecode interi di array
+INTEGER_TYPECODES = "bBhHiIlLqQ"
+
+
+# ===========================
+# === CARICAMENTO ISTANZE ===
+# ===========================
+# I file sono CSV con intestazione oppure Parquet (estensione .parquet / .pq).
+# Colonne attese (i nomi si possono cambiare con ``columns``):
+#
+#   percorsi       path, u, v          archi di ogni percorso in ordine di percorrenza
+#   costi          path, cost
+#   timetable      station, time
+#   tempi          u, v, time
+#   passeggeri     origin, destination
+#
+# Le righe non diventano mai dizionari o tuple: ogni colonna richiesta viene
+# accumulata direttamente in un array, un blocco alla volta.
+
+def _is_parquet(path: PathLike) -> bool:
+    return Path(path).suffix.lower() in (".parquet", ".pq")
+
+
+def _csv_batches(path: PathLike, columns: Sequence[str], batch_size: int) -> Iterator[List[List[str]]]:
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader)]
+        try:
+            idx = [header.index(c) for c in columns]
+        except ValueError:
+            raise ValueError(f"{path}: colonne attese {list(columns)}, trovate {header}") from None
+        batch: List[List[str]] = [[] for _ in columns]
+        for row in reader:
+            if not row:
+                continue
+            for col, k in zip(batch, idx):
+                col.append(row[k])
+            if len(batch[0]) >= batch_size:
+                yield batch
+                batch = [[] for _ in columns]
+        if batch[0]:
+            yield batch
+
+
+def _parquet_batches(path: PathLike, columns: Sequence[str], batch_size: int):
+    """Blocchi di colonne come array pyarrow."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Per leggere file Parquet serve pyarrow (pip install pyarrow)") from None
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=list(columns)):
+        yield [batch.column(c) for c in columns]
+
+
+def _to_typecode(path: PathLike, column: str, values, typecode: str) -> bytes:
+    """Colonna Parquet nel formato dell'array, con controllo di valori mancanti e di intervallo per gli interi."""
+    import numpy as np
+
+    if values.null_count:
+        raise ValueError(f"{path}: {values.null_count} valori mancanti nella colonna {column!r}")
+    values = values.to_numpy(zero_copy_only=False)
+    if typecode in INTEGER_TYPECODES and len(values):
+        info = np.iinfo(np.dtype(typecode))
+        low, high = values.min(), values.max()
+        if low < info.min or high > info.max:
+            raise ValueError(f"{path}: valori della colonna {column!r} fuori intervallo per {info.dtype} "
+                             f"({low}..{high})")
+    return values.astype(typecode).tobytes()
+
+
+def read_columns(path: PathLike, columns: Sequence[str], typecodes: str,
+                 batch_size: int = BATCH_SIZE) -> List[array]:
+    """Legge le colonne indicate in array compatti (typecode per colonna, es. ``"iid"``)."""
+    out = [array(t) for t in typecodes]
+    if _is_parquet(path):
+        for batch in _parquet_batches(path, columns, batch_size):
+            for arr, column, values in zip(out, columns, batch):
+                arr.frombytes(_to_typecode(path, column, values, arr.typecode))
+    else:
+        for batch in _csv_batches(path, columns, batch_size):
+            for arr, values in zip(out, batch):
+                arr.extend(map(int if arr.typecode in INTEGER_TYPECODES else float, values))
+    return out
+
+
+def read_strings(path: PathLike, column: str, batch_size: int = BATCH_SIZE) -> List[str]:
+    """Legge una colonna testuale (nomi dei percorsi)."""
+    out: List[str] = []
+    if _is_parquet(path):
+        for (values,) in _parquet_batches(path, [column], batch_size):
+            out.extend(str(v) for v in values.to_pylist())
+    else:
+        for (values,) in _csv_batches(path, [column], batch_size):
+            out.extend(values)
+    return out
+
+
+def load_paths(path: PathLike, columns: Sequence[str] = ("path", "u", "v")) -> Dict[str, List[Arc]]:
+    names = read_strings(path, columns[0])
+    u, v = read_columns(path, columns[1:], "ii")
+    paths: Dict[str, List[Arc]] = {}
+    for p, a, b in zip(names, u, v):
+        paths.setdefault(p, []).append((a, b))
+    return paths
+
+
+def load_paths_cost(path: PathLike, columns: Sequence[str] = ("path", "cost")) -> Dict[str, float]:
+    (cost,) = read_columns(path, columns[1:], "d")
+    return dict(zip(read_strings(path, columns[0]), cost))
+
+
+def load_timetable(path: PathLike, columns: Sequence[str] = ("station", "time")) -> Dict[int, float]:
+    station, time = read_columns(path, columns, "id")
+    return dict(zip(station, time))
+
+
+def load_travel_times(path: PathLike, arcs=None, columns: Sequence[str] = ("u", "v", "time")) -> Dict[Arc, float]:
+    """Tempi di percorrenza; con ``arcs`` tiene solo gli archi indicati (es. quelli dei percorsi)."""
+    u, v, time = read_columns(path, columns, "iid")
+    if arcs is None:
+        return {(a, b): t for a, b, t in zip(u, v, time)}
+    arcs = set(arcs)
+    return {(a, b): t for a, b, t in zip(u, v, time) if (a, b) in arcs}
+
+
+def load_passengers(path: PathLike, columns: Sequence[str] = ("origin", "destination")) -> PassengerArcs:
+    origin, destination = read_columns(path, columns, "ii")
+    passengers = PassengerArcs()
+    passengers.origin, passengers.destination = origin, destination
+    return passengers
+
+
+def load_instance(paths_file: PathLike,
+                  timetable_file: PathLike,
+                  travel_times_file: PathLike,
+                  passengers_file: PathLike,
+                  capMax: int,
+                  paths_cost_file: Optional[PathLike] = None,
+                  budget: Optional[float] = None,
+                  **kwargs) -> Instance:
+    """Costruisce un'istanza dai file; ``kwargs`` va a ``Instance`` (pickup_slack, dwell, ...).
+
+    Dal file dei tempi vengono tenuti solo gli archi dei percorsi, gli unici
+    usati dal modello.
+    """
+    paths = load_paths(paths_file)
+    path_arcs = {arc for arcs in paths.values() for arc in arcs}
+    return Instance(
+        paths=paths,
+        timetable=load_timetable(timetable_file),
+        w=load_travel_times(travel_times_file, arcs=path_arcs),
+        passenger_arcs=load_passengers(passengers_file),
+        capMax=capMax,
+        paths_cost=load_paths_cost(paths_cost_file) if paths_cost_file is not None else None,
+        budget=budget,
+        **kwargs
+    )
@@ -0,0 +1,379 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from gurobipy import Model, GRB, tupledict
+
+from .constraints import BigM, INDICATOR, LOAD, OD, delay_keys as _delay_keys, flow_spans
+from .instance import Instance
+
+
+# ==================================
+# === COSTRUZIONE MATRICIALE =======
+# ==================================
+# Stesse variabili e stessi vincoli di constraints.py, nello stesso ordine e con
+# gli stessi nomi, ma assemblati come matrice sparsa (``assemble``), senza
+# dipendere dal solver. ``build_matrix`` li aggiunge in blocco a un modello
+# Gurobi con addMVar / addMConstr (il file LP prodotto è identico); highs.py
+# passa la stessa matrice a HiGHS.
+
+class _Rows:
+    """Accumula righe in formato COO insieme a verso, termine noto e nome."""
+
+    def __init__(self):
+        self.rows: List[np.ndarray] = []
+        self.cols: List[np.ndarray] = []
+        self.vals: List[np.ndarray] = []
+        self.sense: List[np.ndarray] = []
+        self.rhs: List[np.ndarray] = []
+        self.names: List[str] = []
+        self.count = 0
+
+    def add(self, rows, cols, vals, sense, rhs, names: List[str]) -> int:
+        """Aggiunge un blocco di righe; ``rows`` è relativo al blocco."""
+        n = len(names)
+        self.rows.append(np.asarray(rows, dtype=np.int64) + self.count)
+        self.cols.append(np.asarray(cols, dtype=np.int64))
+        self.vals.append(np.asarray(vals, dtype=float))
+        self.sense.append(np.broadcast_to(np.asarray(sense, dtype="U1"), (n,)))
+        self.rhs.append(np.broadcast_to(np.asarray(rhs, dtype=float), (n,)))
+        self.names.extend(names)
+        self.count += n
+        return n
+
+    def matrix(self, num_cols: int) -> sp.csr_matrix:
+        return sp.csr_matrix(
+            (np.concatenate(self.vals), (np.concatenate(self.rows), np.concatenate(self.cols))),
+            shape=(self.count, num_cols)
+        )
+
+
+def _gather(offsets: np.ndarray, items: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per ogni chiave k, gli elementi items[offsets[k]:offsets[k + 1]] (formato CSR).
+
+    Restituisce (posizione della chiave in ``keys``, elemento), concatenati.
+    """
+    counts = offsets[keys + 1] - offsets[keys]
+    owner = np.repeat(np.arange(len(keys)), counts)
+    starts = np.repeat(offsets[keys] - np.cumsum(counts) + counts, counts)
+    return owner, items[starts + np.arange(counts.sum())]
+
+
+@dataclass
+class MatrixProblem:
+    """Variabili e vincoli lineari del modello: colonne Z | arrival_time | pax_served | x | flow | load | delay."""
+
+    names: List[str]
+    # Tipo per colonna: GRB.BINARY, GRB.CONTINUOUS o GRB.INTEGER ("B", "C", "I")
+    vtype: np.ndarray
+    lb: np.ndarray
+    ub: np.ndarray
+    A: sp.csr_matrix
+    # Verso per riga: "<", ">" o "="
+    sense: np.ndarray
+    rhs: np.ndarray
+    row_names: List[str]
+    # Righe per famiglia di vincoli
+    rows: Dict[str, int]
+    path_col: Dict[str, int]
+    col_arrival: int
+    col_pax: int
+    col_x: int
+    # Colonne di flow[p, o, d] e load[p, u, v] (solo con capacity=LOAD), nell'ordine delle chiavi
+    col_flow: int = 0
+    flow_keys: List[Tuple[str, int, int]] = field(default_factory=list)
+    col_load: int = 0
+    load_keys: List[Tuple[str, int, int]] = field(default_factory=list)
+    # Colonna di d[p, u] (solo con ``delays``)
+    delay_col: Dict[Tuple[str, int], int] = field(default_factory=dict)
+    # Vincoli indicatori, da aggiungere a parte: (u, p) con finestra, e (p, u, v, nome)
+    window_pairs: List[Tuple[int, str]] = field(default_factory=list)
+    windows: List[Tuple[float, float]] = field(default_factory=list)
+    progression: List[Tuple[str, int, int, str]] = field(default_factory=list)
+
+    @property
+    def num_cols(self) -> int:
+        return len(self.names)
+
+
+def assemble(inst: Instance, big_m: BigM, delays: bool = False, capacity: str = LOAD,
+             origins_only: bool = False) -> MatrixProblem:
+    """Assembla la matrice dei vincoli.
+
+    Con ``capacity=LOAD`` aggiunge flussi e carichi a bordo per arco dei
+    percorsi (come ``constraints.add_load_constraints``) al posto della
+    capacità per arco OD, che resta solo con ``capacity=OD``.
+
+    Con ``delays`` aggiunge le variabili d[p, u] dei ritardi e il loro inviluppo
+    di McCormick (come ``constraints.add_delay_terms``), in coda a colonne e righe;
+    ``origins_only`` ha lo stesso significato che in ``constraints.delay_keys``.
+    """
+    path_ids = list(inst.paths)
+    nodi = inst.nodi
+    num_paths, num_nodes, num_pax = len(path_ids), len(nodi), inst.num_passengers
+    path_col = {p: k for k, p in enumerate(path_ids)}
+
+    # Archi dei percorsi dal CSR dell'istanza: estremi e percorso (colonna Z) di ciascuno
+    offsets = np.array(inst.path_offsets, dtype=np.int64)
+    arc_ids = np.array(inst.path_arc_ids, dtype=np.int64)
+    arc_uv = np.array(inst.arcs, dtype=np.int64).reshape(-1, 2)
+    tail, head = arc_uv[arc_ids, 0], arc_uv[arc_ids, 1]
+    arc_path = np.repeat(np.arange(num_paths), np.diff(offsets))
+    path_arc_keys = [(path_ids[z], u, v) for z, u, v in zip(arc_path.tolist(), tail.tolist(), head.tolist())]
+
+    # Colonne: Z | arrival_time | pax_served | x | flow | load | delay
+    col_arrival = num_paths - nodi[0]
+    col_pax = num_paths + num_nodes
+    col_x = col_pax + 1
+    spans = flow_spans(inst) if capacity == LOAD else []
+    flow_keys = [(p, o, d) for p, o, d, _, _ in spans]
+    load_keys = path_arc_keys if capacity == LOAD else []
+    col_flow = col_x + num_pax
+    col_load = col_flow + len(flow_keys)
+    col_delay = col_load + len(load_keys)
+    delay_keys = _delay_keys(inst, origins_only) if delays else []
+    num_cols = col_delay + len(delay_keys)
+
+    names = ([f"Z[{p}]" for p in path_ids] + [f"arrival_time[{s}]" for s in nodi] + ["pax_served"]
+             + [f"x[{i}]" for i in range(num_pax)] + [f"flow[{p},{o},{d}]" for p, o, d in flow_keys]
+             + [f"load[{p},{u},{v}]" for p, u, v in load_keys] + [f"delay[{p},{u}]" for p, u in delay_keys])
+    vtype = np.array([GRB.BINARY] * num_paths + [GRB.CONTINUOUS] * num_nodes + [GRB.INTEGER]
+                     + [GRB.BINARY] * num_pax + [GRB.INTEGER] * len(flow_keys) + [GRB.CONTINUOUS] * len(load_keys)
+                     + [GRB.CONTINUOUS] * len(delay_keys))
+    lb = np.zeros(num_cols)
+    lb[col_delay:] = -np.inf
+    ub = np.full(num_cols, np.inf)
+    ub[:num_paths] = 1
+    ub[num_paths:col_pax] = [big_m.arrival_ub[s] for s in nodi]
+    ub[col_x:col_flow] = 1
+    demand = inst.arc_to_passengers
+    ub[col_flow:col_load] = [len(demand[o, d]) for _, o, d in flow_keys]
+
+    # Archi OD dei passeggeri come id, e CSR arco OD -> colonne Z dei percorsi compatibili
+    pax_arc = np.fromiter((inst.arc_id[arc] for arc in inst.passenger_arcs), dtype=np.int64, count=num_pax)
+    arc_paths = [[path_col[p] for p in inst.index.paths_on(arc)] for arc in inst.arcs]
+    arc_offsets = np.zeros(len(inst.arcs) + 1, dtype=np.int64)
+    arc_offsets[1:] = np.cumsum([len(ps) for ps in arc_paths])
+    arc_items = np.fromiter((c for ps in arc_paths for c in ps), dtype=np.int64, count=arc_offsets[-1])
+    arc_npaths = np.diff(arc_offsets)
+
+    R = _Rows()
+    rows: Dict[str, int] = {}
+
+    # --- Finestra di prelievo, una volta per (stazione, percorso) ---
+    pickup_window = inst.pickup_window
+    origins = sorted({inst.arcs[a][0] for a in np.unique(pax_arc) if arc_npaths[a]})
+    pairs = [(u, p) for u in origins for p in inst.index.paths_at(u)]
+    n = len(pairs)
+    u_arr = np.array([u for u, _ in pairs], dtype=np.int64)
+    z_arr = np.array([path_col[p] for _, p in pairs], dtype=np.int64)
+    window = np.array([pickup_window.get(u, (0, 1e5)) for u, _ in pairs], dtype=float).reshape(n, 2)
+    window_names = [name for u, p in pairs for name in (f"window_start_{u}_{p}", f"window_end_{u}_{p}")]
+    if big_m.mode == INDICATOR:
+        # Vincoli indicatori: aggiunti dopo la matrice, famiglia per famiglia
+        rows["window"] = 2 * n
+    else:
+        m_window = np.array([big_m.window(u) for u, _ in pairs], dtype=float).reshape(n, 2)
+        rows["window"] = R.add(
+            np.repeat(np.arange(2 * n), 2),
+            np.column_stack([col_arrival + np.repeat(u_arr, 2), np.repeat(z_arr, 2)]).ravel(),
+            np.column_stack([np.ones(2 * n), (m_window * [-1, 1]).ravel()]).ravel(),
+            np.tile([">", "<"], n),
+            (window + m_window * [-1, 1]).ravel(),
+            window_names,
+        )
+        big_m.used.update(zip(window_names, m_window.ravel().tolist()))
+
+    # --- Servizio: x[i] <= somma Z dei percorsi compatibili, altrimenti x[i] == 0 ---
+    owner, zcols = _gather(arc_offsets, arc_items, pax_arc)
+    valid = arc_npaths[pax_arc] > 0
+    rows["service"] = R.add(
+        np.concatenate([np.arange(num_pax), owner]),
+        np.concatenate([col_x + np.arange(num_pax), zcols]),
+        np.concatenate([np.ones(num_pax), -np.ones(len(zcols))]),
+        np.where(valid, "<", "="),
+        0.0,
+        [f"x_path_check_{i}" if ok else f"x_invalid_arc_{i}" for i, ok in enumerate(valid)],
+    )
+
+    # --- Orari: partenza e progressione lungo ogni percorso ---
+    u0 = tail[offsets[:-1]]
+    z_all = np.arange(num_paths)
+    start_names = [f"start_time_{p}_{u}" for p, u in zip(path_ids, u0.tolist())]
+    prog_names = [f"time_progression_{p}_{u}_{v_}" for p, u, v_ in path_arc_keys]
+    start_t = np.array([inst.timetable[u] for u in u0.tolist()], dtype=float)
+    progression = []
+    if big_m.mode == INDICATOR:
+        # Progressione con vincoli indicatori, aggiunti dopo la matrice
+        progression = [key + (name,) for key, name in zip(path_arc_keys, prog_names)]
+        rows["time_progression"] = R.add(
+            np.repeat(z_all, 2), np.column_stack([col_arrival + u0, z_all]).ravel(),
+            np.column_stack([np.ones(num_paths), -start_t]).ravel(), ">", 0.0, start_names,
+        ) + len(progression)
+    else:
+        # Riga di partenza del percorso seguita dalle righe dei suoi archi
+        start_row = offsets[:-1] + z_all
+        prog_row = np.arange(len(arc_ids)) + arc_path + 1
+        m = np.array([big_m.progression(u, v_) for _, u, v_ in path_arc_keys], dtype=float)
+        t_rhs = np.zeros(num_paths + len(arc_ids))
+        t_rhs[prog_row] = np.asarray(inst.travel_time)[arc_ids] + inst.dwell - m
+        t_names: List[str] = []
+        for k, name in enumerate(start_names):
+            t_names += [name] + prog_names[offsets[k]:offsets[k + 1]]
+        # Per riga: arrival[u0] - t Z >= 0;  arrival[v] - arrival[u] - m Z >= w + sosta - m
+        rows["time_progression"] = R.add(
+            np.concatenate([start_row, start_row, prog_row, prog_row, prog_row]),
+            np.concatenate([col_arrival + u0, z_all, col_arrival + head, col_arrival + tail, arc_path]),
+            np.concatenate([np.ones(num_paths), -start_t, np.ones(len(m)), -np.ones(len(m)), -m]),
+            ">", t_rhs, t_names,
+        )
+        big_m.used.update(zip(prog_names, m.tolist()))
+
+    # --- Capacità per arco OD con passeggeri, nell'ordine di prima comparsa (solo con capacity=OD) ---
+    if capacity == OD:
+        uniq, first = np.unique(pax_arc, return_index=True)
+        cap_arcs = uniq[np.argsort(first)]
+        cap_arcs = cap_arcs[arc_npaths[cap_arcs] > 0]
+        cap_row = np.full(len(inst.arcs), -1, dtype=np.int64)
+        cap_row[cap_arcs] = np.arange(len(cap_arcs))
+        pax_rows = cap_row[pax_arc]
+        served = pax_rows >= 0
+        owner, zcols = _gather(arc_offsets, arc_items, cap_arcs)
+        rows["capacity"] = R.add(
+            np.concatenate([pax_rows[served], owner]),
+            np.concatenate([col_x + np.flatnonzero(served), zcols]),
+            np.concatenate([np.ones(served.sum()), np.full(len(zcols), -float(inst.capMax))]),
+            "<",
+            0.0,
+            [f"cap_{inst.arcs[a]}" for a in cap_arcs],
+        )
+    else:
+        rows["capacity"] = 0
+
+    # --- Carico a bordo: flussi per percorso e somme prefisse lungo ogni percorso ---
+    if capacity == LOAD:
+        l_rows, l_cols, l_vals, l_sense, l_names = [], [], [], [], []
+        flow_col = {key: col_flow + k for k, key in enumerate(flow_keys)}
+        k = 0
+        for arc, pax_ids in demand.items():
+            paths = inst.index.paths_on(arc)
+            if paths:
+                # somma_p flow[p, o, d] - passeggeri serviti su (o, d) == 0
+                l_rows += [k] * (len(paths) + len(pax_ids))
+                l_cols += [flow_col[p, arc[0], arc[1]] for p in paths] + [col_x + i for i in pax_ids]
+                l_vals += [1.0] * len(paths) + [-1.0] * len(pax_ids)
+                l_sense.append("=")
+                l_names.append(f"flow_{arc}")
+                k += 1
+        # Per ogni arco g del CSR: load_g - load_{g-1} - salite + discese == 0;  load_g - capMax Z <= 0
+        g = np.arange(len(arc_ids))
+        load_row, cap_row = k + 2 * g, k + 2 * g + 1
+        inner = g[g != offsets[arc_path]]
+        span_z = np.array([path_col[p] for p, _, _, _, _ in spans], dtype=np.int64)
+        span_j0 = np.array([j0 for _, _, _, j0, _ in spans], dtype=np.int64)
+        span_j1 = np.array([j1 for _, _, _, _, j1 in spans], dtype=np.int64)
+        span_col = col_flow + np.arange(len(spans))
+        # Si scende su un arco del percorso solo prima del capolinea
+        down = span_j1 < offsets[span_z + 1] - offsets[span_z]
+        l_rows = np.concatenate([l_rows, load_row, load_row[inner], load_row[offsets[span_z] + span_j0],
+                                 load_row[offsets[span_z[down]] + span_j1[down]], cap_row, cap_row])
+        l_cols = np.concatenate([l_cols, col_load + g, col_load + inner - 1, span_col, span_col[down],
+                                 col_load + g, arc_path])
+        l_vals = np.concatenate([l_vals, np.ones(len(g)), -np.ones(len(inner)), -np.ones(len(spans)),
+                                 np.ones(down.sum()), np.ones(len(g)), np.full(len(g), -float(inst.capMax))])
+        l_sense += ["=", "<"] * len(g)
+        l_names += [name for p, u, v_ in load_keys for name in (f"load_{p}_{u}_{v_}", f"cap_load_{p}_{u}_{v_}")]
+        rows["load"] = R.add(l_rows, l_cols, l_vals, np.array(l_sense), 0.0, l_names)
+    else:
+        rows["load"] = 0
+
+    # --- Passeggeri serviti ---
+    p_rows = np.zeros(num_pax + 1, dtype=np.int64)
+    p_cols = np.concatenate([[col_pax], col_x + np.arange(num_pax)])
+    p_vals = np.concatenate([[1.0], -np.ones(num_pax)])
+    p_sense, p_rhs, p_names = ["="], [0.0], ["pax_served_sum"]
+    if inst.min_pax_ratio is not None:
+        p_rows = np.append(p_rows, 1)
+        p_cols = np.append(p_cols, col_pax)
+        p_vals = np.append(p_vals, 1.0)
+        p_sense.append(">")
+        p_rhs.append(inst.min_pax_ratio * num_pax)
+        p_names.append("min_pax_served")
+    rows["pax"] = R.add(p_rows, p_cols, p_vals, np.array(p_sense), np.array(p_rhs), p_names)
+
+    # --- Percorsi: numero massimo e budget ---
+    b_rows, b_cols, b_vals, b_rhs, b_names = [], [], [], [], []
+    if inst.max_paths is not None:
+        b_rows += [len(b_names)] * num_paths
+        b_cols += list(range(num_paths))
+        b_vals += [1.0] * num_paths
+        b_rhs.append(inst.max_paths)
+        b_names.append("max_one_path")
+    if inst.budget is not None and inst.paths_cost is not None:
+        b_rows += [len(b_names)] * len(inst.paths_cost)
+        b_cols += [path_col[p] for p in inst.paths_cost]
+        b_vals += [float(c) for c in inst.paths_cost.values()]
+        b_rhs.append(inst.budget)
+        b_names.append("budget_constraint")
+    rows["path"] = R.add(b_rows, b_cols, b_vals, "<", np.array(b_rhs, dtype=float), b_names)
+
+    # --- Ritardi: inviluppo di McCormick di d[p, u] = (arrival_time[u] - t) * Z[p] ---
+    delay_col = {}
+    if delay_keys:
+        d_rows, d_cols, d_vals, d_sense, d_rhs, d_names = [], [], [], [], [], []
+        for k, (p, u) in enumerate(delay_keys):
+            t, U = inst.timetable[u], big_m.arrival_ub[u]
+            d, a, z = col_delay + k, col_arrival + u, path_col[p]
+            delay_col[(p, u)] = d
+            r = 4 * k
+            # d + t Z >= 0;  d - (U - t) Z <= 0;  d - a - (U - t) Z >= -U;  d - a + t Z <= 0
+            d_rows += [r, r, r + 1, r + 1, r + 2, r + 2, r + 2, r + 3, r + 3, r + 3]
+            d_cols += [d, z, d, z, d, a, z, d, a, z]
+            d_vals += [1.0, t, 1.0, -(U - t), 1.0, -1.0, -(U - t), 1.0, -1.0, t]
+            d_sense += [">", "<", ">", "<"]
+            d_rhs += [0.0, 0.0, -U, 0.0]
+            d_names += [f"delay_lb_{p}_{u}", f"delay_ub_{p}_{u}", f"delay_on_lb_{p}_{u}", f"delay_on_ub_{p}_{u}"]
+        rows["delay"] = R.add(d_rows, d_cols, d_vals, np.array(d_sense), np.array(d_rhs), d_names)
+
+    return MatrixProblem(
+        names=names, vtype=vtype, lb=lb, ub=ub, A=R.matrix(num_cols), sense=np.concatenate(R.sense),
+        rhs=np.concatenate(R.rhs), row_names=R.names, rows=rows, path_col=path_col, col_arrival=col_arrival,
+        col_pax=col_pax, col_x=col_x, col_flow=col_flow, flow_keys=flow_keys, col_load=col_load,
+        load_keys=load_keys, delay_col=delay_col, window_pairs=pairs, windows=window.tolist(),
+        progression=progression,
+    )
+
+
+def build_matrix(model: Model, inst: Instance, big_m: BigM, capacity: str = LOAD):
+    """Aggiunge variabili e vincoli in blocco a un modello Gurobi.
+
+    Restituisce (Z, arrival_time, pax_served, x, flow, load, righe per famiglia),
+    con le variabili nelle stesse strutture della costruzione per espressioni
+    (flow e load sono None con capacity=OD).
+    """
+    problem = assemble(inst, big_m, capacity=capacity)
+    v = model.addMVar(problem.num_cols, lb=0.0, ub=problem.ub, vtype=problem.vtype, name=problem.names)
+    model.addMConstr(problem.A, v, problem.sense, problem.rhs, name=problem.row_names)
+
+    # Variabili singole per la lettura della soluzione e per gli obiettivi
+    model.update()
+    variables = v.tolist()
+    Z = tupledict({p: variables[k] for p, k in problem.path_col.items()})
+    arrival_time = tupledict({s: variables[problem.col_arrival + s] for s in inst.nodi})
+
+    if big_m.mode == INDICATOR:
+        for (u, p), (window_start, window_end) in zip(problem.window_pairs, problem.windows):
+            model.addGenConstrIndicator(Z[p], True, arrival_time[u] >= window_start, name=f"window_start_{u}_{p}")
+            model.addGenConstrIndicator(Z[p], True, arrival_time[u] <= window_end, name=f"window_end_{u}_{p}")
+        for p, u, v_, name in problem.progression:
+            model.addGenConstrIndicator(
+                Z[p], True, arrival_time[v_] >= arrival_time[u] + inst.travel(u, v_) + inst.dwell, name=name
+            )
+
+    x = tupledict({i: variables[problem.col_x + i] for i in range(inst.num_passengers)})
+    flow = load = None
+    if capacity == LOAD:
+        flow = tupledict(zip(problem.flow_keys, variables[problem.col_flow:problem.col_load]))
+        load = tupledict(zip(problem.load_keys, variables[problem.col_load:problem.col_load + len(problem.load_keys)]))
+    return Z, arrival_time, variables[problem.col_pax], x, flow, load, problem.rows
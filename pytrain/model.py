@@ -0,0 +1,469 @@
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Any, Mapping
+
+from gurobipy import Model, GRB, Env, quicksum
+
+from .constraints import (add_window_constraints, add_service_constraints, add_time_constraints,
+                          add_capacity_constraints, add_pax_constraints, add_path_constraints, add_demand_constraints,
+                          add_load_constraints, add_delay_terms, legacy_rows, BigM, DELAY_FORMS, MCCORMICK, TIGHT,
+                          INDICATOR, CAPACITY_MODES, LOAD, OD)
+from .instance import Instance, Arc
+from .matrix import build_matrix
+from .profiling import Profiler, _gap
+from .result import PathSelectionResult, Incumbent, path_delays
+
+# Modalità della funzione obiettivo
+MAX_PAX = "maxpax"  # massimizza i passeggeri serviti (MaxPax.py)
+MIN_RIT = "minrit"  # minimizza i ritardi (MinRit.py)
+CHECK = "check"  # peso * ritardi - passeggeri serviti (Check.py)
+OBJECTIVES = (MAX_PAX, MIN_RIT, CHECK)
+
+# Modalità di costruzione dei vincoli
+EXPR = "expr"  # un addConstr per riga (constraints.py)
+MATRIX = "matrix"  # matrice sparsa aggiunta in blocco (matrix.py)
+BUILD_MODES = (EXPR, MATRIX)
+
+
+class PathSelectionModel:
+    """Costruisce e risolve il modello "Path_Selection" per un'istanza data.
+
+    L'ambiente Gurobi può essere condiviso tra più modelli, così da risolvere
+    molte istanze nello stesso processo senza reimportare gli script.
+    """
+
+    def __init__(self, instance: Instance, objective: str = MAX_PAX, delay_weight: float = 0.5,
+                 env: Optional[Env] = None, params: Optional[Dict[str, Any]] = None,
+                 delay_form: str = MCCORMICK, build_mode: str = EXPR, big_m: str = TIGHT,
+                 aggregate: bool = False, capacity: str = LOAD, profiler: Optional[Profiler] = None):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Funzione obiettivo sconosciuta: {objective!r} (attese: {', '.join(OBJECTIVES)})")
+        if delay_form not in DELAY_FORMS:
+            raise ValueError(f"Forma del ritardo sconosciuta: {delay_form!r} (attese: {', '.join(DELAY_FORMS)})")
+        if build_mode not in BUILD_MODES:
+            raise ValueError(f"Modalità di costruzione sconosciuta: {build_mode!r} (attese: {', '.join(BUILD_MODES)})")
+        if capacity not in CAPACITY_MODES:
+            raise ValueError(f"Capacità sconosciuta: {capacity!r} (attese: {', '.join(CAPACITY_MODES)})")
+        if aggregate and build_mode == MATRIX:
+            raise ValueError("La formulazione aggregata si costruisce solo per espressioni (build_mode='expr')")
+        self.instance = instance
+        self.objective = objective
+        self.delay_weight = delay_weight
+        # Linearizzazione del termine arrival_time * Z (vedi constraints.add_delay_terms)
+        self.delay_form = delay_form
+        self.build_mode = build_mode
+        # Big-M dedotti dall'istanza, fissi o vincoli indicatori (vedi constraints.BigM)
+        self.big_m = big_m
+        # Una variabile intera per arco OD (limitata dalla domanda) invece di una binaria per passeggero
+        self.aggregate = aggregate
+        # Carico a bordo per arco dei percorsi (LOAD) o solo per coppia OD come gli script (OD)
+        self.capacity = capacity
+        self.env = env
+        self.params = dict(params or {})
+        # Tempi, contatori per famiglia di vincoli e gap MIP (vedi profiling.py)
+        self.profiler = profiler
+        self.model: Optional[Model] = None
+        # Statistiche di costruzione (righe per famiglia di vincoli, ecc.)
+        self.stats: Dict[str, Any] = {}
+        # Ultima soluzione trovata, riusata come MIP start al solve successivo
+        self._start: Dict[str, Optional[Dict]] = {}
+
+    # ======================
+    # === MODELLO GUROBI ===
+    # ======================
+
+    def build(self) -> "PathSelectionModel":
+        inst = self.instance
+
+        model = Model("Path_Selection", env=self.env) if self.env is not None else Model("Path_Selection")
+        for name, value in self.params.items():
+            model.setParam(name, value)
+
+        with self.phase("big_m"):
+            big_m = self._big_m = BigM(inst, self.big_m)
+        if self.build_mode == MATRIX:
+            # Stesso modello, assemblato con la API matriciale
+            with self.phase("matrix", model):
+                Z, arrival_time, passeggeri_serviti, x, self.flow, self.load, rows = build_matrix(
+                    model, inst, big_m, self.capacity)
+        else:
+            Z, arrival_time, passeggeri_serviti, x, rows = self._build_expr(model, big_m)
+        # Big-M usato da ogni vincolo di finestra e progressione
+        self.stats["big_m"] = big_m.used
+
+        # Righe risparmiate rispetto alla formulazione originale degli script
+        self.stats["rows"] = rows
+        self.stats["rows_saved"] = (legacy_rows(inst) - rows["window"] - rows["service"] - rows["capacity"]
+                                    - rows["load"])
+
+        # ======================
+        # === FUNZIONE OBIETTIVO ===
+        # ======================
+
+        # I ritardi servono solo agli obiettivi che li minimizzano
+        self.delay = None
+        if self.objective != MAX_PAX:
+            with self.phase("delay", model):
+                # CHECK somma i ritardi solo sulle stazioni di partenza degli archi, come Check.py
+                ritardi, self.delay, rows["delay"] = add_delay_terms(model, inst, Z, arrival_time,
+                                                                     big_m.arrival_ub, self.delay_form,
+                                                                     origins_only=self.objective == CHECK)
+
+        with self.phase("objective"):
+            if self.objective == MAX_PAX:
+                model.setObjective(passeggeri_serviti, GRB.MAXIMIZE)
+            elif self.objective == MIN_RIT:
+                model.setObjective(quicksum(ritardi), GRB.MINIMIZE)
+            else:
+                # Peso ritardo e peso pax possono essere tarati
+                model.setObjective(quicksum(ritardi) * self.delay_weight - passeggeri_serviti, GRB.MINIMIZE)
+
+        self.model = model
+        self.Z = Z
+        self.arrival_time = arrival_time
+        self.x = x
+        self.pax_served = passeggeri_serviti
+        return self
+
+    def _build_expr(self, model: Model, big_m: BigM):
+        """Aggiunge variabili e vincoli uno alla volta."""
+        inst = self.instance
+
+        with self.phase("variables", model):
+            # Variabile binaria: 1 se scelgo il percorso P, 0 altrimenti
+            Z = model.addVars(inst.paths.keys(), vtype=GRB.BINARY, name="Z")
+
+            # Orari di arrivo alle stazioni
+            arrival_time = model.addVars(inst.nodi, ub=big_m.arrival_ub, vtype=GRB.CONTINUOUS, name="arrival_time")
+
+            # Passeggeri serviti
+            passeggeri_serviti = model.addVar(vtype=GRB.INTEGER, name="pax_served")
+            x = self._add_passenger_vars(model)
+
+        # ======================
+        # === VINCOLI =====
+        # ======================
+
+        families = {
+            "window": lambda: add_window_constraints(model, inst, Z, arrival_time, big_m),
+            "service": lambda: 0 if self.aggregate else add_service_constraints(model, inst, Z, x),
+            "time_progression": lambda: add_time_constraints(model, inst, Z, arrival_time, big_m),
+            "capacity": lambda: self._add_capacity(model, Z, x),
+            "load": lambda: self._add_load(model, Z, x),
+            "pax": lambda: add_pax_constraints(model, inst, x, passeggeri_serviti),
+            "path": lambda: add_path_constraints(model, inst, Z),
+        }
+        rows = {}
+        for name, add in families.items():
+            with self.phase(name, model):
+                rows[name] = add()
+        return Z, arrival_time, passeggeri_serviti, x, rows
+
+    def _add_passenger_vars(self, model: Model):
+        """Variabili dei passeggeri: x[i] binaria per passeggero, oppure y[a] intera per arco OD."""
+        inst = self.instance
+        if self.aggregate:
+            # Domanda per arco OD; zero se nessun percorso è compatibile
+            demand = {arc: len(pax_ids) if inst.index.paths_on(arc) else 0
+                      for arc, pax_ids in inst.arc_to_passengers.items()}
+            return model.addVars(demand.keys(), ub=demand, vtype=GRB.INTEGER, name="y")
+        return model.addVars(inst.num_passengers, vtype=GRB.BINARY, name="x")  # 1 se pax i è servito
+
+    def _add_capacity(self, model: Model, Z, x) -> int:
+        """Capacità per arco OD (solo con capacity=OD: con LOAD la limitano le righe di carico)."""
+        if self.capacity != OD:
+            return 0
+        inst = self.instance
+        if self.aggregate:
+            return add_demand_constraints(model, inst, Z, x)
+        return add_capacity_constraints(model, inst, Z, x)
+
+    def _add_load(self, model: Model, Z, x) -> int:
+        """Carico a bordo per arco dei percorsi (solo con capacity=LOAD); imposta ``flow`` e ``load``."""
+        self.flow = self.load = None
+        if self.capacity != LOAD:
+            return 0
+        inst = self.instance
+        served = x if self.aggregate else {arc: quicksum(x[i] for i in pax_ids)
+                                           for arc, pax_ids in inst.arc_to_passengers.items()}
+        self.flow, self.load, rows = add_load_constraints(model, inst, Z, served)
+        return rows
+
+    # ======================
+    # === RISOLUZIONE ===
+    # ======================
+
+    def solve(self, warm_start: bool = True, time_limit: Optional[float] = None, mip_gap: Optional[float] = None,
+              on_incumbent: Optional[Callable[[Incumbent], None]] = None) -> PathSelectionResult:
+        """Risolve il modello; con ``warm_start`` parte dall'ultima soluzione trovata.
+
+        ``time_limit`` (secondi) e ``mip_gap`` valgono solo per questo solve: se
+        il solve si ferma prima dell'ottimo, il risultato contiene comunque il
+        miglior incumbent e il suo gap. ``on_incumbent`` riceve ogni soluzione
+        migliorante durante il solve.
+        """
+        if self.model is None:
+            self.build()
+        if warm_start:
+            self._apply_start()
+        model = self.model
+        limits = {name: value for name, value in (("TimeLimit", time_limit), ("MIPGap", mip_gap)) if value is not None}
+        saved = {name: model.getParamInfo(name)[2] for name in limits}
+        for name, value in limits.items():
+            model.setParam(name, value)
+        try:
+            with self.phase("optimize"):
+                model.optimize(self._callback(on_incumbent))
+        finally:
+            for name, value in saved.items():
+                model.setParam(name, value)
+        self._save_start()
+        with self.phase("result"):
+            return self.result()
+
+    def _callback(self, on_incumbent: Optional[Callable[[Incumbent], None]]) -> Optional[Callable]:
+        """Callback Gurobi: profiler e/o incumbent migliorati, chiamati in sequenza."""
+        callbacks = []
+        if self.profiler is not None:
+            callbacks.append(self.profiler.callback)
+        if on_incumbent is not None:
+            callbacks.append(self._incumbent_callback(on_incumbent))
+        if len(callbacks) <= 1:
+            return callbacks[0] if callbacks else None
+
+        def callback(model: Model, where: int) -> None:
+            for cb in callbacks:
+                cb(model, where)
+        return callback
+
+    def _incumbent_callback(self, on_incumbent: Callable[[Incumbent], None]) -> Callable:
+        inst = self.instance
+        paths = list(inst.paths)
+        Z = [self.Z[p] for p in paths]
+        stations = sorted(self.arrival_time.keys())
+        arrival = [self.arrival_time[s] for s in stations]
+        sense = self.model.ModelSense
+        best = [float("inf")]
+
+        def callback(model: Model, where: int) -> None:
+            if where != GRB.Callback.MIPSOL:
+                return
+            obj = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+            # Le euristiche possono trovare soluzioni peggiori dell'incumbent: si inviano solo quelle migliori
+            if sense * obj >= best[0]:
+                return
+            best[0] = sense * obj
+            bound = model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+            selected = [p for p, value in zip(paths, model.cbGetSolution(Z)) if value > 0.5]
+            arrival_times = dict(zip(stations, model.cbGetSolution(arrival)))
+            on_incumbent(Incumbent(
+                runtime=model.cbGet(GRB.Callback.RUNTIME), obj_val=obj, bound=bound, gap=_gap(obj, bound),
+                selected_paths=selected, pax_served=int(round(model.cbGetSolution(self.pax_served))),
+                delays=path_delays(inst, selected, arrival_times),
+            ))
+        return callback
+
+    def phase(self, name: str, model: Optional[Model] = None):
+        """Fase misurata dal profiler, se presente (con ``model`` conta anche righe e colonne aggiunte)."""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.phase(name, model)
+
+    def _save_start(self) -> None:
+        model = self.model
+        if model.SolCount == 0:
+            return
+        self._start = {"Z": model.getAttr("X", self.Z), "x": model.getAttr("X", self.x)}
+
+    def set_start(self, result: PathSelectionResult) -> None:
+        """MIP start da una soluzione esterna (es. ``heuristic.greedy_solve``)."""
+        inst = self.instance
+        selected, served = set(result.selected_paths), set(result.served_passengers)
+        if self.aggregate:
+            x = {arc: float(sum(1 for i in pax_ids if i in served)) for arc, pax_ids in inst.arc_to_passengers.items()}
+        else:
+            x = {i: float(i in served) for i in range(inst.num_passengers)}
+        self._start = {"Z": {p: float(p in selected) for p in inst.paths}, "x": x,
+                       "arrival_time": dict(result.arrival_times)}
+
+    def _apply_start(self) -> None:
+        model = self.model
+        for name in ("Z", "x", "arrival_time"):
+            values = self._start.get(name)
+            if values is not None:
+                variables = getattr(self, name)
+                model.setAttr("Start", [variables[k] for k in values], list(values.values()))
+
+    def result(self) -> PathSelectionResult:
+        """Legge la soluzione corrente del modello."""
+        model = self.model
+        result = PathSelectionResult(status=model.status, objective=self.objective, runtime=model.Runtime)
+        # Anche fermato prima dell'ottimo (limite di tempo, gap, interruzione) si legge il miglior incumbent
+        if model.SolCount == 0:
+            return result
+
+        inst = self.instance
+        result.obj_val = model.ObjVal
+        # Con più obiettivi (es. pareto.py) Gurobi non espone un gap unico
+        if model.NumObj <= 1:
+            result.gap = model.MIPGap if model.IsMIP else 0.0
+        # Valori letti in blocco, una chiamata per famiglia di variabili
+        Z = model.getAttr("X", self.Z)
+        result.selected_paths = [p for p in inst.paths if Z[p] > 0.5]
+        result.pax_served = int(round(self.pax_served.X))
+        if self.aggregate:
+            # Disaggrega: i primi y[a] passeggeri di ogni arco OD risultano serviti
+            served = model.getAttr("X", self.x)
+            result.served_passengers = sorted(i for arc, pax_ids in inst.arc_to_passengers.items()
+                                              for i in pax_ids[:int(round(served[arc]))])
+        else:
+            x = model.getAttr("X", [self.x[i] for i in range(inst.num_passengers)])
+            result.served_passengers = [i for i, value in enumerate(x) if value > 0.5]
+        # dict semplice: un tupledict non si può ricaricare con pickle (SolutionCache)
+        result.arrival_times = dict(model.getAttr("X", self.arrival_time))
+        result.delays = path_delays(inst, result.selected_paths, result.arrival_times)
+        return result
+
+    # ======================
+    # === AGGIORNAMENTI INCREMENTALI ===
+    # ======================
+    # Percorsi, timetable e budget restano fissi: si modificano coefficienti e
+    # termini noti del modello già costruito invece di ricostruirlo, e il solve
+    # successivo parte dalla soluzione precedente.
+
+    def _constrs(self) -> Dict[str, Any]:
+        """Vincoli lineari e generali del modello, per nome."""
+        model = self.model
+        model.update()
+        constrs = model.getConstrs()
+        by_name = dict(zip(model.getAttr("ConstrName", constrs), constrs))
+        gen = model.getGenConstrs()
+        if gen:
+            by_name.update(zip(model.getAttr("GenConstrName", gen), gen))
+        return by_name
+
+    def update_travel_times(self, w: Mapping[Arc, float]) -> None:
+        """Nuovi tempi di percorrenza: aggiorna progressione, Big-M, limiti di arrivo e ritardi."""
+        inst = self.instance
+        inst.set_travel_times(w)
+        model = self.model
+        constrs = self._constrs()
+        big_m = BigM(inst, self.big_m)
+        big_m.used = self._big_m.used
+        self._big_m = big_m
+
+        ub = big_m.arrival_ub
+        model.setAttr("UB", [self.arrival_time[s] for s in inst.nodi], [ub[s] for s in inst.nodi])
+
+        # Progressione: a_v - a_u - M Z >= w + sosta - M
+        for p, arcs in inst.paths.items():
+            for (u, v) in arcs:
+                name = f"time_progression_{p}_{u}_{v}"
+                travel = inst.travel(u, v) + inst.dwell
+                if big_m.mode == INDICATOR:
+                    model.remove(constrs[name])
+                    model.addGenConstrIndicator(self.Z[p], True,
+                                                self.arrival_time[v] >= self.arrival_time[u] + travel, name=name)
+                    continue
+                m = big_m.progression(u, v)
+                model.chgCoeff(constrs[name], self.Z[p], -m)
+                constrs[name].RHS = travel - m
+                big_m.used[name] = m
+
+        # Fine finestra: a_u + M Z <= window_end + M, con M che dipende dal limite di arrivo
+        if big_m.mode != INDICATOR:
+            pickup_window = inst.pickup_window
+            for u in inst.nodi:
+                window_end = pickup_window.get(u, (0, 1e5))[1]
+                m = big_m.window(u)[1]
+                for p in inst.index.paths_at(u):
+                    name = f"window_end_{u}_{p}"
+                    if name in constrs:
+                        model.chgCoeff(constrs[name], self.Z[p], m)
+                        constrs[name].RHS = window_end + m
+                        big_m.used[name] = m
+
+        # Inviluppo di McCormick dei ritardi: dipende dal limite superiore U
+        if self.delay is not None and self.delay_form == MCCORMICK:
+            for (p, u) in self.delay:
+                U, t = ub[u], inst.timetable[u]
+                model.chgCoeff(constrs[f"delay_ub_{p}_{u}"], self.Z[p], -(U - t))
+                c = constrs[f"delay_on_lb_{p}_{u}"]
+                model.chgCoeff(c, self.Z[p], -(U - t))
+                c.RHS = -U
+
+    def update_capacity(self, capMax: int) -> None:
+        """Nuova capacità massima per arco."""
+        inst = self.instance
+        inst.capMax = capMax
+        constrs = self._constrs()
+        if self.capacity == OD:
+            for arc, pax_ids in inst.arc_to_passengers.items():
+                c = constrs.get(f"cap_{arc}")
+                if c is not None:
+                    # Nella formulazione aggregata il coefficiente è min(domanda, capMax)
+                    coeff = min(len(pax_ids), capMax) if self.aggregate else capMax
+                    for p in inst.index.paths_on(arc):
+                        self.model.chgCoeff(c, self.Z[p], -coeff)
+        else:
+            for (p, u, v) in self.load:
+                self.model.chgCoeff(constrs[f"cap_load_{p}_{u}_{v}"], self.Z[p], -capMax)
+
+    def update_min_pax(self, min_pax_ratio: float) -> None:
+        """Nuova frazione minima di passeggeri da servire (il vincolo deve esistere)."""
+        inst = self.instance
+        inst.min_pax_ratio = min_pax_ratio
+        self._constrs()["min_pax_served"].RHS = min_pax_ratio * inst.num_passengers
+
+    def update_passengers(self, passenger_arcs: List[Arc]) -> None:
+        """Nuova domanda: sostituisce le variabili x e i vincoli che dipendono dai passeggeri.
+
+        Percorsi, orari, budget e ritardi restano nel modello; il MIP start
+        successivo usa solo i percorsi scelti in precedenza.
+        """
+        inst = self.instance
+        model = self.model
+        constrs = self._constrs()
+        prefixes = ("window_start_", "window_end_", "x_path_check_", "x_invalid_arc_")
+        prefixes += ("cap_",) if self.capacity == OD else ("flow_", "load_", "cap_load_")
+        model.remove([c for name, c in constrs.items()
+                      if name.startswith(prefixes) or name in ("pax_served_sum", "min_pax_served")])
+        model.remove(list(self.x.values()))
+        if self.flow is not None:
+            model.remove(list(self.flow.values()) + list(self.load.values()))
+
+        inst.set_passengers(passenger_arcs)
+        self.x = self._add_passenger_vars(model)
+        rows = self.stats["rows"]
+        rows["window"] = add_window_constraints(model, inst, self.Z, self.arrival_time, self._big_m)
+        if not self.aggregate:
+            rows["service"] = add_service_constraints(model, inst, self.Z, self.x)
+        rows["capacity"] = self._add_capacity(model, self.Z, self.x)
+        rows["load"] = self._add_load(model, self.Z, self.x)
+        rows["pax"] = add_pax_constraints(model, inst, self.x, self.pax_served)
+        self._start["x"] = None
+
+    def compute_iis(self) -> Dict[str, List]:
+        """Calcola l'IIS e restituisce i vincoli e le variabili coinvolte."""
+        model = self.model
+        with self.phase("iis"):
+            model.computeIIS()
+        # Attributi letti in blocco invece che vincolo per vincolo
+        all_constrs = model.getConstrs()
+        constrs = [name for name, flag in zip(model.getAttr("ConstrName", all_constrs),
+                                              model.getAttr("IISConstr", all_constrs)) if flag]
+        gen = model.getGenConstrs()
+        if gen:
+            constrs += [name for name, flag in zip(model.getAttr("GenConstrName", gen),
+                                                   model.getAttr("IISGenConstr", gen)) if flag]
+        all_vars = model.getVars()
+        variables = []
+        for name, lb, ub in zip(model.getAttr("VarName", all_vars), model.getAttr("IISLB", all_vars),
+                                model.getAttr("IISUB", all_vars)):
+            if lb or ub:
+                bounds = []
+                if lb:
+                    bounds.append("LB")
+                if ub:
+                    bounds.append("UB")
+                variables.append((name, bounds))
+        return {"constrs": constrs, "vars": variables}
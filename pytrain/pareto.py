@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from typing import List, Optional, Any
+
+from gurobipy import GRB
+
+from .constraints import QUADRATIC
+from .instance import Instance
+from .model import PathSelectionModel, MIN_RIT
+from .result import PathSelectionResult
+
+
+# ============================
+# === FRONTE DI PARETO =====
+# ============================
+# Ritardo totale (MinRit) contro passeggeri serviti (MaxPax) con il metodo
+# epsilon-vincolo su un solo modello: a ogni passo si minimizza il ritardo con
+# pax_served >= epsilon e, a parità di ritardo, si massimizzano i passeggeri
+# (obiettivi gerarchici di Gurobi), poi epsilon sale oltre i passeggeri appena
+# serviti. Ogni solve parte dalla soluzione del punto precedente.
+
+@dataclass
+class ParetoPoint:
+    pax_served: int
+    total_delay: float
+    result: PathSelectionResult
+
+
+def pareto_front(instance: Instance, step: int = 1, max_points: Optional[int] = None,
+                 **model_args: Any) -> List[ParetoPoint]:
+    """Punti non dominati (passeggeri serviti, ritardo totale), per passeggeri crescenti.
+
+    ``step`` è l'incremento minimo di passeggeri tra due punti (con 1 il fronte
+    è completo); ``model_args`` va a ``PathSelectionModel``. Il primo punto è
+    quello di MinRit, l'ultimo quello di MaxPax con il minimo ritardo.
+    """
+    if model_args.get("delay_form") == QUADRATIC:
+        raise ValueError("Il fronte di Pareto richiede una forma lineare del ritardo (mccormick o indicator)")
+    pm = PathSelectionModel(instance, objective=MIN_RIT, **model_args).build()
+    model = pm.model
+    model.update()
+    delay = model.getObjective()
+    model.ModelSense = GRB.MINIMIZE
+    model.setObjectiveN(delay, 0, priority=1, name="delay")
+    model.setObjectiveN(-pm.pax_served, 1, priority=0, name="pax")
+    epsilon = model.addConstr(pm.pax_served >= 0, name="pareto_min_pax")
+
+    points: List[ParetoPoint] = []
+    while max_points is None or len(points) < max_points:
+        result = pm.solve()
+        if not result.is_optimal:
+            break
+        result.obj_val = result.total_delay
+        points.append(ParetoPoint(result.pax_served, result.total_delay, result))
+        epsilon.RHS = result.pax_served + step
+    return points
@@ -0,0 +1,132 @@
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+
+from gurobipy import Model, GRB
+
+
+# ================================
+# === PROFILAZIONE PER FASE ====
+# ================================
+# Tempi e contatori per fase (generazione dati, ogni famiglia di vincoli,
+# optimize, lettura del risultato, output/IIS) e andamento del gap MIP durante
+# optimize. Con un modello Gurobi, ogni fase registra anche righe, colonne e
+# non zeri aggiunti (serve un model.update() prima e dopo: si paga solo quando
+# la profilazione è attiva).
+
+@dataclass
+class PhaseStats:
+    seconds: float = 0.0
+    calls: int = 0
+    rows: int = 0
+    cols: int = 0
+    nonzeros: int = 0
+
+
+@dataclass
+class GapSample:
+    seconds: float
+    incumbent: float
+    bound: float
+    gap: float
+
+
+def _counts(model: Model) -> Tuple[int, int, int]:
+    model.update()
+    return model.NumConstrs + model.NumGenConstrs + model.NumQConstrs, model.NumVars, model.NumNZs
+
+
+class Profiler:
+    """Raccoglie tempi e contatori per fase e campioni del gap MIP.
+
+    Si passa a ``PathSelectionModel(..., profiler=...)``; le fasi esterne al
+    modello (es. generazione dell'istanza) si misurano con ``phase``.
+    ``gap_interval`` è l'intervallo minimo in secondi tra due campioni del gap.
+    """
+
+    def __init__(self, gap_interval: float = 1.0):
+        self.gap_interval = gap_interval
+        self.phases: Dict[str, PhaseStats] = {}
+        self.gap: List[GapSample] = []
+        self._last_sample = float("-inf")
+
+    @contextmanager
+    def phase(self, name: str, model: Optional[Model] = None) -> Iterator[PhaseStats]:
+        stats = self.phases.setdefault(name, PhaseStats())
+        before = _counts(model) if model is not None else None
+        t0 = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds += time.perf_counter() - t0
+            stats.calls += 1
+            if before is not None:
+                after = _counts(model)
+                stats.rows += after[0] - before[0]
+                stats.cols += after[1] - before[1]
+                stats.nonzeros += after[2] - before[2]
+
+    # --- Gap MIP ---
+
+    def callback(self, model: Model, where: int) -> None:
+        """Callback Gurobi: campiona incumbent, bound e gap durante il branch and bound."""
+        if where == GRB.Callback.MIP:
+            incumbent = model.cbGet(GRB.Callback.MIP_OBJBST)
+            bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            runtime = model.cbGet(GRB.Callback.RUNTIME)
+        elif where == GRB.Callback.MIPSOL:
+            incumbent = model.cbGet(GRB.Callback.MIPSOL_OBJBST)
+            bound = model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+            runtime = model.cbGet(GRB.Callback.RUNTIME)
+            # Una nuova soluzione si registra sempre
+            self._last_sample = float("-inf")
+        else:
+            return
+        if runtime - self._last_sample < self.gap_interval:
+            return
+        self._last_sample = runtime
+        self.gap.append(GapSample(runtime, incumbent, bound, _gap(incumbent, bound)))
+
+    # --- Esportazione ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phases": {name: asdict(stats) for name, stats in self.phases.items()},
+            # Valori infiniti (nessun incumbent o bound) come null, per restare JSON valido
+            "gap": [{k: v if abs(v) < GRB.INFINITY else None for k, v in asdict(sample).items()}
+                    for sample in self.gap],
+        }
+
+    def to_json(self, **kwargs: Any) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "pytrain") -> str:
+        """Metriche in formato testo Prometheus."""
+        lines = []
+        for metric, help_text in (("seconds", "Tempo per fase"), ("calls", "Esecuzioni per fase"),
+                                  ("rows", "Righe aggiunte per fase"), ("cols", "Colonne aggiunte per fase"),
+                                  ("nonzeros", "Non zeri aggiunti per fase")):
+            name = f"{prefix}_phase_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {'counter' if metric == 'calls' else 'gauge'}")
+            for phase, stats in self.phases.items():
+                lines.append(f'{name}{{phase="{phase}"}} {getattr(stats, metric)}')
+        if self.gap:
+            last = self.gap[-1]
+            for metric, value in (("incumbent", last.incumbent), ("bound", last.bound), ("gap", last.gap)):
+                if abs(value) >= GRB.INFINITY:
+                    value = "+Inf" if value > 0 else "-Inf"
+                lines.append(f"# TYPE {prefix}_mip_{metric} gauge")
+                lines.append(f"{prefix}_mip_{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _gap(incumbent: float, bound: float) -> float:
+    """Gap relativo come lo calcola Gurobi (infinito senza incumbent)."""
+    if abs(incumbent) >= GRB.INFINITY or abs(bound) >= GRB.INFINITY:
+        return float("inf")
+    if incumbent == 0:
+        return 0.0 if bound == 0 else float("inf")
+    return abs(bound - incumbent) / abs(incumbent)
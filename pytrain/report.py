@@ -0,0 +1,114 @@
+from typing import Union
+
+from gurobipy import GRB
+
+from .diagnosis import Diagnosis, diagnose, RELAX
+from .highs import HighsModel
+from .instance import Instance
+from .model import PathSelectionModel
+from .result import PathSelectionResult, INFEASIBLE_STATUS
+
+
+# ======================
+# === OUTPUT ===========
+# ======================
+
+def print_result(instance: Instance, result: PathSelectionResult) -> None:
+    """Stampa la soluzione nello stesso formato degli script originali (anche un incumbent non ottimo)."""
+    if result.is_optimal:
+        print("\n=== RISULTATO OTTIMALE ===")
+    else:
+        # Gap infinito (GRB.INFINITY): nessun bound finito al momento dell'arresto
+        gap = f"{result.gap:.2%}" if result.gap is not None and result.gap < GRB.INFINITY else "non disponibile"
+        print(f"\n=== MIGLIOR SOLUZIONE TROVATA (stato {result.status}, gap {gap}) ===")
+    print("Valore della funzione obiettivo:", result.obj_val)
+
+    # Percorso scelto
+    for p in result.selected_paths:
+        print(f"\nPercorso scelto: {p} -> {instance.paths[p]}")
+
+    # Passeggeri serviti
+    print(f"\nPasseggeri serviti: {result.pax_served}")
+
+    # Tabella con orari e ritardi per ciascun percorso selezionato
+    print("\nOrari e ritardi alle fermate per ciascun percorso selezionato:")
+    print(f"{'Percorso':<10} {'Stazione':<10} {'Timetable':<12} {'Arrivo Calcolato':<18} {'Ritardo (min)'}")
+    for (p, s), ritardo in result.delays.items():
+        t_input = instance.timetable[s]
+        t_arrival = result.arrival_times[s]
+        print(f"{p:<10} {s:<10} {t_input:<12.1f} {t_arrival:<18.1f} {ritardo:.1f}")
+
+    print("\nPasseggeri serviti (indice e arco):")
+    for i in result.served_passengers:
+        print(f"Passeggero {i} su arco {instance.passenger_arcs[i]}")
+
+
+def print_iis(model: Union[PathSelectionModel, HighsModel], ilp_file: str = "model.ilp") -> None:
+    """Calcola l'IIS del modello non ottimo e stampa vincoli e variabili responsabili.
+
+    Il file ILP si scrive solo con Gurobi; con HiGHS l'IIS è quello del
+    rilassamento continuo.
+    """
+    print("\n❌ Modello INFEASIBILE. Calcolo dell'IIS per identificare i vincoli responsabili...\n")
+    iis = model.compute_iis()
+
+    print("Vincoli che causano l'infeasibilità:\n")
+    for name in iis["constrs"]:
+        print(f" - {name}")
+
+    print("\nVariabili coinvolte:\n")
+    for name, bounds in iis["vars"]:
+        print(f" - {name} (bounds: {', '.join(bounds)})")
+
+    if isinstance(model, HighsModel):
+        if not iis["constrs"] and not iis["vars"]:
+            print(" (nessuno: il rilassamento continuo è ammissibile, l'infeasibilità dipende dall'interezza)")
+        print("\nHiGHS: IIS del rilassamento continuo, file ILP non scritto (solo con Gurobi).")
+        return
+
+    # Scrivi il modello IIS su file per ispezione manuale
+    model.model.write(ilp_file)  # Puoi aprirlo con un editor di testo
+    print("File LP e ILP scritti con successo.")
+
+
+def print_diagnosis(diagnosis: Diagnosis) -> None:
+    """Stampa l'esito della diagnosi a livelli."""
+    print("\n❌ Modello INFEASIBILE. Diagnosi a livelli:\n")
+    if diagnosis.issues:
+        print("Controlli strutturali:\n")
+        for issue in diagnosis.issues:
+            print(f" - [{issue.code}{', bloccante' if issue.blocking else ''}] {issue.message}")
+    if RELAX in diagnosis.skipped:
+        print("\nfeasRelax saltato: disponibile solo con Gurobi.")
+    if diagnosis.relaxation:
+        print("\nVincoli da allentare (feasRelax, violazione minima):\n")
+        for name, value in sorted(diagnosis.relaxation.items(), key=lambda item: -item[1]):
+            print(f" - {name}: {value:g}")
+    if diagnosis.iis is not None:
+        print(f"\nIIS{'' if diagnosis.iis['complete'] else ' (parziale, limite di tempo)'}:\n")
+        for name in diagnosis.iis["constrs"]:
+            print(f" - {name}")
+        for name, bounds in diagnosis.iis["vars"]:
+            print(f" - {name} (bounds: {', '.join(bounds)})")
+
+
+def print_report(model: Union[PathSelectionModel, HighsModel], result: PathSelectionResult, tiered: bool = False,
+                 time_limit: float = 10.0) -> None:
+    """Stampa il risultato; senza soluzione, IIS completo oppure, con ``tiered``, diagnosi a livelli.
+
+    Un solve fermato dal limite di tempo non è infeasibile: si stampa
+    l'incumbent con il suo gap, o solo lo stato se non ce n'è uno.
+    """
+    with model.phase("output"):
+        print("======================")
+
+        print("======================")
+
+        if result.has_solution:
+            print_result(model.instance, result)
+        elif result.status not in INFEASIBLE_STATUS:
+            print(f"\nNessuna soluzione trovata prima dell'arresto (stato {result.status}, tempo {result.runtime:.1f} s).")
+        elif tiered:
+            print_diagnosis(diagnose(model, time_limit=time_limit))
+        else:
+            print_iis(model)
@@ -0,0 +1,143 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from gurobipy import GRB
+
+from .instance import Instance
+
+# Ogni backend riporta gli stati con i codici di Gurobi (HiGHS li traduce in highs.py,
+# l'euristica e l'orizzonte mobile usano SUBOPTIMAL): il codice comune confronta con questi
+OPTIMAL = GRB.OPTIMAL
+# Ammissibile, ottimalità non dimostrata
+SUBOPTIMAL = GRB.SUBOPTIMAL
+# Nessun solve eseguito o nessuna soluzione trovata
+NOT_SOLVED = GRB.LOADED
+INFEASIBLE = GRB.INFEASIBLE
+# Solo questi stati giustificano IIS o diagnosi
+INFEASIBLE_STATUS = (GRB.INFEASIBLE, GRB.INF_OR_UNBD)
+
+
+# ======================
+# === RISULTATO ========
+# ======================
+
+@dataclass
+class PathSelectionResult:
+    """Soluzione letta dal modello dopo ``optimize()``."""
+
+    status: int
+    objective: str
+    obj_val: Optional[float] = None
+    # Percorsi con Z[p] = 1
+    selected_paths: List[str] = field(default_factory=list)
+    pax_served: int = 0
+    # Indici dei passeggeri con x[i] = 1
+    served_passengers: List[int] = field(default_factory=list)
+    arrival_times: Dict[int, float] = field(default_factory=dict)
+    # Ritardo per (percorso, stazione) rispetto alla timetable
+    delays: Dict[Tuple[str, int], float] = field(default_factory=dict)
+    runtime: float = 0.0
+    # Gap MIP relativo a fine solve (None senza soluzione)
+    gap: Optional[float] = None
+
+    @property
+    def is_optimal(self) -> bool:
+        return self.status == OPTIMAL
+
+    @property
+    def has_solution(self) -> bool:
+        """True anche se il solve si è fermato prima dell'ottimo (es. limite di tempo) con un incumbent."""
+        return self.obj_val is not None
+
+    @property
+    def total_delay(self) -> float:
+        return sum(self.delays.values())
+
+    def compact(self, instance: Instance) -> "CompactResult":
+        """Versione compatta, per tenere in memoria molti risultati."""
+        position = {p: k for k, p in enumerate(instance.paths)}
+        return CompactResult(
+            self.status, self.objective, self.obj_val, self.runtime,
+            array('i', (position[p] for p in self.selected_paths)), array('i', self.served_passengers),
+            array('d', (self.arrival_times.get(s, 0.0) for s in instance.nodi)) if self.arrival_times else array('d'),
+            self.total_delay, self.gap,
+        )
+
+
+@dataclass
+class Incumbent:
+    """Soluzione migliorante trovata durante il solve (vedi ``solve(on_incumbent=...)``)."""
+
+    runtime: float
+    obj_val: float
+    # Miglior bound e gap relativo al momento della soluzione
+    bound: float
+    gap: float
+    selected_paths: List[str]
+    pax_served: int
+    delays: Dict[Tuple[str, int], float]
+
+    @property
+    def total_delay(self) -> float:
+        return sum(self.delays.values())
+
+
+def path_delays(instance: Instance, selected_paths: List[str],
+                arrival_times: Dict[int, float]) -> Dict[Tuple[str, int], float]:
+    """Ritardo per (percorso scelto, stazione) rispetto alla timetable."""
+    delays = {}
+    for p in selected_paths:
+        for s in sorted(instance.path_nodes[p]):
+            if s in instance.timetable:
+                delays[(p, s)] = arrival_times[s] - instance.timetable[s]
+    return delays
+
+
+class CompactResult:
+    """Risultato in array compatti: indici dei percorsi scelti e dei passeggeri serviti (int32), orari per stazione.
+
+    Un risultato con migliaia di passeggeri serviti occupa qualche KB invece
+    delle liste e dei dizionari di ``PathSelectionResult``; ``expand`` ricostruisce
+    il risultato completo (i ritardi si ricalcolano da orari e timetable).
+    """
+
+    __slots__ = ("status", "objective", "obj_val", "runtime", "selected", "served", "arrival", "total_delay", "gap")
+
+    def __init__(self, status: int, objective: str, obj_val: Optional[float], runtime: float, selected: array,
+                 served: array, arrival: array, total_delay: float, gap: Optional[float] = None):
+        self.status = status
+        self.objective = objective
+        self.obj_val = obj_val
+        self.runtime = runtime
+        # Posizioni in instance.paths
+        self.selected = selected
+        self.served = served
+        # Orario per stazione di instance.nodi (vuoto se il risultato non ha soluzione)
+        self.arrival = arrival
+        self.total_delay = total_delay
+        self.gap = gap
+
+    @property
+    def pax_served(self) -> int:
+        return len(self.served)
+
+    @property
+    def is_optimal(self) -> bool:
+        return self.status == OPTIMAL
+
+    @property
+    def has_solution(self) -> bool:
+        return self.obj_val is not None
+
+    def expand(self, instance: Instance) -> PathSelectionResult:
+        paths = list(instance.paths)
+        result = PathSelectionResult(status=self.status, objective=self.objective, obj_val=self.obj_val,
+                                     runtime=self.runtime, gap=self.gap)
+        result.selected_paths = [paths[k] for k in self.selected]
+        result.served_passengers = list(self.served)
+        result.pax_served = len(self.served)
+        if self.arrival:
+            result.arrival_times = dict(zip(instance.nodi, self.arrival))
+            result.delays = path_delays(instance, result.selected_paths, result.arrival_times)
+        return result
@@ -0,0 +1,134 @@
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple
+
+from gurobipy import Env
+
+from .backend import make_model, GUROBI
+from .instance import Arc, random_instance
+from .model import MAX_PAX
+from .result import OPTIMAL
+
+
+# ==========================
+# === SCENARI MONTE CARLO ===
+# ==========================
+
+@dataclass
+class ScenarioResult:
+    """Esito compatto di uno scenario (facile da serializzare tra processi)."""
+
+    # Senza __dict__: decine di migliaia di risultati per lotto restano in memoria per le distribuzioni
+    __slots__ = ("seed", "status", "obj_val", "pax_served", "total_delay", "selected_paths", "runtime")
+
+    seed: int
+    status: int
+    obj_val: Optional[float]
+    pax_served: int
+    total_delay: float
+    selected_paths: List[str]
+    runtime: float
+
+
+@dataclass
+class ScenarioSummary:
+    """Risultati di tutti gli scenari e relative distribuzioni."""
+
+    results: List[ScenarioResult] = field(default_factory=list)
+
+    @property
+    def solved(self) -> List[ScenarioResult]:
+        return [r for r in self.results if r.status == OPTIMAL]
+
+    def distribution(self, attr: str) -> Dict[str, float]:
+        """Media, deviazione standard, minimo, massimo e percentili di un attributo sugli scenari risolti."""
+        values = [getattr(r, attr) for r in self.solved]
+        if not values:
+            return {}
+        q = statistics.quantiles(values, n=20, method="inclusive") if len(values) > 1 else [values[0]] * 19
+        return {
+            "mean": statistics.fmean(values),
+            "std": statistics.pstdev(values),
+            "min": min(values),
+            "p5": q[0],
+            "p50": q[9],
+            "p95": q[18],
+            "max": max(values),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scenarios": len(self.results),
+            "solved": len(self.solved),
+            "obj_val": self.distribution("obj_val"),
+            "pax_served": self.distribution("pax_served"),
+            "total_delay": self.distribution("total_delay"),
+        }
+
+
+# Un ambiente Gurobi per processo, creato dall'initializer del pool (solo con backend Gurobi)
+_env: Optional[Env] = None
+_threads = 1
+_backend = GUROBI
+
+
+def _init_worker(threads: int, backend: str = GUROBI) -> None:
+    global _env, _threads, _backend
+    _threads = threads
+    _backend = backend
+    if backend == GUROBI:
+        _env = Env(params={"OutputFlag": 0, "Threads": threads})
+
+
+def _solve_scenario(seed: int, instance_args: Dict[str, Any], model_args: Dict[str, Any]) -> ScenarioResult:
+    if _backend == GUROBI and _env is None:
+        _init_worker(_threads, _backend)
+    instance = random_instance(seed=seed, **instance_args)
+    if _backend == GUROBI:
+        model = make_model(instance, _backend, env=_env, **model_args)
+    else:
+        model_args = dict(model_args)
+        model_args["options"] = dict(model_args.get("options") or {}, output_flag=False, threads=_threads)
+        model = make_model(instance, _backend, **model_args)
+    result = model.solve()
+    return ScenarioResult(seed=seed, status=result.status, obj_val=result.obj_val, pax_served=result.pax_served,
+                          total_delay=result.total_delay, selected_paths=result.selected_paths,
+                          runtime=result.runtime)
+
+
+def run_scenarios(paths: Dict[str, List[Arc]],
+                  timetable: Dict[int, float],
+                  capMax: int,
+                  num_passengers: int,
+                  n: int,
+                  objective: str = MAX_PAX,
+                  seed: int = 0,
+                  workers: Optional[int] = None,
+                  threads: Optional[int] = None,
+                  w_range: Tuple[int, int] = (5, 7),
+                  model_args: Optional[Dict[str, Any]] = None,
+                  backend: str = GUROBI,
+                  **instance_args) -> ScenarioSummary:
+    """Genera e risolve ``n`` istanze casuali con seed seed, seed + 1, ... in parallelo.
+
+    Ogni processo ha il suo ambiente Gurobi con ``Threads`` limitato, in modo che
+    workers * threads non superi i core disponibili. ``instance_args`` va a
+    ``random_instance`` (paths_cost, budget, ...), ``model_args`` a
+    ``PathSelectionModel`` (delay_form, big_m, ...) o a ``HighsModel`` con
+    ``backend="highs"``, che non richiede una licenza Gurobi per processo.
+    """
+    cpus = os.cpu_count() or 1
+    workers = workers or cpus
+    threads = threads or max(1, cpus // workers)
+    instance_args = dict(paths=paths, timetable=timetable, capMax=capMax, num_passengers=num_passengers,
+                         w_range=w_range, **instance_args)
+    model_args = dict(model_args or {}, objective=objective)
+
+    seeds = list(range(seed, seed + n))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(threads, backend)) as pool:
+        results = list(pool.map(_solve_scenario, seeds, [instance_args] * n, [model_args] * n,
+                                chunksize=max(1, n // (4 * workers))))
+    return ScenarioSummary(results=results)
@@ -0,0 +1,341 @@
+import argparse
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+
+from gurobipy import GRB
+
+from .backend import make_model, GUROBI, BACKENDS
+from .cache import instance_key
+from .instance import Instance, PassengerArcs
+from .model import MAX_PAX
+from .result import PathSelectionResult, Incumbent
+
+
+# ===========================
+# === SERVIZIO HTTP/JSON ====
+# ===========================
+# Servizio locale asyncio, senza dipendenze esterne:
+#
+#   POST /solve   corpo JSON con l'istanza (vedi parse_instance) e le opzioni
+#                 del modello; la risposta è uno stream JSON lines (chunked)
+#                 con gli eventi "queued", "started", un "incumbent" per ogni
+#                 soluzione migliorante e infine "result" o "error"
+#   GET /health   richieste in corso e in coda
+#
+# I solve girano su un pool di ``workers`` thread (Gurobi rilascia il GIL
+# durante optimize), ognuno con il suo ambiente Gurobi e ``Threads`` pari a
+# threads // workers, così il totale non supera ``threads``. Richieste
+# identiche (stessa istanza e stesse opzioni) mentre una è in corso si
+# agganciano allo stesso solve e ricevono gli stessi eventi.
+#
+# Nelle opzioni, ``time_limit`` (secondi) e ``mip_gap`` limitano il solve
+# (default: ``time_limit`` del servizio); allo scadere il risultato è il miglior
+# incumbent, con il suo gap.
+
+# Opzioni passate a solve() invece che al costruttore del modello
+SOLVE_OPTIONS = ("time_limit", "mip_gap")
+
+
+def _finite(value: Optional[float]) -> Optional[float]:
+    """Gap e bound infiniti (``GRB.INFINITY`` per Gurobi) come null, per restare JSON valido."""
+    return value if value is None or abs(value) < GRB.INFINITY else None
+
+
+def parse_instance(data: Dict[str, Any]) -> Instance:
+    """Istanza da JSON.
+
+    ``paths``: {nome: [[u, v], ...]}, ``timetable``: {stazione: orario},
+    ``w``: [[u, v, tempo], ...], ``passengers``: [[origine, destinazione], ...],
+    ``capMax``; facoltativi ``paths_cost`` ({nome: costo}), ``budget``,
+    ``pickup_slack``, ``dwell``, ``min_pax_ratio``, ``max_paths``.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("l'istanza deve essere un oggetto JSON")
+    for key, kind in (("paths", dict), ("timetable", dict), ("w", list), ("passengers", list)):
+        if not isinstance(data.get(key), kind):
+            raise ValueError(f"{key!r} deve essere {'un oggetto' if kind is dict else 'una lista'}")
+    if data.get("paths_cost") is not None and not isinstance(data["paths_cost"], dict):
+        raise ValueError("'paths_cost' deve essere un oggetto")
+    optional = ("budget", "pickup_slack", "dwell", "min_pax_ratio", "max_paths")
+    return Instance(
+        paths={p: [(int(u), int(v)) for u, v in arcs] for p, arcs in data["paths"].items()},
+        timetable={int(s): float(t) for s, t in data["timetable"].items()},
+        w={(int(u), int(v)): float(t) for u, v, t in data["w"]},
+        passenger_arcs=PassengerArcs((int(o) for o, _ in data["passengers"]),
+                                     (int(d) for _, d in data["passengers"])),
+        capMax=int(data["capMax"]),
+        paths_cost={p: float(c) for p, c in data["paths_cost"].items()} if data.get("paths_cost") else None,
+        **{k: data[k] for k in optional if k in data},
+    )
+
+
+def result_to_dict(result: PathSelectionResult) -> Dict[str, Any]:
+    return {
+        "status": result.status,
+        "objective": result.objective,
+        "obj_val": result.obj_val,
+        "selected_paths": result.selected_paths,
+        "pax_served": result.pax_served,
+        "served_passengers": result.served_passengers,
+        "arrival_times": {str(s): t for s, t in result.arrival_times.items()},
+        "delays": [[p, s, d] for (p, s), d in result.delays.items()],
+        "total_delay": result.total_delay,
+        "runtime": result.runtime,
+        "gap": _finite(result.gap),
+    }
+
+
+def incumbent_to_dict(incumbent: Incumbent) -> Dict[str, Any]:
+    return {
+        "runtime": incumbent.runtime,
+        "obj_val": incumbent.obj_val,
+        "bound": _finite(incumbent.bound),
+        "gap": _finite(incumbent.gap),
+        "selected_paths": incumbent.selected_paths,
+        "pax_served": incumbent.pax_served,
+        "delays": [[p, s, d] for (p, s), d in incumbent.delays.items()],
+        "total_delay": incumbent.total_delay,
+    }
+
+
+class _Job:
+    """Solve in corso con i suoi iscritti (una coda di eventi per richiesta agganciata).
+
+    Gli eventi già pubblicati restano in ``history``: chi si aggancia a solve
+    avviato li riceve subito, così ogni richiesta vede lo stesso stream.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.queues: List[asyncio.Queue] = []
+        self.history: List[Dict[str, Any]] = []
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.history:
+            queue.put_nowait(event)
+        self.queues.append(queue)
+        return queue
+
+    def publish(self, event: Optional[Dict[str, Any]]) -> None:
+        """Evento a tutti gli iscritti; None chiude lo stream."""
+        if event is not None:
+            self.history.append(event)
+        for queue in self.queues:
+            queue.put_nowait(event)
+
+
+class PlanningService:
+    """Servizio di selezione percorsi su HTTP/JSON con pool di solver limitato.
+
+    ``threads`` è il totale dei thread dei solver (default: i core
+    disponibili); ``max_pending`` limita i solve in corso o in coda, oltre il
+    quale si risponde 503; ``time_limit`` è la scadenza di default di ogni solve;
+    corpi più lunghi di ``max_body`` byte si rifiutano con 413.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, workers: int = 2, threads: Optional[int] = None,
+                 backend: str = GUROBI, max_pending: int = 64, time_limit: Optional[float] = None,
+                 max_body: int = 64 * 2 ** 20):
+        if backend not in BACKENDS:
+            raise ValueError(f"Solver sconosciuto: {backend!r} (attesi: {', '.join(BACKENDS)})")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads_per_solve = max(1, (threads or os.cpu_count() or 1) // workers)
+        self.backend = backend
+        self.max_pending = max_pending
+        self.time_limit = time_limit
+        self.max_body = max_body
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pytrain-solver")
+        self.jobs: Dict[str, _Job] = {}
+        self.stats = {"requests": 0, "coalesced": 0, "solves": 0}
+        self._local = threading.local()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # --- Solve nel pool ---
+
+    def _env(self):
+        """Ambiente Gurobi del thread corrente (un ambiente non va usato da più thread insieme)."""
+        env = getattr(self._local, "env", None)
+        if env is None:
+            from gurobipy import Env
+            env = self._local.env = Env(params={"OutputFlag": 0, "Threads": self.threads_per_solve})
+        return env
+
+    def _model_args(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        args = {k: v for k, v in options.items() if k not in SOLVE_OPTIONS}
+        if self.backend == GUROBI:
+            # Threads non può superare la quota del worker
+            args["params"] = dict(args.get("params") or {}, Threads=self.threads_per_solve)
+            args["env"] = self._env()
+        else:
+            args["options"] = dict(args.get("options") or {}, output_flag=False, threads=self.threads_per_solve)
+        return args
+
+    def _solve(self, job: _Job, instance: Instance, options: Dict[str, Any],
+               loop: asyncio.AbstractEventLoop) -> PathSelectionResult:
+        loop.call_soon_threadsafe(job.publish, {"event": "started"})
+        model = make_model(instance, self.backend, **self._model_args(options))
+
+        def on_incumbent(incumbent: Incumbent) -> None:
+            loop.call_soon_threadsafe(job.publish, {"event": "incumbent", **incumbent_to_dict(incumbent)})
+        return model.solve(on_incumbent=on_incumbent, **{k: options[k] for k in SOLVE_OPTIONS if k in options})
+
+    async def _run(self, job: _Job, instance: Instance, options: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        self.stats["solves"] += 1
+        try:
+            result = await loop.run_in_executor(self.pool, self._solve, job, instance, options, loop)
+            event = {"event": "result", "result": result_to_dict(result)}
+        except Exception as e:
+            event = {"event": "error", "error": f"{type(e).__name__}: {e}"}
+        finally:
+            del self.jobs[job.key]
+        job.publish(event)
+        job.publish(None)
+
+    def submit(self, data: Dict[str, Any]) -> Tuple[asyncio.Queue, Dict[str, Any]]:
+        """Avvia il solve della richiesta o si aggancia a uno identico in corso.
+
+        Restituisce la coda degli eventi e l'evento "queued".
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("options") or {}, dict):
+            raise ValueError('corpo atteso: {"instance": {...}, "options": {...}}')
+        instance = parse_instance(data.get("instance"))
+        options = dict(data.get("options") or {})
+        options.setdefault("objective", MAX_PAX)
+        if self.time_limit is not None:
+            options.setdefault("time_limit", self.time_limit)
+        key = instance_key(instance, backend=self.backend, **options)
+        self.stats["requests"] += 1
+
+        job = self.jobs.get(key)
+        coalesced = job is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+        else:
+            if len(self.jobs) >= self.max_pending:
+                raise OverflowError("Troppe richieste in corso")
+            job = self.jobs[key] = _Job(key)
+            asyncio.get_running_loop().create_task(self._run(job, instance, options))
+        return job.subscribe(), {"event": "queued", "key": key, "coalesced": coalesced}
+
+    # --- HTTP ---
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) < 2:
+                return
+            method, path = request_line[0], request_line[1]
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                await self._respond(writer, 400, {"error": f"Content-Length non valido: {headers['content-length']!r}"})
+                return
+            if length > self.max_body:
+                await self._respond(writer, 413, {"error": f"Corpo oltre il limite di {self.max_body} byte"})
+                return
+            body = await reader.readexactly(length)
+
+            if path == "/health" and method == "GET":
+                await self._respond(writer, 200, {"status": "ok", "in_flight": len(self.jobs), **self.stats})
+            elif path == "/solve" and method == "POST":
+                try:
+                    queue, queued = self.submit(json.loads(body))
+                except OverflowError as e:
+                    await self._respond(writer, 503, {"error": str(e)})
+                    return
+                except Exception as e:
+                    # Qualsiasi errore nel leggere il corpo è della richiesta: si risponde sempre
+                    await self._respond(writer, 400, {"error": f"Richiesta non valida: {type(e).__name__}: {e}"})
+                    return
+                await self._stream(writer, queue, queued)
+            elif path in ("/solve", "/health"):
+                await self._respond(writer, 405, {"error": f"Metodo non consentito: {method}"})
+            else:
+                await self._respond(writer, 404, {"error": f"Percorso sconosciuto: {path}"})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    @staticmethod
+    async def _stream(writer: asyncio.StreamWriter, queue: asyncio.Queue, first: Dict[str, Any]) -> None:
+        """Eventi come JSON lines, un chunk per evento, fino alla chiusura dello stream."""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        event = first
+        while event is not None:
+            line = json.dumps(event).encode() + b"\n"
+            writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            await writer.drain()
+            event = await queue.get()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Con port=0 il sistema sceglie una porta libera
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.pool.shutdown(wait=True)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+            503: "Service Unavailable"}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Servizio HTTP/JSON di selezione percorsi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=2, help="solve in parallelo")
+    parser.add_argument("--threads", type=int, help="thread totali dei solver (default: core disponibili)")
+    parser.add_argument("--backend", choices=BACKENDS, default=GUROBI)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--time-limit", type=float, help="scadenza di default di ogni solve, in secondi")
+    parser.add_argument("--max-body", type=int, default=64 * 2 ** 20, help="byte massimi del corpo di una richiesta")
+    args = parser.parse_args(argv)
+
+    service = PlanningService(args.host, args.port, args.workers, args.threads, args.backend, args.max_pending,
+                              args.time_limit, args.max_body)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
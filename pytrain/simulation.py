@@ -0,0 +1,152 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .instance import Arc, Instance
+from .result import PathSelectionResult
+
+
+# ===============================
+# === SIMULAZIONE DI UN PIANO ===
+# ===============================
+# Percorsi scelti e passeggeri serviti restano fissi; per ogni campione dei
+# tempi di percorrenza si ricalcolano gli orari come nel modello: partenza alla
+# timetable della prima stazione di ogni percorso, attesa all'apertura delle
+# finestre di prelievo e poi, lungo ogni arco, arrivo >= partenza + w + sosta
+# (time_progression). Gli archi si visitano una volta in ordine topologico e
+# ogni passo è un'operazione vettoriale su tutti i campioni insieme.
+
+@dataclass
+class SimulationResult:
+    # Colonne di ``arrival``
+    stations: List[int]
+    # Orari di arrivo, una riga per campione
+    arrival: np.ndarray
+    # Ritardo totale per campione (somma su (percorso scelto, stazione), come PathSelectionResult.total_delay)
+    total_delay: np.ndarray
+    # Passeggeri serviti nel piano la cui finestra di prelievo è mancata, per campione
+    missed_passengers: np.ndarray
+    # Stazione -> frazione di campioni con la finestra di prelievo mancata (solo stazioni mancate almeno una volta)
+    missed_windows: Dict[int, float] = field(default_factory=dict)
+
+    @property
+    def samples(self) -> int:
+        return len(self.total_delay)
+
+    def distribution(self, attr: str) -> Dict[str, float]:
+        """Media, deviazione standard, minimo, massimo e percentili di ``total_delay`` o ``missed_passengers``."""
+        values = getattr(self, attr)
+        if not len(values):
+            return {}
+        p5, p50, p95 = np.percentile(values, [5, 50, 95])
+        return {"mean": float(values.mean()), "std": float(values.std()), "min": float(values.min()),
+                "p5": float(p5), "p50": float(p50), "p95": float(p95), "max": float(values.max())}
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "samples": self.samples,
+            "total_delay": self.distribution("total_delay"),
+            "missed_passengers": self.distribution("missed_passengers"),
+            "missed_windows": self.missed_windows,
+        }
+
+
+class PlanSimulator:
+    """Valuta un piano (percorsi scelti e passeggeri serviti) su molti campioni dei tempi ``w``.
+
+    ``arcs`` sono gli archi dei percorsi scelti, nell'ordine delle colonne di
+    ``w`` in ``run``.
+    """
+
+    def __init__(self, instance: Instance, result: PathSelectionResult):
+        inst = instance
+        self.instance = inst
+        selected = result.selected_paths
+        self.arcs: List[Arc] = sorted(set(arc for p in selected for arc in inst.paths[p]))
+        self.stations: List[int] = sorted(set(s for p in selected for s in inst.path_nodes[p]))
+        col = {s: k for k, s in enumerate(self.stations)}
+
+        # Orario minimo di partenza: timetable della prima stazione e apertura delle finestre
+        # (origini con passeggeri servibili, come constraints.add_window_constraints)
+        pickup_window = inst.pickup_window
+        origins = {o for (o, d) in set(inst.passenger_arcs) if inst.index.paths_on((o, d))}
+        self.earliest = np.zeros(len(self.stations))
+        for p in selected:
+            u0 = inst.paths[p][0][0]
+            self.earliest[col[u0]] = max(self.earliest[col[u0]], inst.timetable[u0])
+        windows = sorted(s for s in self.stations if s in origins)
+        for s in windows:
+            self.earliest[col[s]] = max(self.earliest[col[s]], pickup_window.get(s, (0, 1e5))[0])
+        self.window_cols = np.array([col[s] for s in windows], dtype=np.int64)
+        self.window_end = np.array([pickup_window.get(s, (0, 1e5))[1] for s in windows])
+
+        # Passeggeri serviti per finestra (origine)
+        served = np.zeros(len(windows))
+        window_pos = {s: k for k, s in enumerate(windows)}
+        for i in result.served_passengers:
+            o = inst.passenger_arcs[i][0]
+            if o in window_pos:
+                served[window_pos[o]] += 1
+        self.served_per_window = served
+
+        # Ritardo: ogni stazione conta una volta per percorso scelto che la visita
+        self.delay_weight = np.zeros(len(self.stations))
+        for p in selected:
+            for s in inst.path_nodes[p]:
+                if s in inst.timetable:
+                    self.delay_weight[col[s]] += 1
+        self.timetable = np.array([inst.timetable.get(s, 0.0) for s in self.stations])
+
+        self._order = self._topological(col)
+
+    def _topological(self, col: Dict[int, int]) -> List[Tuple[int, int, int]]:
+        """(colonna di u, colonna di v, colonna di w) per ogni arco, con u prima di v."""
+        indegree = {s: 0 for s in self.stations}
+        out: Dict[int, List[int]] = {}
+        for k, (u, v) in enumerate(self.arcs):
+            indegree[v] += 1
+            out.setdefault(u, []).append(k)
+        ready = [s for s in self.stations if indegree[s] == 0]
+        order = []
+        while ready:
+            u = ready.pop()
+            for k in out.get(u, ()):
+                v = self.arcs[k][1]
+                order.append((col[u], col[v], k))
+                indegree[v] -= 1
+                if indegree[v] == 0:
+                    ready.append(v)
+        if len(order) < len(self.arcs):
+            raise ValueError("I percorsi scelti formano un ciclo: gli orari non sono limitati")
+        return order
+
+    def sample(self, n: int, w_range: Tuple[int, int] = (5, 7), seed: Optional[int] = None) -> np.ndarray:
+        """Tempi di percorrenza interi uniformi in ``w_range`` (come ``random_instance``), uno per arco."""
+        rng = np.random.default_rng(seed)
+        return rng.integers(w_range[0], w_range[1] + 1, size=(n, len(self.arcs))).astype(float)
+
+    def run(self, w: np.ndarray) -> SimulationResult:
+        """Simula il piano per ogni riga di ``w`` (campioni x archi, colonne come ``arcs``)."""
+        w = np.asarray(w, dtype=float)
+        if w.ndim != 2 or w.shape[1] != len(self.arcs):
+            raise ValueError(f"w deve avere forma (campioni, {len(self.arcs)}), trovata {w.shape}")
+        dwell = self.instance.dwell
+        arrival = np.tile(self.earliest, (w.shape[0], 1))
+        for u, v, k in self._order:
+            np.maximum(arrival[:, v], arrival[:, u] + w[:, k] + dwell, out=arrival[:, v])
+
+        total_delay = (arrival - self.timetable) @ self.delay_weight
+        missed = arrival[:, self.window_cols] > self.window_end + 1e-9
+        missed_passengers = missed @ self.served_per_window
+        rate = missed.mean(axis=0) if len(missed) else np.zeros(len(self.window_cols))
+        missed_windows = {self.stations[c]: float(r) for c, r in zip(self.window_cols, rate) if r > 0}
+        return SimulationResult(stations=self.stations, arrival=arrival, total_delay=total_delay,
+                                missed_passengers=missed_passengers, missed_windows=missed_windows)
+
+
+def simulate(instance: Instance, result: PathSelectionResult, samples: int = 1000,
+             w_range: Tuple[int, int] = (5, 7), seed: Optional[int] = None) -> SimulationResult:
+    """Simula il piano di ``result`` su ``samples`` campioni dei tempi di percorrenza."""
+    simulator = PlanSimulator(instance, result)
+    return simulator.run(simulator.sample(samples, w_range, seed))
@@ -0,0 +1,58 @@
+import gurobipy as gp
+import pytest
+
+from pytrain import PathSelectionModel, QUADRATIC, FIXED
+from pytrain.benchmark import synthetic_instance
+
+
+@pytest.fixture(scope="session")
+def env():
+    """Un solo ambiente Gurobi silenzioso per tutta la sessione di test."""
+    env = gp.Env(params={"OutputFlag": 0})
+    yield env
+    env.dispose()
+
+
+@pytest.fixture(scope="session")
+def make_instance():
+    """Istanze sintetiche riproducibili dal seed, piccole abbastanza per la licenza ristretta.
+
+    ``size`` è (stazioni, percorsi, passeggeri); gli altri argomenti vanno a
+    ``synthetic_instance`` e sostituiscono i default.
+    """
+    def make(seed, size=(16, 5, 80), **kwargs):
+        kwargs.setdefault("capMax", 4)
+        kwargs.setdefault("w_range", (1, 9))
+        kwargs.setdefault("min_pax_ratio", 0.3)
+        return synthetic_instance(*size, seed=seed, **kwargs)
+    return make
+
+
+@pytest.fixture(scope="session")
+def small_instance(make_instance):
+    """Istanze per i confronti con la formulazione originale, che è bilineare e più grande:
+    quattro percorsi e un budget che ne lascia scegliere due."""
+    def make(seed, **kwargs):
+        kwargs.setdefault("paths_cost", {f"P{k}": 10 + 5 * k for k in range(1, 5)})
+        kwargs.setdefault("budget", 45)
+        return make_instance(seed, size=(10, 4, 40), **kwargs)
+    return make
+
+
+@pytest.fixture(scope="session")
+def reference(env):
+    """Risolve la formulazione degli script originali: ritardo bilineare, Big-M fissi, nessun MIP start.
+
+    Con ``plan`` (un risultato qualsiasi) fissa i percorsi scelti e i passeggeri
+    serviti: un piano ottimo deve restituire lo stesso obiettivo del riferimento.
+    """
+    def solve(inst, objective, plan=None):
+        pm = PathSelectionModel(inst, objective=objective, delay_form=QUADRATIC, big_m=FIXED, env=env).build()
+        if plan is not None:
+            selected, served = set(plan.selected_paths), set(plan.served_passengers)
+            for p in inst.paths:
+                pm.Z[p].LB = pm.Z[p].UB = float(p in selected)
+            for i in range(inst.num_passengers):
+                pm.x[i].LB = pm.x[i].UB = float(i in served)
+        return pm.solve(warm_start=False)
+    return solve
@@ -0,0 +1,14 @@
+import pytest
+
+from pytrain import SolutionCache, make_model, model_key
+
+
+def test_highs_model_is_cached(tmp_path, env, make_instance):
+    pytest.importorskip("highspy")
+    inst = make_instance(0)
+    cache = SolutionCache(tmp_path)
+    first = cache.solve(make_model(inst, backend="highs", options={"output_flag": False}))
+    again = make_model(inst, backend="highs", options={"output_flag": False})
+    assert cache.get(model_key(again)).obj_val == first.obj_val and len(cache) == 1
+    # Stesso modello, solver diverso: chiavi distinte
+    assert model_key(make_model(inst, env=env)) != model_key(again)
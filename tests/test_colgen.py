@@ -0,0 +1,36 @@
+import random
+
+import pytest
+from gurobipy import GRB
+
+from pytrain import Instance, MIN_RIT
+from pytrain.colgen import ColumnGeneration
+from pytrain.result import INFEASIBLE_STATUS
+
+
+def make_colgen(env, budget):
+    rng = random.Random(0)
+    network = {(u, v): rng.randint(3, 9) for u in range(1, 8) for v in range(u + 1, min(u + 4, 8))}
+    arc_cost = {a: 30 + 5 * (a[1] - a[0]) for a in network}
+    timetable = {s: 100 + 12 * (s - 1) for s in range(1, 8)}
+    pax = [tuple(sorted(rng.sample(range(1, 8), 2))) for _ in range(60)]
+    inst = Instance(paths={"A": [(1, 4), (4, 7)]}, timetable=timetable, w=network, passenger_arcs=pax,
+                    capMax=6, budget=budget, min_pax_ratio=None)
+    return ColumnGeneration(inst, network, arc_cost, 1, 7, env=env)
+
+
+def test_generates_columns(env):
+    out = make_colgen(env, 200).run()
+    assert out.generated and out.result.status == GRB.OPTIMAL
+    assert out.result.pax_served <= out.lp_bounds[-1] + 1e-6
+
+
+def test_rejects_unsupported_objective(env):
+    with pytest.raises(ValueError):
+        make_colgen(env, 200).run(objective=MIN_RIT)
+
+
+def test_infeasible_master_stops_generation(env):
+    out = make_colgen(env, -1).run()
+    assert out.lp_bounds == [] and not out.generated
+    assert out.result.status in INFEASIBLE_STATUS
@@ -0,0 +1,78 @@
+import pytest
+
+from pytrain import Instance, PathSelectionModel, OBJECTIVES, make_model, print_report
+from pytrain.diagnosis import diagnose, precheck, IIS, PRECHECK, RELAX
+from pytrain.result import INFEASIBLE_STATUS
+
+highspy = pytest.importorskip("highspy")
+
+
+def budget_conflict():
+    """Infeasibile senza che i controlli strutturali lo vedano: ogni percorso sta nel
+    budget da solo, ma per servire tutti i passeggeri servono entrambi."""
+    return Instance(paths={"A": [(1, 2)], "B": [(2, 3)]}, timetable={1: 100, 2: 112, 3: 124},
+                    w={(1, 2): 5, (2, 3): 5}, passenger_arcs=[(1, 2), (2, 3)], capMax=2,
+                    paths_cost={"A": 10, "B": 10}, budget=15, min_pax_ratio=1.0)
+
+
+def highs_model():
+    return make_model(budget_conflict(), backend="highs", options={"output_flag": False})
+
+
+def test_highs_print_report_iis(capsys):
+    pm = highs_model()
+    result = pm.solve()
+    assert not result.has_solution
+    print_report(pm, result)
+    out = capsys.readouterr().out
+    assert "budget_constraint" in out and "file ILP non scritto" in out
+
+
+def test_highs_tiered_diagnosis(capsys):
+    pm = highs_model()
+    diagnosis = diagnose(pm)
+    assert not diagnosis.blocking and diagnosis.skipped == [RELAX] and diagnosis.tier == IIS
+    assert diagnosis.iis["complete"] and "budget_constraint" in diagnosis.iis["constrs"]
+
+    print_report(pm, pm.solve(), tiered=True)
+    out = capsys.readouterr().out
+    assert "feasRelax saltato" in out and "budget_constraint" in out
+
+
+def test_gurobi_tiered_diagnosis(env):
+    pm = make_model(budget_conflict(), env=env)
+    pm.solve()
+    diagnosis = diagnose(pm)
+    assert not diagnosis.skipped and diagnosis.tier == RELAX and diagnosis.relaxation
+
+
+# === Coerenza con la formulazione originale ===
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("objective", OBJECTIVES)
+@pytest.mark.parametrize("change, code", [
+    (dict(budget=5), "budget"),
+    (dict(capMax=1, max_paths=1, min_pax_ratio=0.9), "min_pax"),
+    ({}, None),
+])
+def test_precheck_agrees_with_solve(small_instance, reference, seed, objective, change, code):
+    inst = small_instance(seed, **change)
+    blocking = [issue.code for issue in precheck(inst) if issue.blocking]
+    result = reference(inst, objective)
+    if code is None:
+        assert not blocking and result.is_optimal
+    else:
+        # Un controllo bloccante non deve mai scartare un modello risolvibile
+        assert code in blocking and result.status in INFEASIBLE_STATUS
+
+
+def test_tiered_iis_matches_full_iis(env):
+    full = PathSelectionModel(budget_conflict(), env=env)
+    full.solve()
+    expected = full.compute_iis()
+    pm = make_model(budget_conflict(), env=env)
+    pm.solve()
+    diagnosis = diagnose(pm, tiers=(PRECHECK, IIS))
+    assert diagnosis.iis["complete"]
+    assert sorted(diagnosis.iis["constrs"]) == sorted(expected["constrs"])
+    assert sorted(diagnosis.iis["vars"]) == sorted(expected["vars"])
@@ -0,0 +1,42 @@
+from pytrain import PathSelectionModel, rolling_horizon, CHECK, MAX_PAX
+from pytrain.horizon import STITCHED
+
+# Istanza con i default di synthetic_instance, abbastanza lunga da richiedere più finestre
+DAY = dict(size=(30, 5, 150), capMax=10, w_range=(5, 7), min_pax_ratio=0.7)
+
+
+def check_plan(env, inst, result, objective):
+    """Fissa il piano unito nel modello completo: deve essere ammissibile con lo stesso valore."""
+    pm = PathSelectionModel(inst, objective=objective, env=env).build()
+    selected, served = set(result.selected_paths), set(result.served_passengers)
+    for p in inst.paths:
+        pm.Z[p].LB = pm.Z[p].UB = float(p in selected)
+    for i in range(inst.num_passengers):
+        pm.x[i].LB = pm.x[i].UB = float(i in served)
+    for s in set(s for p in selected for s in inst.path_nodes[p]):
+        pm.arrival_time[s].LB = pm.arrival_time[s].UB = result.arrival_times[s]
+    return pm.solve()
+
+
+def test_stitched_plan_is_feasible(env, make_instance):
+    for seed in range(3):
+        for objective in (CHECK, MAX_PAX):
+            inst = make_instance(seed, **DAY)
+            full = PathSelectionModel(inst, objective=objective, env=env).solve()
+            result = rolling_horizon(inst, 120, 30, objective=objective, env=env).result
+            assert result.status == STITCHED and not result.is_optimal
+            fixed = check_plan(env, inst, result, objective)
+            assert fixed.is_optimal
+            assert abs(fixed.obj_val - result.obj_val) < 1e-6
+            # Il piano unito non può battere l'ottimo del modello completo
+            if objective == MAX_PAX:
+                assert result.obj_val <= full.obj_val + 1e-6
+            else:
+                assert result.obj_val >= full.obj_val - 1e-6
+
+
+def test_single_window_matches_full_model(env, make_instance):
+    inst = make_instance(1, **DAY)
+    full = PathSelectionModel(inst, objective=CHECK, env=env).solve()
+    result = rolling_horizon(inst, 1000, 0, objective=CHECK, env=env).result
+    assert abs(result.obj_val - full.obj_val) < 1e-6
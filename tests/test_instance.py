@@ -0,0 +1,29 @@
+import pickle
+
+from pytrain import Instance
+
+
+def test_slots_and_path_csr(make_instance):
+    inst = make_instance(0)
+    assert not hasattr(inst, "__dict__")
+    offsets, ids = inst.path_offsets, inst.path_arc_ids
+    for k, arcs in enumerate(inst.paths.values()):
+        assert [inst.arcs[a] for a in ids[offsets[k]:offsets[k + 1]]] == arcs
+
+
+def test_pickle_keeps_derived_data(make_instance):
+    inst = make_instance(1)
+    inst.index.paths_at(1)
+    loaded = pickle.loads(pickle.dumps(inst))
+    assert loaded.path_offsets == inst.path_offsets and loaded.path_arc_ids == inst.path_arc_ids
+    # Le coppie OD fuori dai percorsi hanno tempo NaN: si confrontano solo gli archi dei percorsi
+    assert [loaded.travel_time[a] for a in loaded.path_arc_ids] == [inst.travel_time[a] for a in inst.path_arc_ids]
+    assert loaded.arc_to_passengers == inst.arc_to_passengers
+
+
+def test_set_passengers_resets_demand():
+    inst = Instance(paths={"A": [(1, 2), (2, 3)]}, timetable={1: 100, 2: 112, 3: 124},
+                    w={(1, 2): 5, (2, 3): 5}, passenger_arcs=[(1, 2)], capMax=2)
+    assert inst.arc_to_passengers == {(1, 2): [0]}
+    inst.set_passengers([(1, 3), (1, 3)])
+    assert inst.arc_to_passengers == {(1, 3): [0, 1]} and inst.arc_id[(1, 3)] == 2
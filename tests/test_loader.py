@@ -0,0 +1,39 @@
+import pytest
+
+from pytrain import load_instance
+from pytrain.loader import load_passengers
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def write(tmp_path, name, **columns):
+    path = tmp_path / name
+    pq.write_table(pa.table(columns), path)
+    return path
+
+
+def test_load_instance_parquet(tmp_path):
+    inst = load_instance(
+        write(tmp_path, "paths.parquet", path=["A", "A", "B"], u=[1, 2, 1], v=[2, 3, 3]),
+        write(tmp_path, "timetable.parquet", station=[1, 2, 3], time=[100.0, 112.0, 124.0]),
+        write(tmp_path, "w.parquet", u=[1, 2, 1, 5], v=[2, 3, 3, 6], time=[5.0, 6.0, 7.0, 1.0]),
+        write(tmp_path, "pax.parquet", origin=[1, 1, 2], destination=[2, 3, 3]),
+        capMax=10,
+        paths_cost_file=write(tmp_path, "cost.parquet", path=["A", "B"], cost=[10.0, 20.0]),
+        budget=100,
+    )
+    assert inst.paths == {"A": [(1, 2), (2, 3)], "B": [(1, 3)]}
+    assert inst.paths_cost == {"A": 10.0, "B": 20.0}
+    assert list(inst.passenger_arcs) == [(1, 2), (1, 3), (2, 3)]
+    assert inst.travel(1, 3) == 7.0
+
+
+def test_parquet_out_of_range(tmp_path):
+    with pytest.raises(ValueError, match="fuori intervallo"):
+        load_passengers(write(tmp_path, "pax.parquet", origin=[1, 2 ** 40], destination=[2, 3]))
+
+
+def test_parquet_nulls(tmp_path):
+    with pytest.raises(ValueError, match="mancanti"):
+        load_passengers(write(tmp_path, "pax.parquet", origin=pa.array([1, None]), destination=[2, 3]))
@@ -0,0 +1,246 @@
+import random
+
+import pytest
+from gurobipy import GRB
+
+from pytrain import (Instance, PathSelectionModel, OBJECTIVES, MAX_PAX, MIN_RIT, CHECK, BIG_M_MODES, EXPR, MATRIX, LOAD,
+                     OD, MCCORMICK, INDICATOR, TIGHT, FIXED, GUROBI, HIGHS, greedy_solve, heuristic_start, make_model,
+                     pareto_front, print_report)
+from pytrain.heuristic import FOUND
+
+
+def close(a, b):
+    """Stesso obiettivo, a meno della tolleranza del solver (MIPGap 1e-4)."""
+    return (a is None and b is None) or (a is not None and b is not None and abs(a - b) <= 1e-4 * max(1.0, abs(b)))
+
+
+def _highs(inst, **kwargs):
+    pytest.importorskip("highspy")
+    return make_model(inst, backend="highs", options={"output_flag": False}, **kwargs)
+
+
+def _model(backend, inst, env, **kwargs):
+    return make_model(inst, env=env, **kwargs) if backend == GUROBI else _highs(inst, **kwargs)
+
+
+# === Obiettivo CHECK (user-001) ===
+
+@pytest.mark.parametrize("solve", [
+    lambda inst, env: PathSelectionModel(inst, objective=CHECK, env=env).solve(),
+    lambda inst, env: PathSelectionModel(inst, objective=CHECK, build_mode=MATRIX, env=env).solve(),
+    lambda inst, env: _highs(inst, objective=CHECK).solve(),
+    lambda inst, env: greedy_solve(inst, CHECK),
+], ids=["expr", "matrix", "highs", "greedy"])
+def test_check_delay_skips_terminal_station(env, solve):
+    # Come Check.py, il ritardo conta solo le stazioni da cui parte un arco: la 3 è in ritardo ma non pesa
+    inst = Instance(paths={"A": [(1, 2), (2, 3)]}, timetable={1: 100, 2: 106, 3: 100},
+                    w={(1, 2): 5, (2, 3): 5}, passenger_arcs=[(1, 3)], capMax=2)
+    result = solve(inst, env)
+    assert result.selected_paths == ["A"] and result.pax_served == 1
+    origins = sum(result.arrival_times[u] - inst.timetable[u] for u in (1, 2))
+    assert result.arrival_times[3] > inst.timetable[3]
+    assert close(result.obj_val, 0.5 * origins - 1)
+
+
+# === Ritardo linearizzato (user-003) ===
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("objective", (MIN_RIT, CHECK))
+@pytest.mark.parametrize("form", (MCCORMICK, INDICATOR))
+def test_linear_delay_matches_bilinear(env, small_instance, reference, seed, objective, form):
+    inst = small_instance(seed)
+    expected = reference(inst, objective)
+    result = PathSelectionModel(inst, objective=objective, delay_form=form, big_m=FIXED, env=env).solve()
+    assert close(result.obj_val, expected.obj_val)
+    # A parità di obiettivo il piano può cambiare, ma deve restare ottimo nella forma bilineare
+    assert close(reference(inst, objective, plan=result).obj_val, expected.obj_val)
+
+
+# === Costruzione per espressioni e per matrice (user-006) ===
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("objective", OBJECTIVES)
+@pytest.mark.parametrize("big_m", BIG_M_MODES)
+def test_matrix_build_writes_same_lp(tmp_path, env, make_instance, seed, objective, big_m):
+    inst = make_instance(seed)
+    lp = {}
+    for mode in (EXPR, MATRIX):
+        pm = PathSelectionModel(inst, objective=objective, build_mode=mode, big_m=big_m, env=env).build()
+        pm.model.write(str(tmp_path / f"{mode}.lp"))
+        lp[mode] = (tmp_path / f"{mode}.lp").read_text()
+    assert lp[EXPR] == lp[MATRIX]
+
+
+# === Big-M dedotti dall'istanza (user-007) ===
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("objective", OBJECTIVES)
+@pytest.mark.parametrize("big_m", (TIGHT, INDICATOR))
+def test_tight_big_m_matches_fixed(env, small_instance, reference, seed, objective, big_m):
+    inst = small_instance(seed)
+    expected = reference(inst, objective)
+    result = PathSelectionModel(inst, objective=objective, big_m=big_m, env=env).solve()
+    assert close(result.obj_val, expected.obj_val)
+    assert close(reference(inst, objective, plan=result).obj_val, expected.obj_val)
+
+
+# === Aggiornamenti incrementali (user-009) ===
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("objective", OBJECTIVES)
+@pytest.mark.parametrize("build_mode", (EXPR, MATRIX))
+def test_updates_match_fresh_build(env, make_instance, seed, objective, build_mode):
+    pm = PathSelectionModel(make_instance(seed), objective=objective, build_mode=build_mode, env=env)
+    pm.solve()
+    rng = random.Random(seed + 100)
+    fresh = make_instance(seed, min_pax_ratio=0.5)
+    w = {arc: rng.randint(1, 12) for arcs in fresh.paths.values() for arc in arcs}
+    pax = [tuple(sorted(rng.sample(range(1, 17), 2))) for _ in range(90)]
+
+    pm.update_travel_times(w)
+    pm.update_capacity(3)
+    pm.update_min_pax(0.5)
+    fresh.capMax = 3
+    fresh.set_travel_times(w)
+    assert close(pm.solve().obj_val, PathSelectionModel(fresh, objective=objective, env=env).solve().obj_val)
+
+    pm.update_passengers(pax)
+    fresh.set_passengers(pax)
+    assert close(pm.solve().obj_val, PathSelectionModel(fresh, objective=objective, env=env).solve().obj_val)
+
+
+# === Formulazione aggregata y[a] (user-010) ===
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("objective", OBJECTIVES)
+@pytest.mark.parametrize("capacity", (LOAD, OD))
+def test_aggregate_matches_per_passenger(env, make_instance, seed, objective, capacity):
+    inst = make_instance(seed)
+    per_pax = PathSelectionModel(inst, objective=objective, capacity=capacity, env=env).solve()
+    aggregate = PathSelectionModel(inst, objective=objective, capacity=capacity, aggregate=True, env=env).solve()
+    assert close(per_pax.obj_val, aggregate.obj_val)
+    if aggregate.has_solution:
+        assert len(aggregate.served_passengers) == aggregate.pax_served
+        if objective != MIN_RIT:
+            assert aggregate.pax_served == per_pax.pax_served
+
+
+# === Euristica e MIP start (user-014) ===
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("objective", OBJECTIVES)
+def test_heuristic_start_keeps_optimum(env, small_instance, reference, seed, objective):
+    inst = small_instance(seed)
+    expected = reference(inst, objective)
+    pm = PathSelectionModel(inst, objective=objective, env=env)
+    greedy = heuristic_start(pm)
+    assert greedy.status == FOUND
+    assert close(pm.solve().obj_val, expected.obj_val)
+    # Il piano euristico è ammissibile e vale quanto dichiarato
+    fixed = reference(inst, objective, plan=greedy)
+    assert fixed.is_optimal and close(fixed.obj_val, greedy.obj_val)
+
+
+# === Fronte di Pareto (user-020) ===
+
+@pytest.mark.parametrize("seed", range(4))
+def test_pareto_endpoints_match_single_objectives(env, small_instance, reference, seed):
+    inst = small_instance(seed)
+    points = pareto_front(inst, env=env)
+    min_rit, max_pax = reference(inst, MIN_RIT), reference(inst, MAX_PAX)
+    assert close(points[0].total_delay, min_rit.obj_val)
+    assert close(points[-1].pax_served, max_pax.obj_val)
+    assert close(reference(inst, MAX_PAX, plan=points[-1].result).obj_val, max_pax.obj_val)
+    # Passeggeri crescenti, ritardo strettamente crescente: nessun punto è dominato
+    for a, b in zip(points, points[1:]):
+        assert a.pax_served < b.pax_served and a.total_delay < b.total_delay - 1e-6
+
+
+# === Capacità per arco a bordo (user-021) ===
+
+def test_load_counts_passengers_crossing_each_arc(env):
+    # Su 1 -> 2 -> 3 i passeggeri (1, 3) occupano entrambi gli archi: con capMax 2
+    # se ne servono al più 4, mentre il vincolo per coppia OD ne lascia passare 6
+    inst = Instance(paths={"A": [(1, 2), (2, 3)]}, timetable={1: 100, 2: 112, 3: 124},
+                    w={(1, 2): 5, (2, 3): 5}, passenger_arcs=[(1, 3), (1, 2), (2, 3)] * 2,
+                    capMax=2, min_pax_ratio=None)
+    assert PathSelectionModel(inst, objective=MAX_PAX, capacity=LOAD, env=env).solve().pax_served == 4
+    assert PathSelectionModel(inst, objective=MAX_PAX, capacity=OD, env=env).solve().pax_served == 6
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("build_mode", (EXPR, MATRIX))
+def test_load_within_capacity(env, make_instance, seed, build_mode):
+    inst = make_instance(seed, capMax=2)
+    pm = PathSelectionModel(inst, objective=MAX_PAX, build_mode=build_mode, env=env)
+    result = pm.solve()
+    # Con capacity=LOAD la capacità per arco OD non viene emessa
+    assert pm.stats["rows"]["capacity"] == 0
+    assert not any(c.ConstrName.startswith("cap_(") for c in pm.model.getConstrs())
+    for (p, u, v), load in pm.load.items():
+        on_board = sum(pm.flow[q, o, d].X for (q, o, d) in pm.flow
+                       if q == p and _crosses(inst.paths[p], o, d, (u, v)))
+        assert load.X <= inst.capMax + 1e-6 and abs(load.X - on_board) < 1e-6
+        if p not in result.selected_paths:
+            assert load.X < 1e-6
+    assert result.pax_served <= PathSelectionModel(inst, objective=MAX_PAX, capacity=OD, env=env).solve().pax_served
+
+
+def _crosses(arcs, o, d, arc):
+    """Vero se chi sale in o e scende in d lungo arcs percorre arc."""
+    stations = [arcs[0][0]] + [v for _, v in arcs]
+    j = arcs.index(arc)
+    return stations.index(o) <= j < stations.index(d)
+
+
+# === Limite di tempo e incumbent (user-025) ===
+
+@pytest.mark.parametrize("backend", (GUROBI, HIGHS))
+def test_time_limit_without_incumbent(env, make_instance, capsys, backend):
+    pm = _model(backend, make_instance(0), env)
+    result = pm.solve(time_limit=0, warm_start=False)
+    assert result.status == GRB.TIME_LIMIT and not result.has_solution and result.gap is None
+    # Fermato dal limite di tempo non vuol dire infeasibile: niente IIS
+    print_report(pm, result)
+    out = capsys.readouterr().out
+    assert "Nessuna soluzione trovata prima dell'arresto" in out and "INFEASIBILE" not in out
+    # Il limite vale solo per quel solve
+    assert pm.solve().is_optimal
+
+
+@pytest.mark.parametrize("backend", (GUROBI, HIGHS))
+@pytest.mark.parametrize("objective", (MAX_PAX, CHECK))
+def test_early_stop_returns_incumbent(env, make_instance, capsys, backend, objective):
+    inst = make_instance(0)
+    greedy = greedy_solve(inst, objective)
+    if backend == GUROBI:
+        # Con TimeLimit 0 Gurobi si ferma prima di leggere il MIP start: ci si ferma alla prima soluzione
+        pm = _model(backend, inst, env, objective=objective, params={"SolutionLimit": 1})
+        limit, status = {}, GRB.SOLUTION_LIMIT
+    else:
+        pm = _model(backend, inst, env, objective=objective)
+        limit, status = {"time_limit": 0}, GRB.TIME_LIMIT
+    pm.set_start(greedy)
+    result = pm.solve(**limit)
+    assert result.status == status and result.has_solution and not result.is_optimal
+    assert close(result.obj_val, greedy.obj_val) and result.selected_paths == greedy.selected_paths
+    assert result.gap == float("inf")
+    print_report(pm, result)
+    out = capsys.readouterr().out
+    assert "MIGLIOR SOLUZIONE TROVATA" in out and "gap non disponibile" in out
+
+
+@pytest.mark.parametrize("backend", (GUROBI, HIGHS))
+@pytest.mark.parametrize("objective", (MAX_PAX, CHECK))
+def test_incumbents_improve(env, make_instance, backend, objective):
+    inst = make_instance(0)
+    pm = _model(backend, inst, env, objective=objective)
+    incumbents = []
+    result = pm.solve(on_incumbent=incumbents.append)
+    assert result.is_optimal and incumbents
+    sense = -1 if objective == MAX_PAX else 1
+    values = [sense * incumbent.obj_val for incumbent in incumbents]
+    assert all(a > b for a, b in zip(values, values[1:]))
+    assert close(incumbents[-1].obj_val, result.obj_val)
+    for incumbent in incumbents:
+        assert {p for p, _ in incumbent.delays} <= set(incumbent.selected_paths)
@@ -0,0 +1,39 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from pytrain import PathSelectionModel, PlanSimulator, CHECK, MIN_RIT
+
+
+def test_result_pickle_roundtrip(env, make_instance):
+    """Il risultato letto dal modello deve potersi salvare e ricaricare (SolutionCache)."""
+    inst = make_instance(2, min_pax_ratio=0.0)
+    result = PathSelectionModel(inst, objective=CHECK, env=env).solve()
+    assert result.is_optimal
+    loaded = pickle.loads(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+    assert type(loaded.arrival_times) is dict
+    assert loaded == result
+
+
+def test_compact_roundtrip(env, make_instance):
+    inst = make_instance(3, min_pax_ratio=0.0)
+    result = PathSelectionModel(inst, objective=CHECK, env=env).solve()
+    compact = pickle.loads(pickle.dumps(result.compact(inst)))
+    expanded = compact.expand(inst)
+    assert expanded.selected_paths == result.selected_paths
+    assert expanded.served_passengers == result.served_passengers
+    assert expanded.delays == result.delays
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_deterministic_simulation_matches_model(small_instance, reference, seed):
+    """Con i tempi ``w`` dell'istanza il simulatore deve ritrovare orari e ritardi del modello (MinRit)."""
+    inst = small_instance(seed)
+    result = reference(inst, MIN_RIT)
+    simulator = PlanSimulator(inst, result)
+    sim = simulator.run(np.array([[inst.travel(u, v) for u, v in simulator.arcs]]))
+    expected = [result.arrival_times[s] for s in simulator.stations]
+    assert np.allclose(sim.arrival[0], expected, atol=1e-6)
+    assert abs(sim.total_delay[0] - result.total_delay) <= 1e-6
+    assert sim.missed_passengers[0] == 0 and not sim.missed_windows
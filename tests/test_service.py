@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from gurobipy import GRB
+
+import pytrain.service
+from pytrain.service import PlanningService, parse_instance, _finite
+
+INSTANCE = {
+    "paths": {"A": [[1, 2], [2, 3]], "B": [[1, 3]]},
+    "timetable": {"1": 100, "2": 112, "3": 124},
+    "w": [[1, 2, 5], [2, 3, 6], [1, 3, 7]],
+    "passengers": [[1, 2], [1, 3], [2, 3]],
+    "capMax": 10,
+    "min_pax_ratio": 0.0,
+}
+
+
+async def request(port, method, path, body=None, length=None):
+    """(codice HTTP, eventi o corpo JSON) di una richiesta al servizio; ``length`` sostituisce Content-Length."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    length = len(data) if length is None else length
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode() + data)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, rest = raw.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    if b"chunked" not in head:
+        return status, json.loads(rest)
+    events = []
+    while True:
+        size, _, rest = rest.partition(b"\r\n")
+        n = int(size, 16)
+        if n == 0:
+            return status, events
+        events.append(json.loads(rest[:n]))
+        rest = rest[n + 2:]
+
+
+def run(coro_fn, **kwargs):
+    async def main():
+        service = PlanningService(port=0, workers=1, threads=1, **kwargs)
+        await service.start()
+        try:
+            return await coro_fn(service.port)
+        finally:
+            await service.close()
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("body", [
+    [1, 2],
+    {"instance": dict(INSTANCE, paths=[["A"]])},
+    {"instance": dict(INSTANCE, w={"1": 2})},
+    {"instance": INSTANCE, "options": [1]},
+    {"instance": dict(INSTANCE, paths={"A": [[1, 2, 3]]})},
+])
+def test_malformed_request_gets_400(body):
+    status, payload = run(lambda port: request(port, "POST", "/solve", body))
+    assert status == 400 and "error" in payload
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length_gets_400(length):
+    status, payload = run(lambda port: request(port, "POST", "/solve", {}, length=length))
+    assert status == 400 and "Content-Length" in payload["error"]
+
+
+def test_oversized_body_gets_413():
+    body = {"instance": INSTANCE}
+    status, _ = run(lambda port: request(port, "POST", "/solve", body), max_body=64)
+    assert status == 413
+
+
+def test_parse_instance_rejects_wrong_shape():
+    with pytest.raises(ValueError):
+        parse_instance(dict(INSTANCE, passengers={"1": 2}))
+
+
+def test_infinite_bound_is_null():
+    assert _finite(GRB.INFINITY) is None and _finite(-GRB.INFINITY) is None
+    assert _finite(float("inf")) is None and _finite(0.25) == 0.25
+
+
+def test_solve_streams_result():
+    pytest.importorskip("highspy")
+    body = {"instance": INSTANCE, "options": {"objective": "maxpax"}}
+    status, events = run(lambda port: request(port, "POST", "/solve", body), backend="highs")
+    assert status == 200
+    assert [e["event"] for e in events][:2] == ["queued", "started"]
+    assert events[-1]["event"] == "result" and events[-1]["result"]["pax_served"] == 3
+
+
+def test_coalesced_request_replays_events(monkeypatch):
+    pytest.importorskip("highspy")
+    # Il primo solve resta fermo dopo "started" finché la seconda richiesta non si è agganciata
+    gate = threading.Event()
+    make_model = pytrain.service.make_model
+
+    def gated_make_model(*args, **kwargs):
+        gate.wait(10)
+        return make_model(*args, **kwargs)
+    monkeypatch.setattr(pytrain.service, "make_model", gated_make_model)
+
+    async def until(condition):
+        for _ in range(1000):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        raise TimeoutError
+
+    async def main():
+        service = PlanningService(port=0, workers=1, threads=1, backend="highs")
+        await service.start()
+        try:
+            body = {"instance": INSTANCE, "options": {"objective": "maxpax"}}
+            first = asyncio.create_task(request(service.port, "POST", "/solve", body))
+            await until(lambda: any(job.history for job in service.jobs.values()))
+            second = asyncio.create_task(request(service.port, "POST", "/solve", body))
+            await until(lambda: service.stats["coalesced"] == 1)
+            gate.set()
+            return await asyncio.gather(first, second), service.stats
+        finally:
+            gate.set()
+            await service.close()
+
+    ((s1, events1), (s2, events2)), stats = asyncio.run(main())
+    assert s1 == s2 == 200 and stats["solves"] == 1
+    assert not events1[0]["coalesced"] and events2[0]["coalesced"]
+    # Stesso stream, compreso "started" pubblicato prima che la seconda richiesta arrivasse
+    assert events1[1:] == events2[1:]
+    assert events2[1]["event"] == "started" and events2[-1]["event"] == "result"